@@ -0,0 +1,7 @@
+"""Benchmarks for flask_esports. Run each module from the repository root, for example
+
+python -m benchmarks.bench_xpath
+
+bench_endpoints and bench_micro save every run under .benchmarks/ and compare it with the previous run, see
+`benchmarks.results`.
+"""
@@ -0,0 +1,226 @@
+"""End-to-end benchmark of every `GameBlueprint` endpoint, served by synthetic `DataSource`s, so that the cost of
+everything above the data sources (routing, metrics, serialization etc.) can be measured without the network
+
+Each endpoint is driven through the Flask test client, one request at a time, then every endpoint is driven together
+through a real WSGI server (werkzeug's threaded server, or the prefork server) by concurrent clients over HTTP.
+Throughput, latency percentiles and memory are reported, and compared with the previous run (see `results`).
+
+Usage:
+    python -m benchmarks.bench_endpoints [--requests N] [--latency S] [--payload N] [--failure-rate F]
+        [--sources N] [--server werkzeug|prefork] [--clients N] [--duration S] [--no-save]
+"""
+
+import argparse
+import logging
+import os
+import resource
+import signal
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from flask import Flask
+from werkzeug.serving import make_server
+
+from flask_esports.api.blueprint import GameBlueprint
+
+from .results import percentiles, report
+from .synthetic import ENDPOINTS, synthetic_source
+
+GAME = "bench"
+
+
+def build_app(sources: int, latency: float, payload: int, failure_rate: float) -> Flask:
+    """An app serving one game, whose every `DataSource` is synthetic"""
+    app = Flask(__name__)
+    with app.app_context():
+        blueprint = GameBlueprint(
+            GAME,
+            __name__,
+            *(
+                synthetic_source(GAME, latency, payload, failure_rate, seed)
+                for seed in range(sources)
+            ),
+        )
+    blueprint.register(app)
+    return app
+
+
+def paths(ids: int = 50) -> dict[str, list[str]]:
+    return {
+        name: [f"/{GAME}" + path.format(id=i) for i in range(1, ids + 1)]
+        for name, path in ENDPOINTS
+    }
+
+
+def bench_test_client(app: Flask, requests_per_endpoint: int) -> dict:
+    """Time every endpoint through the test client, along with the memory allocated per request"""
+    client = app.test_client()
+    results = {}
+    for name, urls in paths().items():
+        for url in urls[:5]:
+            client.get(url)
+        durations = []
+        start = time.perf_counter()
+        for i in range(requests_per_endpoint):
+            t = time.perf_counter()
+            client.get(urls[i % len(urls)])
+            durations.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+
+        tracemalloc.start()
+        for i in range(min(requests_per_endpoint, 100)):
+            client.get(urls[i % len(urls)])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        results[name] = {
+            "requests_per_sec": requests_per_endpoint / elapsed,
+            **percentiles(durations),
+            "peak_kib": peak / 1024,
+        }
+    return results
+
+
+def _serve_werkzeug(app: Flask):
+    server = make_server("127.0.0.1", 0, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def stop():
+        server.shutdown()
+        thread.join()
+
+    return server.server_port, stop
+
+
+def _serve_prefork(app: Flask, workers: int):
+    from flask_esports.server import PreforkServer
+
+    server = PreforkServer(app, "127.0.0.1", 0, workers=workers)
+    server.bind()
+    port = server.socket.getsockname()[1]
+    pid = os.fork()
+    if pid == 0:
+        try:
+            server.serve_forever()
+        finally:
+            os._exit(0)
+    server.socket.close()
+
+    def stop():
+        os.kill(pid, signal.SIGTERM)
+        os.waitpid(pid, 0)
+
+    return port, stop
+
+
+def bench_server(
+    app: Flask, server: str, clients: int, duration: float, workers: int
+) -> dict:
+    """Drive every endpoint through a real server with concurrent clients, each with a keep-alive session"""
+    if server == "prefork":
+        port, stop = _serve_prefork(app, workers)
+    else:
+        port, stop = _serve_werkzeug(app)
+    urls = [
+        f"http://127.0.0.1:{port}{url}"
+        for endpoint_urls in paths().values()
+        for url in endpoint_urls
+    ]
+
+    def client(n: int) -> tuple[list[float], int]:
+        session = requests.Session()
+        durations, errors = [], 0
+        deadline = time.perf_counter() + duration
+        i = n
+        while time.perf_counter() < deadline:
+            t = time.perf_counter()
+            try:
+                response = session.get(urls[i % len(urls)], timeout=10)
+                if response.status_code != 200 or not response.json()["success"]:
+                    errors += 1
+            except requests.RequestException:
+                errors += 1
+            durations.append(time.perf_counter() - t)
+            i += clients
+        return durations, errors
+
+    # Wait for the server (or its workers) to accept connections
+    for _ in range(100):
+        try:
+            requests.get(urls[0], timeout=1)
+            break
+        except requests.RequestException:
+            time.sleep(0.05)
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    try:
+        start = time.perf_counter()
+        with ThreadPoolExecutor(clients) as pool:
+            outcomes = list(pool.map(client, range(clients)))
+        elapsed = time.perf_counter() - start
+    finally:
+        stop()
+
+    durations = [d for ds, _ in outcomes for d in ds]
+    errors = sum(e for _, e in outcomes)
+    return {
+        f"server_{server}_{clients}_clients": {
+            "requests_per_sec": len(durations) / elapsed,
+            **percentiles(durations),
+            "errors": errors,
+            "max_rss_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+            "rss_growth_kib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            - rss_before,
+        }
+    }
+
+
+def print_results(results: dict) -> None:
+    print(
+        f"{'benchmark':34} {'req/s':>10} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'memory KiB':>11}"
+    )
+    for name, r in results.items():
+        memory = r.get("peak_kib", r.get("max_rss_kib", 0))
+        print(
+            f"{name:34} {r['requests_per_sec']:10.0f} {r['p50_ms']:8.3f} {r['p95_ms']:8.3f} "
+            f"{r['p99_ms']:8.3f} {memory:11.0f}"
+        )
+    rates = [r["requests_per_sec"] for n, r in results.items() if n.startswith("get_")]
+    if rates:
+        print(f"\nmedian endpoint: {statistics.median(rates):.0f} req/s (test client)")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=500, help="Per endpoint")
+    parser.add_argument("--latency", type=float, default=0.0, help="Per source call")
+    parser.add_argument("--payload", type=int, default=10, help="Items per list")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--sources", type=int, default=1, help="Sources per resource")
+    parser.add_argument("--server", choices=("werkzeug", "prefork"), default="werkzeug")
+    parser.add_argument("--workers", type=int, default=2, help="Prefork workers")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    # Synthetic failures are logged by every request that hits one
+    logging.getLogger("flask_esports").setLevel(logging.CRITICAL)
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+
+    app = build_app(args.sources, args.latency, args.payload, args.failure_rate)
+    results = bench_test_client(app, args.requests)
+    results.update(
+        bench_server(app, args.server, args.clients, args.duration, args.workers)
+    )
+    print_results(results)
+    report("endpoints", results, store=not args.no_save)
+
+
+if __name__ == "__main__":
+    main()
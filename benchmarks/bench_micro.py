@@ -0,0 +1,101 @@
+"""Microbenchmarks of the hot paths beneath every request: responses, resource serialization, query building, argument
+validation and xpath parsing of fixture HTML
+
+Each benchmark reports the best of several repeats in ns/op, and is compared with the previous run (see `results`).
+
+Usage:
+    python -m benchmarks.bench_micro [--filter NAME] [--no-save]
+"""
+
+import argparse
+import timeit
+from collections.abc import Callable
+
+from flask import Flask
+
+from flask_esports.api.response import ResponseFactory
+from flask_esports.app.db.query_factory import BasicQuery, BatchQuery
+from flask_esports.scraping.xpath import XpathParser
+from flask_esports.utils.decorators import require_int
+
+from .bench_xpath import MATCH_SCHEMA
+from .fixtures import match_list_page
+from .results import report
+from .synthetic import synthetic_source
+
+
+class PlayerModel:
+    TABLENAME = "players"
+    ID_COLUMN = "player_id"
+
+    @staticmethod
+    def from_record(record):
+        return record
+
+
+def benchmarks() -> dict[str, Callable[[], object]]:
+    source = synthetic_source(payload=10)
+    team = source.get_team(1)
+    match = source.get_match(1)
+    player = source.get_player(1)
+    matches = source.get_team_matches(1, 1)
+    matches_data = [m.to_dict() for m in matches]
+
+    @require_int("player_id", "invalid")
+    def view(player_id):
+        return player_id
+
+    page = match_list_page(100)
+    parser = XpathParser.from_content("https://example.com/matches", page)
+    text_xpath = "//div[contains(@class, 'match-item-event')]"
+
+    return {
+        "response_success": lambda: ResponseFactory.success(matches_data),
+        "response_conditional": lambda: ResponseFactory.conditional(True, matches_data),
+        "response_error": lambda: ResponseFactory.error("No such player"),
+        "player_to_dict": player.to_dict,
+        "team_to_dict": team.to_dict,
+        "match_to_dict": match.to_dict,
+        "matches_to_dict_10": lambda: [m.to_dict() for m in matches],
+        "basic_query_build": lambda: BasicQuery(
+            PlayerModel, "valorant", player_id=10
+        ).get_querystring(),
+        "batch_query_build_100": lambda: BatchQuery(
+            PlayerModel, "valorant", list(range(100))
+        ).get_querystring(),
+        "require_int_valid": lambda: view(player_id="10"),
+        "require_int_invalid": lambda: view(player_id="ten"),
+        "xpath_parse_page_100": lambda: XpathParser.from_content(
+            "https://example.com/matches", page
+        ).content,
+        "xpath_get_text": lambda: parser.get_text(text_xpath),
+        "xpath_extract_schema_100": lambda: parser.extract(MATCH_SCHEMA),
+    }
+
+
+def time_op(func: Callable[[], object], budget: float = 0.2) -> float:
+    """The best ns/op of 5 repeats, each running for about `budget` seconds"""
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    number = max(1, int(number * budget / 0.2))
+    return min(timer.repeat(repeat=5, number=number)) / number * 1e9
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--filter", default="", help="Only run matching benchmarks")
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    results = {}
+    with app.app_context():
+        for name, func in benchmarks().items():
+            if args.filter in name:
+                results[name] = {"ns_per_op": time_op(func)}
+                print(f"{name:30} {results[name]['ns_per_op']:14.0f} ns/op")
+    report("micro", results, store=not args.no_save)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Measures the throughput of parsing and extracting a bulk backfill of match listing pages with `ParseExecutor`, in
+thread and process mode, as the number of workers grows. Process mode should scale with the number of cores, while
+thread mode is limited by the GIL
+"""
+
+import os
+import time
+
+from flask_esports.scraping.executor import ParseExecutor, extract_content
+
+from .bench_xpath import MATCH_SCHEMA
+from .fixtures import match_list_page
+
+PAGES = 64
+ROWS = 200
+
+
+def throughput(mode: str, workers: int, pages: list[bytes]) -> float:
+    with ParseExecutor(mode, workers) as executor:
+        # Start the pool before timing
+        executor.submit(pages[0], MATCH_SCHEMA).result()
+        start = time.perf_counter()
+        results = list(executor.map(pages, MATCH_SCHEMA))
+        elapsed = time.perf_counter() - start
+    assert all(len(r) == ROWS for r in results)
+    return len(pages) / elapsed
+
+
+def main() -> None:
+    pages = [match_list_page(ROWS, seed=i) for i in range(PAGES)]
+    cores = os.cpu_count() or 1
+
+    start = time.perf_counter()
+    for page in pages:
+        extract_content(page, MATCH_SCHEMA)
+    print(f"{PAGES} pages of {ROWS} matches, {cores} cores")
+    print(
+        f"  inline:              {PAGES / (time.perf_counter() - start):8.1f} pages/s"
+    )
+
+    for workers in sorted({1, 2, 4, cores}):
+        for mode in ("thread", "process"):
+            print(
+                f"  {mode:7} x{workers:<3}        {throughput(mode, workers, pages):8.1f} pages/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Measures typeahead latency of `search_resources` against a database of a million players (the target is single
+digit milliseconds for every prefix length)
+
+The database is generated once and kept in .benchmarks/, as filling the full text index takes a while.
+
+Usage:
+    python -m benchmarks.bench_search [--players N] [--no-save]
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import string
+import time
+
+from flask import Flask, g
+
+from flask_esports.app.db.db import dict_factory, regenerate_db
+from flask_esports.app.db.search import search_resources
+from flask_esports.config import Config
+
+from .results import RESULTS_DIRECTORY, percentiles, report
+
+QUERIES = ("a", "t", "te", "sa", "ten", "sen", "tenz", "sentinels", "sen te")
+REPEATS = 50
+
+
+def build(path: str, players: int, seed: int = 0) -> None:
+    rng = random.Random(seed)
+
+    def word() -> str:
+        return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10)))
+
+    db = sqlite3.connect(path)
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    with app.app_context():
+        regenerate_db(db)
+    with db:
+        db.executemany(
+            "INSERT INTO players (source, player_id, alias, forename, surname) VALUES (?, ?, ?, ?, ?);",
+            (("valorant", i, word(), word(), word()) for i in range(players)),
+        )
+        db.executemany(
+            "INSERT INTO teams (source, team_id, team_name, team_tag) VALUES (?, ?, ?, ?);",
+            (("valorant", i, word(), word()[:3]) for i in range(players // 100)),
+        )
+        db.execute("INSERT INTO players_search (players_search) VALUES ('optimize');")
+        db.execute("INSERT INTO teams_search (teams_search) VALUES ('optimize');")
+    db.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--players", type=int, default=1_000_000)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    path = os.path.abspath(os.path.join(RESULTS_DIRECTORY, f"search-{args.players}.db"))
+    if not os.path.exists(path):
+        os.makedirs(RESULTS_DIRECTORY, exist_ok=True)
+        print(f"generating {args.players} players in {path}")
+        build(path, args.players)
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["SLOW_QUERY_THRESHOLD_MS"] = None
+
+    results = {}
+    with app.app_context():
+        # get_db creates the schema on every new connection, so the generated database is connected to directly
+        g._database = sqlite3.connect(path)
+        g._database.row_factory = dict_factory
+        for query in QUERIES:
+            search_resources("valorant", query)
+            durations = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                search_resources("valorant", query)
+                durations.append(time.perf_counter() - start)
+            results[f"search_{query.replace(' ', '_')}"] = percentiles(durations)
+
+    print(f"{'query':20} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, r in results.items():
+        print(f"{name:20} {r['p50_ms']:8.2f} {r['p99_ms']:8.2f}")
+    report("search", results, store=not args.no_save)
+
+
+if __name__ == "__main__":
+    main()
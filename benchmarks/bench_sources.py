@@ -0,0 +1,153 @@
+"""Measures `DataSource` implementations end to end against recorded pages (see `scraping.recording`), so scraper
+performance can be tracked without any network access. For each call it reports pages/sec, and per page the time
+spent parsing, the time spent extracting (everything that is not parsing) and the peak memory allocated.
+
+With no arguments, a synthetic source is benchmarked against a recording of generated match listing pages. To
+benchmark a real source, record its pages once with `use_recording(directory, mode="record")`, then run
+
+python -m benchmarks.bench_sources --recording tests/recordings/vlr --source endpoints.valorant.source:VlrSource \
+    --call get_event_matches:1494 --call get_team:2
+
+Passing --max-ms-per-page makes the benchmark exit with an error when a call is slower than that, for use in CI.
+"""
+
+import argparse
+import sys
+import tempfile
+import time
+import tracemalloc
+from importlib import import_module
+from typing import Any, ClassVar
+
+from lxml import html
+
+from flask_esports.api.source import DataSource
+from flask_esports.scraping.http import set_session_factory
+from flask_esports.scraping.recording import Recording, RecordingSession
+from flask_esports.scraping.xpath import XpathParser
+
+from .bench_xpath import MATCH_SCHEMA
+from .fixtures import match_list_page
+
+EVENTS = 20
+ROWS = 200
+
+
+def event_url(event_id: int, page: int) -> str:
+    return f"https://www.vlr.gg/event/matches/{event_id}/?page={page}"
+
+
+class ListingSource(DataSource):
+    """A source shaped like a real scraper, extracting every match on an event's listing page"""
+
+    @staticmethod
+    def get_event_matches(event_id: int, page: int = 1) -> list[dict]:
+        parser = XpathParser(event_url(event_id, page))
+        return parser.extract(MATCH_SCHEMA) if parser.was_success() else []
+
+
+class TrackingSession(RecordingSession):
+    """Replays a recording, remembering the urls that were requested"""
+
+    requested: ClassVar[list[str]] = []
+
+    def request(self, method, url, **kwargs):
+        TrackingSession.requested.append(url)
+        return super().request(method, url, **kwargs)
+
+
+def synthetic_recording(directory: str) -> list[tuple[str, tuple]]:
+    recording = Recording(directory)
+    for event_id in range(EVENTS):
+        recording.save(event_url(event_id, 1), match_list_page(ROWS, seed=event_id))
+    return [("get_event_matches", (event_id,)) for event_id in range(EVENTS)]
+
+
+def parse_call(spec: str) -> tuple[str, tuple]:
+    method, _, args = spec.partition(":")
+    return method, tuple(int(a) if a.isdigit() else a for a in args.split(",") if a)
+
+
+def load_source(spec: str) -> Any:
+    module, _, attr = spec.partition(":")
+    return getattr(import_module(module), attr)
+
+
+def measure(source: Any, method: str, args: tuple, recording: Recording) -> dict:
+    TrackingSession.requested = []
+    start = time.perf_counter()
+    getattr(source, method)(*args)
+    elapsed = time.perf_counter() - start
+    urls = list(TrackingSession.requested)
+
+    bodies = [recording.load(url).content for url in urls]
+    start = time.perf_counter()
+    for body in bodies:
+        html.fromstring(body)
+    parse = time.perf_counter() - start
+
+    tracemalloc.start()
+    getattr(source, method)(*args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    pages = max(len(urls), 1)
+    return {
+        "call": f"{method}{args}",
+        "pages": len(urls),
+        "pages_per_sec": len(urls) / elapsed,
+        "ms_per_page": elapsed * 1000 / pages,
+        "parse_ms": parse * 1000 / pages,
+        "extract_ms": max(elapsed - parse, 0) * 1000 / pages,
+        "peak_kib_per_page": peak / 1024 / pages,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--recording", help="Directory of recorded pages")
+    parser.add_argument("--source", help="module:attribute of the DataSource")
+    parser.add_argument(
+        "--call", action="append", default=[], help="method:arg,... to call"
+    )
+    parser.add_argument("--max-ms-per-page", type=float)
+    options = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        if options.recording:
+            source, calls = load_source(options.source), list(
+                map(parse_call, options.call)
+            )
+        else:
+            source, calls = ListingSource, synthetic_recording(directory)
+        recording = Recording(options.recording or directory)
+        set_session_factory(lambda host: TrackingSession(recording))
+        try:
+            results = [measure(source, m, args, recording) for m, args in calls]
+        finally:
+            set_session_factory(None)
+
+    print(
+        f"{'call':40} {'pages':>5} {'pages/s':>9} {'ms/page':>9} {'parse ms':>9} {'extract ms':>10} {'KiB/page':>9}"
+    )
+    for r in results:
+        print(
+            f"{r['call'][:40]:40} {r['pages']:5d} {r['pages_per_sec']:9.1f} {r['ms_per_page']:9.2f} "
+            f"{r['parse_ms']:9.2f} {r['extract_ms']:10.2f} {r['peak_kib_per_page']:9.1f}"
+        )
+
+    slow = [
+        r
+        for r in results
+        if options.max_ms_per_page and r["ms_per_page"] > options.max_ms_per_page
+    ]
+    for r in slow:
+        print(
+            f"{r['call']} took {r['ms_per_page']:.2f} ms/page, over the limit of {options.max_ms_per_page} ms/page",
+            file=sys.stderr,
+        )
+    return 1 if slow else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
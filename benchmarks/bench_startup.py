@@ -0,0 +1,100 @@
+"""Measures the cold start of `create_app` as the number of games grows, with every game imported up front (eager)
+and with games imported on the first request to them (lazy), along with the latency of that first request.
+
+Each configuration runs in a fresh interpreter, against a generated endpoint directory of games whose modules do what
+a real scraper module does on import: pull in the scraping stack and build their extraction schemas.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+GAMES = (1, 5, 20, 50)
+
+GAME = """
+from flask_esports.api.blueprint import GameBlueprint
+from flask_esports.api.source import DataSource
+from flask_esports.scraping import xpath as xp
+from flask_esports.scraping.xpath import XpathParser
+
+SCHEMAS = [
+    xp.Rows(
+        xp.xpath("a", class_=f"item-{{i}}"),
+        {{f"field_{{j}}": xp.Field(xp.xpath("div", class_=f"field-{{j}}")) for j in range(10)}},
+    )
+    for i in range(20)
+]
+
+
+class Player:
+    def to_dict(self):
+        return {{"game": "{game}"}}
+
+
+class Source(DataSource):
+    @staticmethod
+    def get_player(player_id):
+        return Player()
+
+
+router = GameBlueprint("{game}", __name__, Source)
+"""
+
+MEASURE = """
+import json, sys, time
+start = time.perf_counter()
+from flask_esports.app import create_app
+app = create_app(eager=sys.argv[1] == "eager")
+created = time.perf_counter()
+response = app.test_client().get("/game0/player/1")
+assert response.status_code == 200, response.status_code
+print(json.dumps({"startup": created - start, "first_request": time.perf_counter() - created}))
+"""
+
+
+def create_endpoints(directory: str, games: int) -> None:
+    for i in range(games):
+        package = os.path.join(directory, "endpoints", f"game{i}")
+        os.makedirs(package)
+        with open(os.path.join(package, "__init__.py"), "w") as f:
+            f.write(GAME.format(game=f"game{i}"))
+
+
+def measure(directory: str, mode: str) -> dict:
+    env = dict(
+        os.environ,
+        PYTHONPATH=os.pathsep.join(
+            [directory, os.path.abspath("src"), os.environ.get("PYTHONPATH", "")]
+        ),
+        PYTHONDONTWRITEBYTECODE="1",
+    )
+    env.pop("APP_EAGER_GAMES", None)
+    output = subprocess.run(
+        [sys.executable, "-c", MEASURE, mode],
+        cwd=directory,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main() -> None:
+    print(f"{'games':>5} {'mode':>6} {'startup ms':>11} {'first request ms':>17}")
+    for games in GAMES:
+        with tempfile.TemporaryDirectory() as directory:
+            create_endpoints(directory, games)
+            for mode in ("eager", "lazy"):
+                # Best of three, to smooth out the noise of starting an interpreter
+                runs = [measure(directory, mode) for _ in range(3)]
+                best = min(runs, key=lambda r: r["startup"])
+                print(
+                    f"{games:5d} {mode:>6} {best['startup'] * 1000:11.1f} {best['first_request'] * 1000:17.1f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
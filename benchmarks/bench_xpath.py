@@ -0,0 +1,132 @@
+"""Measures the per page cost of extracting every match on a listing page with `XpathParser`:
+- evaluating raw xpath strings from the root for every value, the way the parser used to
+- the same xpaths through the compiled xpath cache and memoized xpath builders
+- a single pass `Schema`, evaluating each value relative to its match row
+"""
+
+import timeit
+
+from flask_esports.scraping import xpath as xp
+from flask_esports.scraping.xpath import XpathParser
+
+from .fixtures import match_list_page
+
+PAGES = 50
+
+
+def row_xpaths(i: int) -> dict[str, str]:
+    row = f"{xp.xpath('a', class_='match-item')}[{i}]"
+    return {
+        "href": row,
+        "date": xp.join(row, xp.xpath("div", class_="match-item-date")),
+        "home": xp.join(row, xp.xpath("div", class_="match-item-vs-team-name"), "div"),
+        "home_score": xp.join(row, xp.xpath("div", class_="match-item-vs-team-score")),
+        "event": xp.join(row, xp.xpath("div", class_="match-item-event")),
+        "icon": xp.join(row, xp.xpath("img", class_="match-item-icon")),
+    }
+
+
+def extract_compiled(parser: XpathParser, rows: int) -> list[dict]:
+    matches = []
+    for i in range(1, rows + 1):
+        paths = row_xpaths(i)
+        matches.append(
+            {
+                "href": parser.get_href(paths["href"]),
+                "date": parser.get_text(paths["date"]),
+                "home": parser.get_text(paths["home"]),
+                "home_score": parser.get_text(paths["home_score"]),
+                "event": parser.get_text(paths["event"]),
+                "icon": parser.get_img(paths["icon"]),
+            }
+        )
+    return matches
+
+
+def extract_uncompiled(parser: XpathParser, rows: int) -> list[dict]:
+    def first(path):
+        elems = parser.content.xpath(path)
+        return elems[0] if elems else None
+
+    matches = []
+    for i in range(1, rows + 1):
+        paths = uncached_row_xpaths(i)
+        matches.append(
+            {
+                "href": first(paths["href"]).get("href"),
+                "date": first(paths["date"]).text.strip(),
+                "home": first(paths["home"]).text.strip(),
+                "home_score": first(paths["home_score"]).text.strip(),
+                "event": first(paths["event"]).text.strip(),
+                "icon": first(paths["icon"]).get("src"),
+            }
+        )
+    return matches
+
+
+def uncached_row_xpaths(i: int) -> dict[str, str]:
+    build, join = xp.xpath.__wrapped__, xp.join.__wrapped__
+    row = f"{build('a', class_='match-item')}[{i}]"
+    return {
+        "href": row,
+        "date": join(row, build("div", class_="match-item-date")),
+        "home": join(row, build("div", class_="match-item-vs-team-name"), "div"),
+        "home_score": join(row, build("div", class_="match-item-vs-team-score")),
+        "event": join(row, build("div", class_="match-item-event")),
+        "icon": join(row, build("img", class_="match-item-icon")),
+    }
+
+
+MATCH_SCHEMA = xp.Rows(
+    xp.xpath("a", class_="match-item"),
+    {
+        "href": xp.Field(".", "href"),
+        "date": xp.Field(xp.xpath("div", class_="match-item-date")),
+        "home": xp.Field(
+            xp.join(xp.xpath("div", class_="match-item-vs-team-name"), "div")
+        ),
+        "home_score": xp.Field(xp.xpath("div", class_="match-item-vs-team-score")),
+        "event": xp.Field(xp.xpath("div", class_="match-item-event")),
+        "icon": xp.Field(xp.xpath("img", class_="match-item-icon"), "src"),
+    },
+)
+
+
+def extract_schema(parser: XpathParser, rows: int) -> list[dict]:
+    return parser.extract(MATCH_SCHEMA)
+
+
+def per_page(extract, parser: XpathParser, rows: int) -> float:
+    return (
+        min(timeit.repeat(lambda: extract(parser, rows), number=PAGES, repeat=3))
+        / PAGES
+    )
+
+
+def main() -> None:
+    rows = 100
+    parser = XpathParser.from_content(
+        "https://example.com/matches", match_list_page(rows)
+    )
+    assert (
+        extract_compiled(parser, rows)
+        == extract_uncompiled(parser, rows)
+        == extract_schema(parser, rows)
+    )
+
+    uncompiled = per_page(extract_uncompiled, parser, rows)
+    compiled = per_page(extract_compiled, parser, rows)
+    schema = per_page(extract_schema, parser, rows)
+
+    print(f"extraction of {rows} matches ({rows * 6} values) per page")
+    print(f"  raw xpath strings:   {uncompiled * 1000:8.2f} ms/page")
+    print(
+        f"  compiled + memoized: {compiled * 1000:8.2f} ms/page ({uncompiled / compiled:.2f}x)"
+    )
+    print(
+        f"  single pass schema:  {schema * 1000:8.2f} ms/page ({uncompiled / schema:.2f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Deterministic HTML fixtures, shaped like the match listing pages that scrapers spend most of their time on"""
+
+import random
+
+TEAMS = [
+    "Sentinels",
+    "Fnatic",
+    "Paper Rex",
+    "LOUD",
+    "DRX",
+    "NRG",
+    "Team Heretics",
+    "Gen.G",
+    "EDG",
+    "G2",
+]
+
+
+def match_row(i: int, rng: random.Random) -> str:
+    home, away = rng.sample(TEAMS, 2)
+    return f"""
+    <a class="wf-module-item match-item mod-color" href="/{100000 + i}/{home.lower()}-vs-{away.lower()}">
+        <div class="match-item-time">{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}</div>
+        <div class="match-item-date">{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2024</div>
+        <div class="match-item-vs">
+            <div class="match-item-vs-team mod-winner">
+                <div class="match-item-vs-team-name"><div class="text-of">{home}</div></div>
+                <div class="match-item-vs-team-score">{rng.randint(0, 2)}</div>
+            </div>
+            <div class="match-item-vs-team">
+                <div class="match-item-vs-team-name"><div class="text-of">{away}</div></div>
+                <div class="match-item-vs-team-score">{rng.randint(0, 2)}</div>
+            </div>
+        </div>
+        <div class="match-item-event text-of">Champions Tour {2020 + i % 5}
+            <div class="match-item-event-series">Playoffs</div>
+        </div>
+        <img class="match-item-icon" src="/img/event/{i % 40}.png"/>
+    </a>"""
+
+
+def match_list_page(rows: int = 200, seed: int = 0) -> bytes:
+    """Create a match listing page with the given number of match rows
+
+    Args:
+        rows (int, optional): The number of matches on the page. Defaults to 200.
+        seed (int, optional): Seed for the generated data. Defaults to 0.
+
+    Returns:
+        bytes: The page
+    """
+    rng = random.Random(seed)
+    body = "".join(match_row(i, rng) for i in range(rows))
+    return f"""<!DOCTYPE html>
+<html>
+<head><title>Matches</title></head>
+<body>
+    <div class="header"><a href="/">home</a></div>
+    <div class="col mod-1">
+        <div class="wf-card">{body}
+        </div>
+    </div>
+    <div class="footer">footer</div>
+</body>
+</html>""".encode()
@@ -0,0 +1,108 @@
+"""Storage and comparison of benchmark results, so that a change can be measured against the previous run
+
+Every run of a suite is saved to `.benchmarks/<suite>/<timestamp>.json`, along with the commit and python version it
+was run with. Results are a mapping of benchmark name to metrics, for example
+`{"get_team": {"requests_per_sec": 1500.0, "p99_ms": 2.1}}`.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import time
+
+RESULTS_DIRECTORY = ".benchmarks"
+
+# Metrics where a lower value is an improvement
+LOWER_IS_BETTER = ("ms", "ns", "kib", "errors")
+
+
+def percentiles(durations: list[float]) -> dict[str, float]:
+    """Summarize durations (in seconds) as milliseconds"""
+    ordered = sorted(durations)
+    if not ordered:
+        return {}
+
+    def at(p: float) -> float:
+        return ordered[min(int(p * len(ordered)), len(ordered) - 1)] * 1000
+
+    return {
+        "mean_ms": sum(ordered) / len(ordered) * 1000,
+        "p50_ms": at(0.50),
+        "p95_ms": at(0.95),
+        "p99_ms": at(0.99),
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latest(suite: str, directory: str = RESULTS_DIRECTORY) -> dict | None:
+    """Load the most recent saved run of a suite, if there is one"""
+    path = os.path.join(directory, suite)
+    if not os.path.isdir(path):
+        return None
+    runs = sorted(f for f in os.listdir(path) if f.endswith(".json"))
+    if not runs:
+        return None
+    with open(os.path.join(path, runs[-1])) as f:
+        return json.load(f)
+
+
+def save(suite: str, results: dict, directory: str = RESULTS_DIRECTORY) -> str:
+    """Save a run of a suite, returning the path it was saved to"""
+    path = os.path.join(directory, suite)
+    os.makedirs(path, exist_ok=True)
+    file = os.path.join(path, time.strftime("%Y%m%d-%H%M%S") + ".json")
+    with open(file, "w") as f:
+        json.dump(
+            {
+                "suite": suite,
+                "time": time.time(),
+                "commit": _commit(),
+                "python": platform.python_version(),
+                "results": results,
+            },
+            f,
+            indent=2,
+        )
+    return file
+
+
+def compare(results: dict, previous: dict) -> list[str]:
+    """Describe how each metric changed since a previous run, flagging the ones that got worse by more than 10%"""
+    lines = []
+    for name, metrics in results.items():
+        before = previous["results"].get(name, {})
+        for metric, value in metrics.items():
+            old = before.get(metric)
+            if not isinstance(old, (int, float)) or not old:
+                continue
+            change = (value - old) / old
+            worse = -change if not metric.endswith(LOWER_IS_BETTER) else change
+            flag = "  REGRESSION" if worse > 0.10 else ""
+            lines.append(
+                f"{name:30} {metric:18} {old:12.3f} -> {value:12.3f} ({change:+.1%}){flag}"
+            )
+    return lines
+
+
+def report(suite: str, results: dict, store: bool = True) -> None:
+    """Compare a run with the previous run of the suite, then save it"""
+    previous = latest(suite)
+    if previous is not None:
+        print(f"\nchanges since {previous.get('commit') or 'the previous run'}:")
+        for line in compare(results, previous):
+            print(f"  {line}")
+    if store:
+        print(f"\nsaved to {save(suite, results)}")
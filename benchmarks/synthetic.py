@@ -0,0 +1,158 @@
+"""Synthetic `DataSource`s that implement every endpoint without any network access, with configurable latency,
+payload size and failure rate, for benchmarking everything above the data sources
+"""
+
+import random
+import threading
+import time
+
+from flask_esports.api.source import DataSource
+from flask_esports.resources import Match, Player, Team, TeamPlayer
+from flask_esports.resources.team import PlayerTeam, Role
+from flask_esports.source import SourceId
+
+
+class SyntheticFailure(Exception):
+    pass
+
+
+class SyntheticEvent:
+    """`Event` has no fields yet, so events are stood in for"""
+
+    def __init__(self, event_id: int, name: str) -> None:
+        self.event_id = event_id
+        self.name = name
+
+    def to_dict(self) -> dict:
+        return {"id": self.event_id, "name": self.name}
+
+
+def synthetic_source(
+    game: str = "bench",
+    latency: float = 0.0,
+    payload: int = 10,
+    failure_rate: float = 0.0,
+    seed: int = 0,
+) -> type[DataSource]:
+    """Create a `DataSource` implementing every endpoint
+
+    Args:
+        game (str, optional): The game of the resources. Defaults to "bench".
+        latency (float, optional): Seconds each call sleeps for, standing in for a scrape. Defaults to 0.0.
+        payload (int, optional): Number of items in every list returned (matches, players etc.). Defaults to 10.
+        failure_rate (float, optional): Fraction of calls that raise `SyntheticFailure`. Defaults to 0.0.
+        seed (int, optional): Seed of the failures. Defaults to 0.
+
+    Returns:
+        type[DataSource]: The source
+    """
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def call() -> None:
+        if latency:
+            time.sleep(latency)
+        with lock:
+            failed = rng.random() < failure_rate
+        if failed:
+            raise SyntheticFailure()
+
+    def player(i: int) -> Player:
+        return Player(
+            SourceId(game, i),
+            f"player{i}",
+            "Forename",
+            "Surname",
+            f"/img/{i}.png",
+            i % 50,
+        )
+
+    def team(i: int) -> Team:
+        team = Team(SourceId(game, i), f"Team {i}", f"T{i}", f"/img/team/{i}.png", "EU")
+        for p in range(5):
+            team.add_player(i * 10 + p, f"player{i * 10 + p}")
+        team.add_staff(i, "Coach", Role.HEAD_COACH)
+        return team
+
+    def match(i: int) -> Match:
+        return Match(
+            SourceId(game, i),
+            i // 10,
+            f"Match {i}",
+            i % 50,
+            (i + 1) % 50,
+            2,
+            1,
+            1.7e9 + i,
+        )
+
+    class SyntheticSource(DataSource):
+        @staticmethod
+        def get_player(player_id):
+            call()
+            return player(player_id)
+
+        @staticmethod
+        def get_player_matches(player_id, page):
+            call()
+            return [match(player_id * payload + i) for i in range(payload)]
+
+        @staticmethod
+        def get_player_teams(player_id):
+            call()
+            return [PlayerTeam(i, f"Team {i}", 1.6e9) for i in range(payload)]
+
+        @staticmethod
+        def get_team(team_id):
+            call()
+            return team(team_id)
+
+        @staticmethod
+        def get_team_matches(team_id, page):
+            call()
+            return [match(team_id * payload + i) for i in range(payload)]
+
+        @staticmethod
+        def get_team_players(team_id):
+            call()
+            return [TeamPlayer(player(i), 1.6e9, None) for i in range(payload)]
+
+        @staticmethod
+        def get_match(match_id):
+            call()
+            return match(match_id)
+
+        @staticmethod
+        def get_event(event_id):
+            call()
+            return SyntheticEvent(event_id, f"Event {event_id}")
+
+        @staticmethod
+        def get_event_matches(event_id, page=1):
+            call()
+            return [match(event_id * payload + i) for i in range(payload)]
+
+        @staticmethod
+        def get_event_teams(event_id):
+            call()
+            return [team(i) for i in range(payload)]
+
+    return SyntheticSource
+
+
+# Every endpoint of `GameBlueprint` that is served by a `DataSource` (and compound include= requests), as
+# (name, path with an {id})
+ENDPOINTS = [
+    ("get_player", "/player/{id}"),
+    ("get_player_matches", "/player/{id}/matches"),
+    ("get_player_teams", "/player/{id}/teams"),
+    ("get_team", "/team/{id}"),
+    ("get_team_matches", "/team/{id}/matches"),
+    ("get_team_players", "/team/{id}/players"),
+    ("get_match", "/match/{id}"),
+    ("get_event", "/event/{id}"),
+    ("get_event_matches", "/event/{id}/matches"),
+    ("get_event_teams", "/event/{id}/teams"),
+    ("get_team_include", "/team/{id}?include=players,matches"),
+    ("get_match_include", "/match/{id}?include=teams,event"),
+]
@@ -0,0 +1,180 @@
+"""Admission control of game endpoints, so that a traffic spike is shed quickly rather than queueing every request
+behind slow scrapes until they all time out
+
+Each request to a game endpoint must be admitted before its `DataSource` work starts. A request is admitted when its
+game has fewer than `Config.ADMISSION_GAME_CONCURRENCY` requests in flight, and its endpoint has fewer than
+`Config.ADMISSION_ENDPOINT_CONCURRENCY`. Otherwise it waits for up to `Config.ADMISSION_QUEUE_TIMEOUT` seconds,
+along with at most `Config.ADMISSION_QUEUE_SIZE` other requests to the game. Requests that find the queue full, or
+that time out waiting, are answered straight away with a 503 and a `Retry-After` header.
+
+A request that fans out into several concurrent fetches (an entity endpoint with `?include=`, for example) is admitted
+with a weight of one per fetch (so one per team when including the teams of a match), so it takes up as many slots as
+the work it starts (capped at the limits, so that it can always be admitted once nothing else is in flight).
+
+Requests that the `DataSource`s can answer from cache (see `DataSource.is_cached`) bypass admission control entirely,
+so cached resources keep being served while scrapes are saturated.
+
+The limits are per process, so with `PreforkServer` they apply to each worker.
+
+Implements:
+    - `AdmissionController`
+    - `Overloaded`, raised when a request is not admitted
+    - `get_admission_controller` / `set_admission_controller`, which manage the controller used by `GameBlueprint`
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+
+from ..config import Config
+
+
+class Overloaded(Exception):
+    """Raised when a request is not admitted"""
+
+    def __init__(self, reason: str, retry_after: int) -> None:
+        """
+        Args:
+            reason (str): Why the request was not admitted, queue_full or timeout
+            retry_after (int): The seconds the client should wait before retrying
+        """
+        super().__init__(f"Request not admitted ({reason})")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    """Limits the requests in flight per game and per endpoint, with a bounded queue of requests waiting for them"""
+
+    def __init__(
+        self,
+        game_concurrency: int | None = None,
+        endpoint_concurrency: int | None = None,
+        queue_size: int | None = None,
+        queue_timeout: float | None = None,
+        retry_after: int | None = None,
+    ) -> None:
+        """
+        Args:
+            game_concurrency (Optional[int], optional): Requests in flight per game. Defaults to
+            `Config.ADMISSION_GAME_CONCURRENCY`.
+            endpoint_concurrency (Optional[int], optional): Requests in flight per endpoint of a game. Defaults to
+            `Config.ADMISSION_ENDPOINT_CONCURRENCY`.
+            queue_size (Optional[int], optional): Requests waiting per game. Defaults to `Config.ADMISSION_QUEUE_SIZE`.
+            queue_timeout (Optional[float], optional): Seconds a request waits before being shed. Defaults to
+            `Config.ADMISSION_QUEUE_TIMEOUT`.
+            retry_after (Optional[int], optional): Seconds shed requests are told to wait. Defaults to
+            `Config.ADMISSION_RETRY_AFTER`.
+        """
+
+        def default(value, setting):
+            return getattr(Config, setting) if value is None else value
+
+        self.game_concurrency = default(game_concurrency, "ADMISSION_GAME_CONCURRENCY")
+        self.endpoint_concurrency = default(
+            endpoint_concurrency, "ADMISSION_ENDPOINT_CONCURRENCY"
+        )
+        self.queue_size = default(queue_size, "ADMISSION_QUEUE_SIZE")
+        self.queue_timeout = default(queue_timeout, "ADMISSION_QUEUE_TIMEOUT")
+        self.retry_after = default(retry_after, "ADMISSION_RETRY_AFTER")
+
+        self._condition = threading.Condition()
+        # Requests in flight, keyed by game and by (game, endpoint)
+        self._in_flight: dict[str | tuple[str, str], int] = {}
+        # Requests waiting, by game
+        self._waiting: dict[str, int] = {}
+
+    def _weights(self, weight: int) -> tuple[int, int]:
+        return (
+            min(weight, self.game_concurrency),
+            min(weight, self.endpoint_concurrency),
+        )
+
+    def _has_capacity(self, game: str, endpoint: str, weight: int) -> bool:
+        game_weight, endpoint_weight = self._weights(weight)
+        return (
+            self._in_flight.get(game, 0) + game_weight <= self.game_concurrency
+            and self._in_flight.get((game, endpoint), 0) + endpoint_weight
+            <= self.endpoint_concurrency
+        )
+
+    def acquire(self, game: str, endpoint: str, weight: int = 1) -> None:
+        """Wait for the request to be admitted. Every successful call must be followed by a call to `release` with
+        the same weight
+
+        Args:
+            game (str): The game of the request
+            endpoint (str): The endpoint of the request
+            weight (int, optional): The slots the request takes up, one per concurrent fetch it makes. Defaults to 1.
+
+        Raises:
+            Overloaded: If the queue is full, or the request is not admitted within the queue timeout
+        """
+        with self._condition:
+            if not self._has_capacity(game, endpoint, weight):
+                if self._waiting.get(game, 0) >= self.queue_size:
+                    raise Overloaded("queue_full", self.retry_after)
+                self._waiting[game] = self._waiting.get(game, 0) + 1
+                try:
+                    admitted = self._condition.wait_for(
+                        lambda: self._has_capacity(game, endpoint, weight),
+                        self.queue_timeout,
+                    )
+                finally:
+                    self._waiting[game] -= 1
+                if not admitted:
+                    raise Overloaded("timeout", self.retry_after)
+            game_weight, endpoint_weight = self._weights(weight)
+            self._in_flight[game] = self._in_flight.get(game, 0) + game_weight
+            self._in_flight[(game, endpoint)] = (
+                self._in_flight.get((game, endpoint), 0) + endpoint_weight
+            )
+
+    def release(self, game: str, endpoint: str, weight: int = 1) -> None:
+        game_weight, endpoint_weight = self._weights(weight)
+        with self._condition:
+            self._in_flight[game] -= game_weight
+            self._in_flight[(game, endpoint)] -= endpoint_weight
+            self._condition.notify_all()
+
+    @contextmanager
+    def admit(self, game: str, endpoint: str, weight: int = 1) -> Iterator[None]:
+        """`acquire` and `release` around the body of a `with` block"""
+        self.acquire(game, endpoint, weight)
+        try:
+            yield
+        finally:
+            self.release(game, endpoint, weight)
+
+    def in_flight(self, game: str, endpoint: str | None = None) -> int:
+        """The requests in flight for a game, or for one of its endpoints"""
+        with self._condition:
+            return self._in_flight.get(
+                game if endpoint is None else (game, endpoint), 0
+            )
+
+    def waiting(self, game: str) -> int:
+        """The requests to a game waiting to be admitted"""
+        with self._condition:
+            return self._waiting.get(game, 0)
+
+
+_admission_controller: AdmissionController | None = None
+
+
+def set_admission_controller(controller: AdmissionController | None) -> None:
+    """Set the controller that requests to game endpoints are admitted by"""
+    global _admission_controller
+    _admission_controller = controller
+
+
+def get_admission_controller() -> AdmissionController | None:
+    """Get the controller that requests are admitted by. If none has been set and `Config.ADMISSION_ENABLED` is, one is
+    created from the limits in `Config`
+    """
+    global _admission_controller
+    if _admission_controller is None and Config.ADMISSION_ENABLED:
+        _admission_controller = AdmissionController()
+    return _admission_controller
@@ -1,11 +1,76 @@
-from typing import Sequence
-
-from flask import Blueprint, Flask, Response, request
-
-from ..app.resources import Match
+import contextvars
+import logging
+import time
+from collections.abc import Sequence
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from flask import Blueprint, Flask, Response, current_app, g, request
+
+from .. import metrics, tracing
+from ..app.db.db import init_app as init_db
+from ..app.db.search import search_resources
+from ..config import Config
+from ..resources import Match
+from ..scraping.xpath import share_pages
 from ..utils.decorators import require_int
+from .admission import Overloaded, get_admission_controller
+from .response import Message, ResponseFactory
+from .scheduler import PAGED_RESOURCES, get_crawl_scheduler
 from .source import DataSource
-from .response import ResponseFactory, Message
+
+logger = logging.getLogger(__name__)
+
+MAX_SEARCH_RESULTS = 50
+
+# The related resources that each entity endpoint can include in its response (?include=players,matches), as
+# include -> the resource fetched for it
+INCLUDES = {
+    "player": {"matches": "player_matches", "teams": "player_teams"},
+    "team": {"players": "team_players", "matches": "team_matches"},
+    "match": {"event": "event", "teams": "team"},
+    "event": {"matches": "event_matches", "teams": "event_teams"},
+}
+
+# Includes fetched by ids held by the entity (a single id or a list of them), rather than by the entity's own id
+RELATED_IDS = {
+    ("match", "event"): lambda match: match.event,
+    ("match", "teams"): lambda match: list(match.teams),
+}
+
+# The fetches made for includes of more than one related id (a match has two teams)
+INCLUDE_FETCHES = {("match", "teams"): 2}
+
+
+def include_fetches(res: str, includes: list[str]) -> int:
+    """Count the fetches `GameBlueprint.get_resource_with_includes` makes for a resource and its includes, which is the
+    admission weight of the request and the number of threads the includes are fetched on
+
+    Args:
+        res (str): The resource of the endpoint
+        includes (list[str]): The includes requested, from `GameBlueprint.requested_includes`
+
+    Returns:
+        int: The fetches made, including the fetch of the resource itself
+    """
+    return 1 + sum(INCLUDE_FETCHES.get((res, name), 1) for name in includes)
+
+
+class SourcesFailed(Exception):
+    """Raised when no `DataSource` returned a resource and at least one of them raised, so that an outage is not
+    reported as the resource not being found
+    """
+
+    def __init__(self, game: str, res: str) -> None:
+        super().__init__(f"No {game} data source could get {res}")
+        self.game = game
+        self.res = res
+
+
+def _to_dict(resource: Any) -> Any:
+    if isinstance(resource, list):
+        return [_to_dict(r) for r in resource]
+    return resource.to_dict() if resource is not None else None
 
 
 class GameBlueprint:
@@ -30,6 +95,11 @@ class GameBlueprint:
         self._bp = Blueprint(self.game, import_name)
         self.url = f"/{self.game}"
 
+        if Config.METRICS_ENABLED:
+            self._bp.before_request(self._start_request)
+            self._bp.after_request(self._record_request)
+            self._bp.teardown_request(self._record_failed_request)
+
         # Player endpoints
         self.create_endpoint(
             "/player/<player_id>", "get_player", "player_id", self.get_player
@@ -84,6 +154,11 @@ class GameBlueprint:
             self.get_event_teams,
         )
 
+        # Search
+        self._bp.add_url_rule("/search", "search", self.search)
+
+        self._bp.register_error_handler(SourcesFailed, self._sources_failed)
+
     @staticmethod
     def require_implemented(
         sources: Sequence[DataSource], game: str, callback: str, endpoint: str
@@ -101,7 +176,7 @@ class GameBlueprint:
                 # Does one of our data sources implement the required callback
                 if not any(DataSource.is_implemented(x, callback) for x in sources):
                     return ResponseFactory.error(
-                        GameBlueprint._enpoint_unsupported_msg(game, endpoint)
+                        Message.endpoint_not_supported_error(endpoint, game)
                     )
                 return func(*args, **kwargs)
 
@@ -124,48 +199,270 @@ class GameBlueprint:
             func (callable): the function to call when the endpoint is visited
         """
 
-        @GameBlueprint.reqire_implemented(
+        @GameBlueprint.require_implemented(
             self.sources, self.game, source_method, endpoint
         )
         def create_endpoint():
             @require_int(id_, Message.invalid_identifier_error(id_))
             def get_resource(*args, **kwargs):
-                return func(*args, **kwargs)
+                scheduler = get_crawl_scheduler()
+                if scheduler is not None:
+                    scheduler.record_request(
+                        self.game, source_method.removeprefix("get_"), kwargs[id_]
+                    )
+
+                def serve():
+                    with tracing.span(
+                        f"{self.game}.{source_method}", **{id_: kwargs[id_]}
+                    ):
+                        return func(*args, **kwargs)
+
+                # Requests that can be answered from cache bypass admission control
+                controller = get_admission_controller()
+                if controller is None or self.is_cached(source_method, kwargs[id_]):
+                    return serve()
+                # Entity endpoints fetch each include on a thread of its own, alongside the entity
+                res = source_method.removeprefix("get_")
+                weight = include_fetches(
+                    res,
+                    (self.requested_includes(res) if res in INCLUDES else None) or [],
+                )
+                try:
+                    controller.acquire(self.game, source_method, weight)
+                except Overloaded as e:
+                    metrics.requests_shed_total.inc(self.game, source_method, e.reason)
+                    return ResponseFactory.unavailable(
+                        Message.overloaded_error(self.game), e.retry_after
+                    )
+                try:
+                    return serve()
+                finally:
+                    controller.release(self.game, source_method, weight)
 
             return get_resource
 
         self._bp.add_url_rule(endpoint, source_method, create_endpoint())
 
+    @staticmethod
+    def _start_request() -> None:
+        g._request_start = time.perf_counter()
+
+    def _observe_request(self, status: int) -> None:
+        start = g.pop("_request_start", None)
+        if start is None:
+            return
+        endpoint = (request.endpoint or "").rpartition(".")[2]
+        metrics.requests_total.inc(self.game, endpoint, str(status))
+        metrics.request_duration.observe(
+            time.perf_counter() - start, self.game, endpoint
+        )
+
+    def _record_request(self, response: Response) -> Response:
+        self._observe_request(response.status_code)
+        return response
+
+    def _record_failed_request(self, exc: BaseException | None) -> None:
+        # Requests that raised never reach after_request
+        if exc is not None:
+            self._observe_request(500)
+
+    def _sources_failed(self, e: SourcesFailed) -> Response:
+        return ResponseFactory.unavailable(
+            Message.sources_failed_error(self.game), Config.SOURCES_RETRY_AFTER
+        )
+
+    def is_cached(self, source_method: str, id_: int) -> bool:
+        """Determine whether a request can be answered from cache, by asking the first `DataSource` implementing the
+        method (the first one `get_resource_fcf` calls)
+
+        Args:
+            source_method (str): The `DataSource` method the request needs
+            id_ (int): The id of the resource requested
+
+        Returns:
+            bool: Whether the request can be answered from cache
+        """
+        page = (
+            request.args.get("page", 1, type=int)
+            if source_method.removeprefix("get_") in PAGED_RESOURCES
+            else None
+        )
+        for source in self.sources:
+            if DataSource.is_implemented(source, source_method):
+                try:
+                    return source.is_cached(source_method, id_, page)
+                except Exception:
+                    logger.exception("%s failed to check the cache", source)
+                    return False
+        return False
+
     def get_resource_fcf(self, res: str, *args, **kwargs):
         """Get the given resource using the first-come-first idiom, IE the first data source that returns a valid response
-        is the one that is prioritised
+        is the one that is prioritised. A data source that raises an error is logged and skipped
 
         Args:
             res (str): The resource to get. getattr(source, get_res) will be the function called for each data source
 
         Returns:
-            _type_: _description_
+            _type_: The resource returned by the first data source that has it, or None if none of them do
+
+        Raises:
+            SourcesFailed: If no data source returned the resource and any of them raised an error. Game endpoints
+            respond to it with a 503
+        """
+        error = None
+        for source in self.sources:
+            name = getattr(source, "__name__", type(source).__name__)
+            start = time.perf_counter()
+            try:
+                with tracing.span("datasource", source=name, resource=res):
+                    resource = getattr(source, f"get_{res}")(*args, **kwargs)
+            except Exception as e:
+                logger.exception("%s failed to get %s %s", name, res, args)
+                outcome, resource, error = "error", None, e
+            else:
+                outcome = (
+                    "empty"
+                    if resource is None or (isinstance(resource, list) and not resource)
+                    else "success"
+                )
+            metrics.source_call_duration.observe(
+                time.perf_counter() - start, self.game, res, name
+            )
+            metrics.source_calls_total.inc(self.game, res, name, outcome)
+            if outcome == "success":
+                self._mark_fetched(res, args, kwargs)
+                return resource
+        if error is not None:
+            raise SourcesFailed(self.game, res) from error
+        return None
+
+    def _mark_fetched(self, res: str, args: tuple, kwargs: dict) -> None:
+        # Resources fetched for requests are fresh, so the crawl scheduler need not refresh them yet
+        scheduler = get_crawl_scheduler()
+        if scheduler is None or not args:
+            return
+        page = kwargs.get("page", args[1] if len(args) > 1 else 1)
+        # Paginated resources are refreshed from their first page
+        if str(page) == "1":
+            scheduler.mark_fetched(self.game, res, args[0])
+
+    def requested_includes(self, res: str) -> list[str] | None:
+        """Get the related resources requested with the include parameter, for example `/team/2?include=players,matches`
+
+        Args:
+            res (str): The resource of the endpoint (player, team, match or event)
+
+        Returns:
+            Optional[list[str]]: The includes requested (empty if there are none), or None if any of them are not
+            includes of the resource
         """
-        resources = filter(
-            lambda x: x is not None and x != [],
-            [getattr(f"get_{res}", res)(*args, **kwargs) for source in self.sources],
-        )
-        return next(resources)
+        names = request.args.get("include", "").split(",")
+        includes = list(dict.fromkeys(n.strip() for n in names if n.strip()))
+        if any(name not in INCLUDES[res] for name in includes):
+            return None
+        return includes
+
+    def get_resource_with_includes(
+        self, res: str, id_: int, includes: list[str]
+    ) -> tuple[Any, dict[str, Any]]:
+        """Get a resource along with its related resources, resolving them concurrently so that a compound request
+        takes about as long as its slowest part. Includes fetched by ids held by the resource (the teams of a match,
+        for example) are started as soon as the resource has been fetched
+
+        Each fetch runs in a copy of the request's context, so its spans belong to the request's trace, and the fetches
+        share any page they scrape in common (see `scraping.xpath.share_pages`). Each fetch on a worker thread pushes
+        an app context of its own, as SQLite connections (kept in `g`, see `app.db.db.get_db`) cannot be shared between
+        threads. Its connections are closed when the fetch finishes
+
+        Args:
+            res (str): The resource to get
+            id_ (int): The id of the resource
+            includes (list[str]): The includes to resolve, from `requested_includes`
+
+        Returns:
+            tuple[Any, dict[str, Any]]: The resource (or None), and each include's resource(s) (None where it could not
+            be fetched)
+        """
+        if not includes:
+            return self.get_resource_fcf(res, id_), {}
+        page = request.args.get("page", 1, type=int)
+        app = current_app._get_current_object()
+
+        def fetch(related: str, related_id: int | None):
+            if related_id is None:
+                return None
+            kwargs = {"page": page} if related in PAGED_RESOURCES else {}
+            try:
+                return self.get_resource_fcf(related, related_id, **kwargs)
+            except SourcesFailed:
+                # Already logged, and a missing include should not fail the whole response
+                return None
+
+        # One thread per include fetch, as many as the request was admitted for. Should a resource hold more related
+        # ids than counted, their fetches wait for a thread rather than exceeding the admitted weight
+        workers = include_fetches(res, includes) - 1
+        with share_pages(), ThreadPoolExecutor(workers, "include") as pool:
+
+            def fetch_in_app_context(related: str, related_id: int | None):
+                with app.app_context():
+                    return fetch(related, related_id)
+
+            def submit(name: str, related_id: int | None):
+                context = contextvars.copy_context()
+                return pool.submit(
+                    context.run, fetch_in_app_context, INCLUDES[res][name], related_id
+                )
+
+            futures = {
+                name: submit(name, id_)
+                for name in includes
+                if (res, name) not in RELATED_IDS
+            }
+            resource = self.get_resource_fcf(res, id_)
+            for name in includes:
+                if (res, name) in RELATED_IDS and resource is not None:
+                    ids = RELATED_IDS[(res, name)](resource)
+                    futures[name] = (
+                        [submit(name, i) for i in ids]
+                        if isinstance(ids, list)
+                        else submit(name, ids)
+                    )
+
+            included = dict.fromkeys(includes)
+            for name, future in futures.items():
+                included[name] = (
+                    [f.result() for f in future]
+                    if isinstance(future, list)
+                    else future.result()
+                )
+        return resource, included
+
+    def get_entity(self, res: str, id_: int, error_message: str) -> Response:
+        """Respond with a resource, along with any related resources requested with the include parameter (under the
+        included key of the resource)
+        """
+        includes = self.requested_includes(res)
+        if includes is None:
+            return ResponseFactory.error(
+                Message.invalid_include_error(res, list(INCLUDES[res]))
+            )
+        resource, included = self.get_resource_with_includes(res, id_, includes)
+        if resource is None:
+            return ResponseFactory.error(error_message)
+
+        data = resource.to_dict()
+        if includes:
+            data["included"] = {name: _to_dict(r) for name, r in included.items()}
+        return ResponseFactory.success(data)
 
     def get_resource_priority(self, res: str, priorty: DataSource, *args, **kwargs):
         return getattr(priorty, f"get_{res}")(*args, **kwargs) or self.get_resource_fcf(
-            res
+            res, *args, **kwargs
         )
 
     def get_player(self, player_id: int) -> Response:
-        # Fetch the data
-        player = self.get_resource_fcf("player", player_id)
-        # Return the palyer data if it exists
-        return ResponseFactory.conditional(
-            player is not None,
-            player.to_dict() if player else None,
-            "This player does not exist",
-        )
+        return self.get_entity("player", player_id, "This player does not exist")
 
     def get_player_matches(self, player_id: int) -> Response:
         player_matches: list[Match] = self.get_resource_fcf(
@@ -184,11 +481,8 @@ class GameBlueprint:
         )
 
     def get_team(self, team_id: int):
-        team = self.get_resource_fcf("team", team_id)
-        return ResponseFactory.conditional(
-            team,
-            team.to_dict() if team else {},
-            "No team with the given team_id could be found",
+        return self.get_entity(
+            "team", team_id, "No team with the given team_id could be found"
         )
 
     def get_team_matches(self, team_id: int):
@@ -210,18 +504,10 @@ class GameBlueprint:
         )
 
     def get_match(self, match_id: int):
-        match = self.source.get_resource_fcf("match", match_id)
-        return ResponseFactory.conditional(
-            match,
-            match.to_dict() if match else {},
-            "There was no match to be found",
-        )
+        return self.get_entity("match", match_id, "There was no match to be found")
 
     def get_event(self, event_id: int):
-        event = self.get_resource_fcf("event", event_id)
-        return ResponseFactory.conditional(
-            event, event.to_dict() if event else {}, "No event could be found"
-        )
+        return self.get_entity("event", event_id, "No event could be found")
 
     def get_event_matches(self, event_id: int):
         matches = self.get_resource_fcf("event_matches", event_id)
@@ -235,6 +521,17 @@ class GameBlueprint:
             teams, [team.to_dict() for team in teams], "No teams found"
         )
 
+    def search(self) -> Response:
+        """Search the players and teams of this game stored in the database, by name. Matches on the prefix of each
+        word so that it can be used for typeahead, for example `/search?q=sen te&limit=5`
+        """
+        text = request.args.get("q", "").strip()
+        if not text:
+            return ResponseFactory.error(Message.missing_parameter_error("q"))
+
+        limit = min(max(request.args.get("limit", 10, type=int), 1), MAX_SEARCH_RESULTS)
+        return ResponseFactory.success(search_resources(self.game, text, limit))
+
     def register(self, app: Flask) -> None:
         """Registers this blueprint with the given app
 
@@ -242,3 +539,4 @@ class GameBlueprint:
             app (Flask): Flask app to register the blueprint to
         """
         app.register_blueprint(self._bp, url_prefix=self.url)
+        init_db(app)
@@ -5,6 +5,8 @@ If the response style of the application should be changed, it can be done so by
 
 from flask import Response, jsonify
 
+from .. import tracing
+
 
 class Message:
     @staticmethod
@@ -34,10 +36,44 @@ class Message:
         """
         return f"The given value of {name} is invalid. It must be an integer value."
 
+    @staticmethod
+    def missing_parameter_error(name: str) -> str:
+        """Create a standardized error message indicating that a required query parameter was not given
+
+        Args:
+            name (str): the name of the missing parameter
+
+        Returns:
+            str: the error message
+        """
+        return f"The {name} parameter is required for this endpoint."
+
     @staticmethod
     def resource_not_found_error(res: str, id_: str) -> str:
         return f"The {res} with the given id {id_} could not be found. Please check your ID and try again."
 
+    @staticmethod
+    def invalid_include_error(res: str, includes: list[str]) -> str:
+        """Create a standardized error message indicating that the include parameter asked for something that cannot
+        be included with the resource
+
+        Args:
+            res (str): the resource of the endpoint
+            includes (list[str]): the includes the resource supports
+
+        Returns:
+            str: the error message
+        """
+        return f"The include parameter of a {res} must be a comma separated list of: {', '.join(includes)}."
+
+    @staticmethod
+    def overloaded_error(game: str = "") -> str:
+        return f"The {game or 'standard'} API is handling too many requests. Please try again later."
+
+    @staticmethod
+    def sources_failed_error(game: str = "") -> str:
+        return f"The {game or 'standard'} API could not reach any of its data sources. Please try again later."
+
 
 class ResponseFactory:
     """Static class containing functions used to generate API responses.\n
@@ -45,6 +81,7 @@ class ResponseFactory:
     - `ResponseFactory.success` for a successful request
     - `ResponseFactory.error` for an unsuccessful request
     - `ResponseFactory.conditional` to simplify conditional responses
+    - `ResponseFactory.unavailable` when a request is shed under load, or cannot reach any data source
     """
 
     @staticmethod
@@ -58,7 +95,8 @@ class ResponseFactory:
         Returns:
             Response: A flask `Response` indicating an unsuccessful request
         """
-        return jsonify({"success": False, "data": {"error-message": error_message}})
+        with tracing.span("serialize"):
+            return jsonify({"success": False, "data": {"error-message": error_message}})
 
     @staticmethod
     def success(data: list | dict) -> Response:
@@ -70,7 +108,25 @@ class ResponseFactory:
         Returns:
             Response: A flask `Response` indicating a successful request, with any data
         """
-        return jsonify({"success": True, "data": data})
+        with tracing.span("serialize"):
+            return jsonify({"success": True, "data": data})
+
+    @staticmethod
+    def unavailable(error_message: str, retry_after: int) -> Response:
+        """Creates a 503 response telling the client to retry the request later, for when the API is overloaded or
+        its data sources are failing
+
+        Args:
+            error_message (str): The message to include in the response indicating why the request was not served
+            retry_after (int): The seconds the client should wait before retrying, sent in the `Retry-After` header
+
+        Returns:
+            Response: A flask `Response` with a 503 status
+        """
+        response = jsonify({"success": False, "data": {"error-message": error_message}})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(retry_after)
+        return response
 
     @staticmethod
     def conditional(
@@ -86,9 +142,10 @@ class ResponseFactory:
         Returns:
             Response: The generated flask `Response` based on the `condition`
         """
-        return jsonify(
-            {
-                "success": True if condition else False,
-                "data": data if condition else {"error-message": msg},
-            }
-        )
+        with tracing.span("serialize"):
+            return jsonify(
+                {
+                    "success": True if condition else False,
+                    "data": data if condition else {"error-message": msg},
+                }
+            )
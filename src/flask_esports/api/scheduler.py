@@ -0,0 +1,388 @@
+"""This module implements a background crawl scheduler, which keeps the resources that are actually being requested
+fresh rather than waiting for a user to request them once they have gone stale.
+
+Every request to a resource endpoint is recorded by `GameBlueprint` (when a scheduler has been set with
+`set_crawl_scheduler`), keyed by (game, resource, id). Each key is scored by its popularity (the number of recent
+requests, decaying exponentially) multiplied by its staleness (the time since it was last fetched, relative to
+`Config.CRAWL_MAX_AGE`). Worker threads refresh the highest scoring keys through the blueprint's `DataSource`s, within
+a global and a per-game request budget, and hand every refreshed resource to the registered refresh callbacks, which
+should persist it and push it into whatever cache is in front of the API. With a `ChangeTracker` (see
+`scraping.changes`), resources that are unchanged since they were last refreshed are not handed to the callbacks, and
+the hashes of a refresh are only recorded once every callback has succeeded. For example:
+
+    scheduler = CrawlScheduler({"valorant": router}, app=app)
+    scheduler.add_refresh_callback(lambda game, resource, id_, value: cache.set((game, resource, id_), value))
+    set_crawl_scheduler(scheduler)
+    scheduler.start()
+
+Implements:
+    - `CrawlScheduler`
+    - `get_crawl_scheduler` / `set_crawl_scheduler`, which manage the scheduler that requests are recorded with
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+import logging
+import math
+import threading
+import time
+from collections.abc import Callable
+from contextlib import ExitStack
+from typing import TYPE_CHECKING, Any
+
+from flask import Flask
+
+from ..config import Config
+from ..scraping.changes import ChangeSet, ChangeTracker, get_change_tracker
+from ..scraping.engine import TokenBucket
+from ..scraping.xpath import XpathParser, prefetch, share_pages
+
+if TYPE_CHECKING:
+    from .blueprint import GameBlueprint
+
+logger = logging.getLogger(__name__)
+
+# (game, resource, id), where resource is the `DataSource` method without its get_ prefix
+JobKey = tuple[str, str, int]
+RefreshCallback = Callable[[str, str, int, Any], None]
+
+# Paginated resources are refreshed from their first page
+PAGED_RESOURCES = frozenset(("player_matches", "team_matches", "event_matches"))
+
+# Keys whose popularity decays below this are forgotten
+MIN_POPULARITY = 0.01
+# The heap is compacted once it holds this many times as many entries as there are jobs
+HEAP_COMPACTION_RATIO = 2
+
+
+class _Job:
+    __slots__ = ("in_flight", "last_fetched", "popularity", "updated", "version")
+
+    def __init__(self, now: float) -> None:
+        self.popularity = 0.0
+        self.updated = now
+        self.last_fetched: float | None = None
+        self.version = 0
+        self.in_flight = False
+
+
+class CrawlScheduler:
+    """A priority queue of refresh jobs, and the worker threads that refresh them. Thread safe"""
+
+    def __init__(
+        self,
+        blueprints: dict[str, GameBlueprint],
+        app: Flask | None = None,
+        workers: int | None = None,
+        rate: float | None = None,
+        game_rate: float | None = None,
+        max_age: float | None = None,
+        min_interval: float | None = None,
+        half_life: float | None = None,
+        clock: Callable[[], float] = time.time,
+        tracker: ChangeTracker | None = None,
+    ) -> None:
+        """
+        Args:
+            blueprints (dict[str, GameBlueprint]): The blueprint of each game, whose `DataSource`s resources are
+            refreshed through
+            app (Optional[Flask], optional): The app to refresh resources within the context of. Defaults to None.
+            workers (Optional[int], optional): Number of worker threads. Defaults to `Config.CRAWL_WORKERS`.
+            rate (Optional[float], optional): Refreshes per second across every game. Defaults to `Config.CRAWL_RATE`.
+            game_rate (Optional[float], optional): Refreshes per second of each game. Defaults to
+            `Config.CRAWL_GAME_RATE`.
+            max_age (Optional[float], optional): Seconds after which a resource counts as fully stale. Defaults to
+            `Config.CRAWL_MAX_AGE`.
+            min_interval (Optional[float], optional): Minimum seconds between refreshes of the same resource.
+            Defaults to `Config.CRAWL_MIN_INTERVAL`.
+            half_life (Optional[float], optional): Seconds for the popularity of a resource to halve. Defaults to
+            `Config.CRAWL_POPULARITY_HALF_LIFE`.
+            clock (Callable[[], float], optional): The clock to measure popularity and staleness with. Defaults to
+            `time.time`.
+            tracker (Optional[ChangeTracker], optional): The tracker to skip unchanged resources with. Defaults to the
+            default tracker (see `scraping.changes`), if there is one.
+        """
+        self.blueprints = blueprints
+        self.app = app
+        self.workers = workers or Config.CRAWL_WORKERS
+        self.max_age = max_age or Config.CRAWL_MAX_AGE
+        self.min_interval = (
+            Config.CRAWL_MIN_INTERVAL if min_interval is None else min_interval
+        )
+        self.half_life = half_life or Config.CRAWL_POPULARITY_HALF_LIFE
+        self.clock = clock
+        self.tracker = tracker
+
+        rate = rate or Config.CRAWL_RATE
+        self.game_rate = game_rate or Config.CRAWL_GAME_RATE
+        self._bucket = TokenBucket(rate, max(rate, 1))
+        self._game_buckets: dict[str, TokenBucket] = {}
+
+        self._jobs: dict[JobKey, _Job] = {}
+        # Entries are (-score, sequence, version, key). Scores grow stale as time passes, so they are recomputed
+        # when popped
+        self._heap: list[tuple[float, int, int, JobKey]] = []
+        # Keys refreshed too recently to be refreshed again, as (eligible at, key)
+        self._waiting: list[tuple[float, JobKey]] = []
+        self._sequence = itertools.count()
+        self._callbacks: list[RefreshCallback] = []
+        self._condition = threading.Condition()
+        self._threads: list[threading.Thread] = []
+        self._stopping = False
+
+        self.refreshed = 0
+        self.failed = 0
+        # Refreshes that were not handed to the callbacks, as the resource was unchanged
+        self.unchanged = 0
+
+    def add_refresh_callback(self, callback: RefreshCallback) -> None:
+        """Register a function to call with (game, resource, id, value) after every successful refresh"""
+        self._callbacks.append(callback)
+
+    def _decayed(self, job: _Job, now: float) -> float:
+        return job.popularity * math.pow(0.5, (now - job.updated) / self.half_life)
+
+    def _score(self, job: _Job, now: float) -> float:
+        age = self.max_age if job.last_fetched is None else now - job.last_fetched
+        return self._decayed(job, now) * age / self.max_age
+
+    def _push(self, key: JobKey, job: _Job, now: float) -> None:
+        job.version += 1
+        heapq.heappush(
+            self._heap,
+            (-self._score(job, now), next(self._sequence), job.version, key),
+        )
+        # Every push leaves the key's previous entry behind, so popular keys would grow the heap without bound
+        if len(self._heap) > HEAP_COMPACTION_RATIO * max(len(self._jobs), 16):
+            self._compact()
+
+    def _compact(self) -> None:
+        """Drop every entry superseded by a later push of its key, leaving at most one entry per job"""
+        self._heap = [
+            entry
+            for entry in self._heap
+            if (job := self._jobs.get(entry[3])) is not None
+            and job.version == entry[2]
+            and not job.in_flight
+        ]
+        heapq.heapify(self._heap)
+
+    def score(self, game: str, resource: str, id_: int) -> float:
+        """Get the current priority of a resource (0 if it is not known)"""
+        with self._condition:
+            job = self._jobs.get((game, resource, id_))
+            return self._score(job, self.clock()) if job else 0.0
+
+    def record_request(self, game: str, resource: str, id_: int) -> None:
+        """Record that a resource has been requested, raising its priority"""
+        key = (game, resource, int(id_))
+        with self._condition:
+            now = self.clock()
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._jobs[key] = _Job(now)
+            job.popularity = self._decayed(job, now) + 1
+            job.updated = now
+            if not job.in_flight and self._eligible_at(job) <= now:
+                self._push(key, job, now)
+                self._condition.notify()
+
+    def mark_fetched(
+        self, game: str, resource: str, id_: int, at: float | None = None
+    ) -> None:
+        """Record that a resource has been fetched outside of the scheduler (by a request for it, for example), at
+        the given time (defaults to now)
+        """
+        with self._condition:
+            job = self._jobs.get((game, resource, int(id_)))
+            if job is not None:
+                job.last_fetched = self.clock() if at is None else at
+
+    def _eligible_at(self, job: _Job) -> float:
+        return (
+            -math.inf
+            if job.last_fetched is None
+            else job.last_fetched + self.min_interval
+        )
+
+    def next_job(self) -> JobKey | None:
+        """Take the highest priority resource that is due a refresh off the queue
+
+        Returns:
+            Optional[JobKey]: The (game, resource, id) to refresh, or None if nothing is due
+        """
+        with self._condition:
+            now = self.clock()
+            while self._waiting and self._waiting[0][0] <= now:
+                key = heapq.heappop(self._waiting)[1]
+                if key in self._jobs:
+                    self._push(key, self._jobs[key], now)
+
+            while self._heap:
+                _, _, version, key = heapq.heappop(self._heap)
+                job = self._jobs.get(key)
+                if job is None or job.version != version or job.in_flight:
+                    continue
+                if self._decayed(job, now) < MIN_POPULARITY:
+                    del self._jobs[key]
+                    continue
+                if self._eligible_at(job) > now:
+                    heapq.heappush(self._waiting, (self._eligible_at(job), key))
+                    continue
+
+                # Stored scores go stale, as popularity decays while staleness grows, so the popped key is only taken
+                # if its current score still beats the best stored score left in the queue
+                score = self._score(job, now)
+                if self._heap and score < -self._heap[0][0]:
+                    self._push(key, job, now)
+                    continue
+
+                job.in_flight = True
+                return key
+            return None
+
+    def _game_bucket(self, game: str) -> TokenBucket:
+        with self._condition:
+            bucket = self._game_buckets.get(game)
+            if bucket is None:
+                bucket = self._game_buckets[game] = TokenBucket(
+                    self.game_rate, max(self.game_rate, 1)
+                )
+            return bucket
+
+    def refresh(self, key: JobKey) -> Any:
+        """Fetch a resource through its game's blueprint and pass it to the refresh callbacks, waiting for the
+        global and per-game budgets first. With a `ChangeTracker`, the pages the resource was last extracted from
+        are fetched first, and if none of them changed the resource is not extracted at all. Otherwise unchanged
+        resources are still not passed to the callbacks. The resource is requeued once it is eligible for another
+        refresh
+
+        Args:
+            key (JobKey): The (game, resource, id) to refresh
+
+        Returns:
+            Any: The refreshed resource, or None if no `DataSource` returned it (or its pages were unchanged)
+        """
+        game, resource, id_ = key
+        self._bucket.acquire_blocking()
+        self._game_bucket(game).acquire_blocking()
+
+        value = None
+        try:
+            kwargs = {"page": 1} if resource in PAGED_RESOURCES else {}
+            tracker = self.tracker or get_change_tracker()
+            with ExitStack() as stack:
+                if self.app is not None:
+                    stack.enter_context(self.app.app_context())
+                changes = (
+                    stack.enter_context(tracker.changes(f"{game}/{resource}/{id_}"))
+                    if tracker is not None
+                    else None
+                )
+                if changes is not None:
+                    # Pages fetched to check them are reused by the DataSource if any of them changed
+                    stack.enter_context(share_pages())
+                if changes is not None and self._pages_unchanged(changes):
+                    self._count("unchanged")
+                else:
+                    value = self.blueprints[game].get_resource_fcf(
+                        resource, id_, **kwargs
+                    )
+            if value is not None:
+                if changes is not None and not changes.resource_changed(
+                    game, resource, id_, value
+                ):
+                    self._count("unchanged")
+                else:
+                    for callback in self._callbacks:
+                        callback(game, resource, id_, value)
+                # Only recorded once persisted, so a failed callback is retried by the next refresh
+                if changes is not None:
+                    changes.commit()
+        except Exception:
+            logger.exception("Failed to refresh %s %s %s", game, resource, id_)
+            self._count("failed")
+        else:
+            self._count("refreshed")
+        finally:
+            with self._condition:
+                job = self._jobs.get(key)
+                if job is not None:
+                    job.in_flight = False
+                    job.last_fetched = self.clock()
+                    heapq.heappush(self._waiting, (self._eligible_at(job), key))
+        return value
+
+    def _count(self, outcome: str) -> None:
+        # Refreshes run on every worker thread at once
+        with self._condition:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    @staticmethod
+    def _pages_unchanged(changes: ChangeSet) -> bool:
+        """Fetch the pages last committed for the change set's scope, returning whether every one of them was checked
+        and unchanged (in which case whatever was extracted from them is unchanged too)
+        """
+        urls = changes.tracker.pages(changes.scope)
+        if not urls:
+            return False
+        prefetch([XpathParser(url, lazy=True) for url in urls])
+        return changes.pages_changed is False
+
+    def run_once(self) -> JobKey | None:
+        """Refresh the highest priority resource that is due, if there is one
+
+        Returns:
+            Optional[JobKey]: The (game, resource, id) that was refreshed
+        """
+        key = self.next_job()
+        if key is not None:
+            self.refresh(key)
+        return key
+
+    def _work(self) -> None:
+        while not self._stopping:
+            key = self.next_job()
+            if key is None:
+                # Woken early by new requests, otherwise polled for keys becoming eligible again
+                with self._condition:
+                    self._condition.wait(timeout=1.0)
+                continue
+            self.refresh(key)
+
+    def start(self) -> None:
+        """Start the worker threads"""
+        self._stopping = False
+        for i in range(self.workers - len(self._threads)):
+            thread = threading.Thread(
+                target=self._work, name=f"crawl-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float | None = None) -> None:
+        """Stop the worker threads, waiting for refreshes in progress to finish"""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def __len__(self) -> int:
+        return len(self._jobs)
+
+
+_crawl_scheduler: CrawlScheduler | None = None
+
+
+def set_crawl_scheduler(scheduler: CrawlScheduler | None) -> None:
+    """Set the scheduler that requests are recorded with (None to stop recording them)"""
+    global _crawl_scheduler
+    _crawl_scheduler = scheduler
+
+
+def get_crawl_scheduler() -> CrawlScheduler | None:
+    return _crawl_scheduler
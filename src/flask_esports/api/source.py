@@ -7,10 +7,8 @@ override each of the endpoint methods with their own API calls to get league dat
 
 from __future__ import annotations
 
-from typing import Optional
-
-from ..app.resources import Event, Match, Player, Team
-from ..app.resources.associations import TeamPlayer
+from ..resources import Event, Match, Player, Team
+from ..resources.associations import TeamPlayer
 
 
 class DataSource:
@@ -19,6 +17,7 @@ class DataSource:
     default database is not used
 
     Functions:
+        - `is_cached`
         - `get_player`
         - `get_player_matches`
         - `get_player_teams`
@@ -49,7 +48,23 @@ class DataSource:
             return False
 
     @staticmethod
-    def get_player(player_id: int) -> Optional[Player]:
+    def is_cached(method: str, id_: int, page: int | None = None) -> bool:
+        """Determine whether the source can answer a call without doing any slow work (such as scraping), for example
+        because the pages it would scrape are fresh in the `HttpCache` (see `HttpCache.is_fresh`). Requests that can be
+        answered from cache bypass admission control
+
+        Args:
+            method (str): The method that would be called (get_player, get_team_matches etc.)
+            id_ (int): The id it would be called with
+            page (Optional[int], optional): The page it would be called with, for paginated methods. Defaults to None.
+
+        Returns:
+            bool: Whether the call would be answered from cache. Defaults to False
+        """
+        return False
+
+    @staticmethod
+    def get_player(player_id: int) -> Player | None:
         """Get data from the source about the player represented by the `player_id` given
 
         Args:
@@ -89,7 +104,7 @@ class DataSource:
         return []
 
     @staticmethod
-    def get_team(team_id: int) -> Optional[Team]:
+    def get_team(team_id: int) -> Team | None:
         """Get data from the source regarding a team, given the `team_id` of the team
 
         Args:
@@ -129,7 +144,7 @@ class DataSource:
         return []
 
     @staticmethod
-    def get_match(match_id: int) -> Optional[Match]:
+    def get_match(match_id: int) -> Match | None:
         """Get data from the source regarding the information of the given match
 
         Args:
@@ -141,7 +156,7 @@ class DataSource:
         return None
 
     @staticmethod
-    def get_event(event_id: int) -> Optional[Event]:
+    def get_event(event_id: int) -> Event | None:
         """Get data from the source about the event corresponding to the `event_id`
 
         Args:
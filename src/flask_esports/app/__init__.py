@@ -1,9 +1,58 @@
+"""Creates the flask app, registering the API of every game in `Config.API_ENDPOINT_DIR`
+
+Games are listed from the names of the directories in `Config.API_ENDPOINT_DIR`, without importing them. By default
+each game is only imported the first time a request is made under its url prefix, into its own app, so that startup
+time does not grow with the number of games. Pass `eager=True` to `create_app` (or set `Config.APP_EAGER_GAMES`) to
+import every game up front, for example before forking server workers so that they share the imported modules.
+
+As each lazily imported game is served by its own app, the app-wide request hooks and error handlers of the main app
+are copied onto each game's app when it is created (see `LazyGameDispatcher`). Anything else registered on the main app
+(blueprints, routes, extensions) does not apply under the url prefix of a game.
+
+Implements:
+    - `create_app`
+    - `game_manifest`, which lists the games that can be registered
+    - `register_game`, which imports a game and registers its blueprint with an app
+    - `LazyGameDispatcher`, the WSGI middleware that creates the app of each game on demand
+"""
+
 import os
+import threading
+from collections.abc import Iterable
 from importlib import import_module
 
 from flask import Flask
 
 from ..config import Config
+from ..metrics import metrics_view
+from ..profiling import install_profiling
+from ..tracing import install_exporter
+from .db.db import init_app as init_db
+
+
+def game_manifest(directory: str | None = None) -> list[str]:
+    """List the games in the endpoint directory without importing any of them
+
+    Args:
+        directory (Optional[str], optional): The endpoint directory. Defaults to `Config.API_ENDPOINT_DIR`.
+
+    Returns:
+        list[str]: The name of each game (IE the name of each package in the directory)
+    """
+    directory = directory or Config.API_ENDPOINT_DIR
+    return sorted(
+        name
+        for name in os.listdir(directory)
+        if not name.startswith(("_", "."))
+        and os.path.isdir(os.path.join(directory, name))
+    )
+
+
+def game_module(game: str) -> str:
+    """Get the name of the module holding the router of a game"""
+    directory = os.path.relpath(Config.API_ENDPOINT_DIR, Config.BASE_DIRECTORY)
+    module = directory.replace("\\", "/").replace("/", ".")
+    return f"{module}.{game}"
 
 
 def register_game(app: Flask, game: str) -> None:
@@ -13,21 +62,138 @@ def register_game(app: Flask, game: str) -> None:
         app (Flask): the `Flask` app to register the game API with
         game (str): The name of the game to register (IE the name of the folder that routes.py is in)
     """
-    module = Config.API_ENDPOINT_DIR.replace("\\", "/").replace("/", ".")
-    router = getattr(import_module(f"{module}.{game}"), "router")
+    router = import_module(game_module(game)).router
     router.register(app)
 
 
-def create_app():
+# App-wide hooks, keyed by blueprint name (None for the app itself)
+FORWARDED_HOOKS = (
+    "before_request_funcs",
+    "after_request_funcs",
+    "teardown_request_funcs",
+    "url_value_preprocessors",
+    "url_default_functions",
+    "template_context_processors",
+)
+
+
+def _forward_hooks(source: Flask, target: Flask) -> None:
+    """Register the app-wide request hooks and error handlers of one app on another"""
+    for name in FORWARDED_HOOKS:
+        funcs = getattr(target, name).setdefault(None, [])
+        funcs.extend(f for f in getattr(source, name).get(None, ()) if f not in funcs)
+    target.teardown_appcontext_funcs.extend(
+        f
+        for f in source.teardown_appcontext_funcs
+        if f not in target.teardown_appcontext_funcs
+    )
+    for code, handlers in source.error_handler_spec[None].items():
+        # The game's own handlers take precedence
+        target.error_handler_spec[None][code] = {
+            **handlers,
+            **target.error_handler_spec[None][code],
+        }
+
+
+def create_game_app(game: str, config: dict | None = None) -> Flask:
+    """Create an app serving only the API of the given game
+
+    Args:
+        game (str): The name of the game
+        config (Optional[dict], optional): The config of the app. Defaults to `Config`.
+
+    Returns:
+        Flask: The app
+    """
     app = Flask(__name__)
     app.config.from_object(Config)
+    if config is not None:
+        app.config.update(config)
 
     # We need the app context because if a route is not implemented it defaults to a jsonified error message
     with app.app_context():
-        # Loop through each endpoint directory and register the respective API routers
-        for route in os.listdir(
-            os.path.join(Config.BASE_DIRECTORY, Config.API_ENDPOINT_DIR)
-        ):
-            register_game(app, route)
+        register_game(app, game)
+    return app
+
+
+class LazyGameDispatcher:
+    """WSGI middleware sending requests under the url prefix of a game to that game's app, which is created (and the
+    game imported) on the first request to it. Every other request goes to the main app
+
+    Game apps are given the request hooks, teardown functions and error handlers registered on the main app by the
+    time they are created, so hooks should be registered before the app serves its first request
+    """
+
+    def __init__(self, app: Flask, games: Iterable[str]) -> None:
+        """
+        Args:
+            app (Flask): The main app, whose config every game app copies
+            games (Iterable[str]): The games that can be dispatched to
+        """
+        self.app = app
+        self.games = frozenset(games)
+        self.wsgi_app = app.wsgi_app
+        self._apps: dict[str, Flask] = {}
+        self._lock = threading.Lock()
+
+    def get_app(self, game: str) -> Flask:
+        """Get the app of a game, creating it if this is the first time it is needed"""
+        app = self._apps.get(game)
+        if app is None:
+            with self._lock:
+                app = self._apps.get(game)
+                if app is None:
+                    app = create_game_app(game, self.app.config)
+                    _forward_hooks(self.app, app)
+                    self._apps[game] = app
+        return app
+
+    def is_loaded(self, game: str) -> bool:
+        return game in self._apps
+
+    def load_all(self) -> None:
+        """Create the app of every game now, rather than on demand"""
+        for game in self.games:
+            self.get_app(game)
+
+    def __call__(self, environ: dict, start_response):
+        game = environ.get("PATH_INFO", "").lstrip("/").split("/", 1)[0]
+        if game in self.games:
+            return self.get_app(game).wsgi_app(environ, start_response)
+        return self.wsgi_app(environ, start_response)
+
+
+def create_app(eager: bool | None = None) -> Flask:
+    """Create the app serving the API of every game
+
+    Unless `eager`, each game is served by its own app, created on the first request to the game. Request hooks
+    (`before_request`, `after_request`, `teardown_request`, `teardown_appcontext` etc.) and error handlers registered
+    on the returned app are copied to the game apps as they are created, but blueprints, routes and extensions are
+    not, so register those with `eager=True`.
+
+    Args:
+        eager (Optional[bool], optional): Import and register every game now, rather than on the first request to
+        each game. Defaults to `Config.APP_EAGER_GAMES`.
+
+    Returns:
+        Flask: The app
+    """
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    init_db(app)
+    games = game_manifest()
+
+    if Config.METRICS_ENABLED:
+        app.add_url_rule(Config.METRICS_PATH, "metrics", metrics_view)
+
+    if eager if eager is not None else Config.APP_EAGER_GAMES:
+        # We need the app context because if a route is not implemented it defaults to a jsonified error message
+        with app.app_context():
+            for game in games:
+                register_game(app, game)
+    else:
+        app.wsgi_app = LazyGameDispatcher(app, games)
 
+    install_profiling(app)
+    install_exporter()
     return app
@@ -0,0 +1,317 @@
+"""Encoding of the structured data stored in BLOB columns (`players.additional_data`,
+`match_team_association.additional_data` and match stats)
+
+Every encoded blob starts with a 4 byte header:
+    - 2 magic bytes (`FE`)
+    - the header version
+    - the encoding id (high nibble) and compression id (low nibble)
+
+which means that the encoding and compression used can be changed at any time without breaking blobs that have already
+been written. Blobs without a header are assumed to be plain JSON.
+
+Encodings and compressions are pluggable through `register_encoding` and `register_compression`. Out of the box:
+    - encodings: `json`, and `binary`, a compact tagged binary format that only stores each distinct string once
+    - compressions: `none`, `zlib`, and `zstd` (if the `zstandard` package is installed)
+
+Implements:
+    - `encode_blob`, `decode_blob`
+    - `LazyBlob`, a blob that is only decoded when its value is first accessed
+"""
+
+from __future__ import annotations
+
+import json
+import struct
+import zlib
+from collections.abc import Callable
+from typing import Any
+
+from ...config import Config
+
+MAGIC = b"FE"
+HEADER_VERSION = 1
+HEADER_SIZE = 4
+
+_encodings: dict[str, tuple[int, Callable[[Any], bytes], Callable[[bytes], Any]]] = {}
+_compressions: dict[
+    str, tuple[int, Callable[[bytes], bytes], Callable[[bytes], bytes]]
+] = {}
+
+
+class CodecError(ValueError):
+    """Raised when a blob cannot be encoded or decoded"""
+
+
+def register_encoding(
+    name: str, id_: int, dumps: Callable[[Any], bytes], loads: Callable[[bytes], Any]
+) -> None:
+    """Register an encoding that can be used to serialize blob values
+
+    Args:
+        name (str): The name used to select the encoding (see `Config.BLOB_ENCODING`)
+        id_ (int): The id stored in the blob header. Must be between 0 and 15 and never change once blobs are written
+        dumps (Callable[[Any], bytes]): Serializes a value
+        loads (Callable[[bytes], Any]): Deserializes a value
+    """
+    if not 0 <= id_ < 16:
+        raise CodecError("Encoding ids must be between 0 and 15")
+    _encodings[name] = (id_, dumps, loads)
+
+
+def register_compression(
+    name: str,
+    id_: int,
+    compress: Callable[[bytes], bytes],
+    decompress: Callable[[bytes], bytes],
+) -> None:
+    """Register a compression that can be applied to encoded blobs
+
+    Args:
+        name (str): The name used to select the compression (see `Config.BLOB_COMPRESSION`)
+        id_ (int): The id stored in the blob header. Must be between 0 and 15 and never change once blobs are written
+        compress (Callable[[bytes], bytes]): Compresses the encoded value
+        decompress (Callable[[bytes], bytes]): Decompresses the encoded value
+    """
+    if not 0 <= id_ < 16:
+        raise CodecError("Compression ids must be between 0 and 15")
+    _compressions[name] = (id_, compress, decompress)
+
+
+def _by_id(registry: dict, id_: int) -> tuple:
+    for entry in registry.values():
+        if entry[0] == id_:
+            return entry
+    raise CodecError(f"Unknown codec id {id_}, was it registered?")
+
+
+def encode_blob(
+    value: Any, encoding: str | None = None, compression: str | None = None
+) -> bytes | None:
+    """Encode a value to be stored in a BLOB column
+
+    Args:
+        value (Any): The value to encode. None is stored as NULL
+        encoding (Optional[str], optional): The encoding to use. Defaults to `Config.BLOB_ENCODING`.
+        compression (Optional[str], optional): The compression to use. Defaults to `Config.BLOB_COMPRESSION`, which
+        is only applied to values larger than `Config.BLOB_COMPRESSION_THRESHOLD` bytes.
+
+    Returns:
+        Optional[bytes]: The encoded blob
+    """
+    if value is None:
+        return None
+
+    try:
+        encoding_id, dumps, _ = _encodings[encoding or Config.BLOB_ENCODING]
+    except KeyError as e:
+        raise CodecError(f"Unknown encoding {e}") from e
+    data = dumps(value)
+
+    if compression is None:
+        compression = (
+            Config.BLOB_COMPRESSION
+            if len(data) > Config.BLOB_COMPRESSION_THRESHOLD
+            else "none"
+        )
+    try:
+        compression_id, compress, _ = _compressions[compression]
+    except KeyError as e:
+        raise CodecError(f"Unknown compression {e}") from e
+
+    return (
+        MAGIC
+        + bytes((HEADER_VERSION, encoding_id << 4 | compression_id))
+        + compress(data)
+    )
+
+
+def decode_blob(blob: bytes | str | None) -> Any:
+    """Decode a value read from a BLOB column
+
+    Args:
+        blob (Optional[bytes | str]): The stored blob
+
+    Returns:
+        Any: The decoded value
+    """
+    if blob is None:
+        return None
+    if isinstance(blob, str) or not blob.startswith(MAGIC):
+        return json.loads(blob)
+
+    if blob[2] != HEADER_VERSION:
+        raise CodecError(f"Unsupported blob header version {blob[2]}")
+    _, _, loads = _by_id(_encodings, blob[3] >> 4)
+    _, _, decompress = _by_id(_compressions, blob[3] & 0x0F)
+    return loads(decompress(bytes(blob[HEADER_SIZE:])))
+
+
+class LazyBlob:
+    """An encoded blob that is only decoded the first time its value is accessed, so that list endpoints that never
+    serialize the value never pay for decoding it
+    """
+
+    _UNSET = object()
+
+    def __init__(self, blob: bytes | str | None) -> None:
+        self.blob = blob
+        self._value = LazyBlob._UNSET
+
+    @property
+    def value(self) -> Any:
+        if self._value is LazyBlob._UNSET:
+            self._value = decode_blob(self.blob)
+        return self._value
+
+    def is_decoded(self) -> bool:
+        return self._value is not LazyBlob._UNSET
+
+    def __eq__(self, other: object) -> bool:
+        return self.value == (other.value if isinstance(other, LazyBlob) else other)
+
+    def __repr__(self) -> str:
+        return f"LazyBlob({self.value if self.is_decoded() else '<encoded>'})"
+
+
+def resolve(value: Any) -> Any:
+    """Get the decoded value of `value` if it is a `LazyBlob`, otherwise return it as is"""
+    return value.value if isinstance(value, LazyBlob) else value
+
+
+# Compact binary encoding
+_NONE, _FALSE, _TRUE, _INT, _FLOAT, _STR, _BYTES, _LIST, _DICT, _STR_REF = range(10)
+_double = struct.Struct(">d")
+
+
+def _write_varint(out: bytearray, n: int) -> None:
+    while n > 0x7F:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data: bytes, pos: int) -> tuple[int, int]:
+    n = shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _dump(value: Any, out: bytearray, strings: dict[str, int]) -> None:
+    if value is None:
+        out.append(_NONE)
+    elif value is True or value is False:
+        out.append(_TRUE if value else _FALSE)
+    elif isinstance(value, int):
+        out.append(_INT)
+        _write_varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+    elif isinstance(value, float):
+        out.append(_FLOAT)
+        out += _double.pack(value)
+    elif isinstance(value, str):
+        if value in strings:
+            out.append(_STR_REF)
+            _write_varint(out, strings[value])
+        else:
+            strings[value] = len(strings)
+            encoded = value.encode("utf-8")
+            out.append(_STR)
+            _write_varint(out, len(encoded))
+            out += encoded
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(_BYTES)
+        _write_varint(out, len(value))
+        out += value
+    elif isinstance(value, (list, tuple)):
+        out.append(_LIST)
+        _write_varint(out, len(value))
+        for item in value:
+            _dump(item, out, strings)
+    elif isinstance(value, dict):
+        out.append(_DICT)
+        _write_varint(out, len(value))
+        for k, v in value.items():
+            _dump(k, out, strings)
+            _dump(v, out, strings)
+    else:
+        raise CodecError(f"Cannot encode value of type {type(value).__name__}")
+
+
+def _load(data: bytes, pos: int, strings: list[str]) -> tuple[Any, int]:
+    tag = data[pos]
+    pos += 1
+    if tag == _NONE:
+        return None, pos
+    if tag == _FALSE or tag == _TRUE:
+        return tag == _TRUE, pos
+    if tag == _INT:
+        n, pos = _read_varint(data, pos)
+        return (n >> 1) if not n & 1 else -((n + 1) >> 1), pos
+    if tag == _FLOAT:
+        return _double.unpack_from(data, pos)[0], pos + 8
+    if tag == _STR or tag == _BYTES:
+        size, pos = _read_varint(data, pos)
+        raw = data[pos : pos + size]
+        if tag == _BYTES:
+            return raw, pos + size
+        strings.append(raw.decode("utf-8"))
+        return strings[-1], pos + size
+    if tag == _STR_REF:
+        index, pos = _read_varint(data, pos)
+        return strings[index], pos
+    if tag == _LIST:
+        size, pos = _read_varint(data, pos)
+        items = []
+        for _ in range(size):
+            item, pos = _load(data, pos, strings)
+            items.append(item)
+        return items, pos
+    if tag == _DICT:
+        size, pos = _read_varint(data, pos)
+        d = {}
+        for _ in range(size):
+            k, pos = _load(data, pos, strings)
+            d[k], pos = _load(data, pos, strings)
+        return d, pos
+    raise CodecError(f"Invalid tag {tag} at position {pos - 1}")
+
+
+def binary_dumps(value: Any) -> bytes:
+    out = bytearray()
+    _dump(value, out, {})
+    return bytes(out)
+
+
+def binary_loads(data: bytes) -> Any:
+    value, pos = _load(data, 0, [])
+    if pos != len(data):
+        raise CodecError("Trailing data after encoded value")
+    return value
+
+
+register_encoding(
+    "json",
+    0,
+    lambda v: json.dumps(v, separators=(",", ":")).encode("utf-8"),
+    json.loads,
+)
+register_encoding("binary", 1, binary_dumps, binary_loads)
+
+register_compression("none", 0, lambda b: b, lambda b: b)
+register_compression("zlib", 1, lambda b: zlib.compress(b, 6), zlib.decompress)
+
+try:
+    import zstandard
+
+    register_compression(
+        "zstd",
+        2,
+        lambda b: zstandard.ZstdCompressor(level=3).compress(b),
+        lambda b: zstandard.ZstdDecompressor().decompress(b),
+    )
+except ImportError:
+    pass
@@ -1,11 +1,133 @@
+import logging
 import os
+import re
 import sqlite3
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from typing import Any
 
 from dotenv import load_dotenv
-from flask import g, has_app_context, current_app
+from flask import current_app, g, has_app_context
+
+from ... import tracing
 
 load_dotenv()
-db_handle: sqlite3.Connection | None = None
+# Connections used outside of an app context, per thread as SQLite connections can only be used by the thread that
+# created them (db_handle and shard_handles)
+_handles = threading.local()
+
+logger = logging.getLogger(__name__)
+
+# Called with (query, args, duration in seconds, row count) after every statement run through query_db / update_db
+QueryHook = Callable[[str, tuple, float, int], None]
+_query_hooks: list[QueryHook] = []
+
+_literals = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_placeholder_lists = re.compile(r"\?(?:\s*,\s*\?)+")
+_placeholder_rows = re.compile(r"\(\?(?:, \.\.\.)?\)(?:\s*,\s*\(\?(?:, \.\.\.)?\))+")
+
+
+def normalize_sql(query: str) -> str:
+    """Normalize a SQL statement so that statements that only differ by their literal values or by the number of
+    parameters they take are aggregated together
+
+    For example `SELECT * FROM players WHERE player_id IN (?, ?, ?) AND alias = 'TenZ'` is normalized to
+    `SELECT * FROM players WHERE player_id IN (?, ...) AND alias = ?`
+
+    Args:
+        query (str): The SQL statement
+
+    Returns:
+        str: The normalized statement
+    """
+    query = _literals.sub("?", " ".join(query.split()))
+    query = _placeholder_lists.sub("?, ...", query)
+    return _placeholder_rows.sub(lambda m: m.group(0).split(")")[0] + "), ...", query)
+
+
+class QueryStats:
+    """Thread safe aggregation of the timings of every statement executed, grouped by normalized statement. A bounded
+    window of the most recent durations is kept per statement to calculate percentiles from
+    """
+
+    def __init__(self, window: int = 1024) -> None:
+        self.window = window
+        self._lock = threading.Lock()
+        self._statements: dict[str, dict[str, Any]] = {}
+
+    def record(self, statement: str, duration: float, rows: int) -> None:
+        with self._lock:
+            stats = self._statements.get(statement)
+            if stats is None:
+                stats = self._statements[statement] = {
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "rows": 0,
+                    "durations": deque(maxlen=self.window),
+                }
+            stats["count"] += 1
+            stats["total"] += duration
+            stats["max"] = max(stats["max"], duration)
+            stats["rows"] += rows
+            stats["durations"].append(duration)
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        """Get the aggregated stats of every statement recorded so far
+
+        Returns:
+            dict[str, dict[str, float]]: Stats keyed by normalized statement, with times in milliseconds
+        """
+        with self._lock:
+            statements = {
+                k: (dict(v), sorted(v["durations"]))
+                for k, v in self._statements.items()
+            }
+        return {
+            statement: {
+                "count": stats["count"],
+                "rows": stats["rows"],
+                "total-ms": stats["total"] * 1000,
+                "max-ms": stats["max"] * 1000,
+                "p50-ms": _percentile(durations, 0.50) * 1000,
+                "p99-ms": _percentile(durations, 0.99) * 1000,
+            }
+            for statement, (stats, durations) in statements.items()
+        }
+
+    def reset(self) -> None:
+        with self._lock:
+            self._statements.clear()
+
+
+def _percentile(ordered: list[float], p: float) -> float:
+    return ordered[min(int(p * len(ordered)), len(ordered) - 1)] if ordered else 0.0
+
+
+query_stats = QueryStats()
+
+
+def add_query_hook(hook: QueryHook) -> None:
+    """Register a function to be called after every statement executed with `query_db` or `update_db`
+
+    Args:
+        hook (QueryHook): Called with the query, its arguments, its duration in seconds and the number of rows
+    """
+    _query_hooks.append(hook)
+
+
+def remove_query_hook(hook: QueryHook) -> None:
+    _query_hooks.remove(hook)
+
+
+def _config(key: str, default: Any = None) -> Any:
+    if has_app_context():
+        return current_app.config.get(key, default)
+    from flask_esports.config import Config
+
+    return getattr(Config, key, default)
 
 
 def dict_factory(cursor, row):
@@ -15,7 +137,51 @@ def dict_factory(cursor, row):
     return d
 
 
-def get_db():
+def shard_path(game: str) -> str:
+    """Gets the path of the database file that stores the given game's data when `SQL_SHARD_BY_GAME` is set
+
+    Args:
+        game (str): The game (source) of the shard
+
+    Returns:
+        str: The path of the shard's database file
+    """
+    if not re.match(r"^[a-zA-Z0-9_-]+$", game):
+        raise ValueError(f"{game!r} cannot be used as the name of a database shard")
+    return os.path.join(_config("SQL_SHARD_DIRECTORY"), f"{game}.db")
+
+
+def _connect_shard(game: str) -> sqlite3.Connection:
+    path = shard_path(game)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    new = not os.path.exists(path)
+    db = sqlite3.connect(path)
+    if new:
+        regenerate_db(db)
+    db.row_factory = dict_factory
+    return db
+
+
+def get_db(game: str | None = None):
+    """Gets the database connection for the current context. If `SQL_SHARD_BY_GAME` is set and a game is given, the
+    connection to that game's shard is returned instead of the shared database
+
+    Args:
+        game (Optional[str], optional): The game whose data is being accessed. Defaults to None.
+
+    Returns:
+        sqlite3.Connection: The database connection
+    """
+    if game is not None and _config("SQL_SHARD_BY_GAME", False):
+        if has_app_context():
+            shards = g.setdefault("_shards", {})
+        else:
+            shards = _handles.__dict__.setdefault("shard_handles", {})
+        if game not in shards:
+            shards[game] = _connect_shard(game)
+        return shards[game]
+
     if has_app_context():
         db = getattr(g, "_database", None)
         if db is None:
@@ -28,32 +194,121 @@ def get_db():
     else:
         from flask_esports.config import Config
 
-        global db_handle
+        db_handle = getattr(_handles, "db_handle", None)
         if db_handle is None:
-            db_handle = sqlite3.connect(Config.SQL_DATABASE_URI)
+            db_handle = _handles.db_handle = sqlite3.connect(Config.SQL_DATABASE_URI)
             db_handle.row_factory = dict_factory
         return db_handle
 
 
-def query_db(query, args=(), one=False):
-    cur = get_db().execute(query, args)
-    rv = cur.fetchall()
-    cur.close()
+def close_db(exc: BaseException | None = None) -> None:
+    """Close the connections opened within the current app context, to the shared database and to every shard. Called
+    when each app context is torn down once registered with `init_app`
+    """
+    connections = [g.pop("_database", None), *g.pop("_shards", {}).values()]
+    for db in connections:
+        if db is not None:
+            db.close()
+
+
+def init_app(app) -> None:
+    """Close the database connections of every app context of the app when it is torn down"""
+    if close_db not in app.teardown_appcontext_funcs:
+        app.teardown_appcontext(close_db)
+
+
+def _record_query(
+    db: sqlite3.Connection, query: str, args: tuple, duration: float, rows: int
+) -> None:
+    if _config("QUERY_STATS_ENABLED", True):
+        query_stats.record(normalize_sql(query), duration, rows)
+
+    threshold = _config("SLOW_QUERY_THRESHOLD_MS")
+    if threshold is not None and duration * 1000 >= threshold:
+        try:
+            plan = [
+                r["detail"] if isinstance(r, dict) else r[-1]
+                for r in db.execute(f"EXPLAIN QUERY PLAN {query}", args)
+            ]
+        except sqlite3.Error:
+            plan = []
+        logger.warning(
+            "Slow query (%.1fms, %d rows): %s\n  plan: %s",
+            duration * 1000,
+            rows,
+            normalize_sql(query),
+            "; ".join(plan) or "unavailable",
+        )
+
+    for hook in _query_hooks:
+        hook(query, args, duration, rows)
+
+
+def query_db(query, args=(), one=False, game=None):
+    db = get_db(game)
+    start = time.perf_counter()
+    with tracing.span("db.query", statement=query, game=game):
+        cur = db.execute(query, args)
+        rv = cur.fetchall()
+        cur.close()
+    _record_query(db, query, args, time.perf_counter() - start, len(rv))
     return (rv[0] if rv else None) if one else rv
 
 
-def update_db(query, args=()):
-    cur = get_db().execute(query, args)
-    get_db().commit()
-    cur.close()
+def update_db(query, args=(), game=None):
+    db = get_db(game)
+    start = time.perf_counter()
+    with tracing.span("db.update", statement=query, game=game):
+        cur = db.execute(query, args)
+        db.commit()
+        rows = cur.rowcount
+        cur.close()
+    _record_query(db, query, args, time.perf_counter() - start, max(rows, 0))
+
+
+def attach_shards(db: sqlite3.Connection) -> list[str]:
+    """Attach every game shard in `SQL_SHARD_DIRECTORY` to the given connection, so that admin queries can be run
+    across every game. Each shard is attached under the name of its game, for example
+    `SELECT * FROM valorant.players UNION ALL SELECT * FROM tf2.players`
+
+    SQLite limits the number of attached databases (10 by default)
+
+    Args:
+        db (sqlite3.Connection): The connection to attach the shards to
+
+    Returns:
+        list[str]: The games that were attached
+    """
+    directory = _config("SQL_SHARD_DIRECTORY")
+    attached = {r[1] for r in db.execute("PRAGMA database_list;").fetchall()}
+    games = sorted(
+        f[:-3]
+        for f in (os.listdir(directory) if os.path.isdir(directory) else [])
+        if f.endswith(".db")
+    )
+    for game in games:
+        if game not in attached:
+            db.execute("ATTACH DATABASE ? AS ?;", (shard_path(game), game))
+    return games
+
+
+def get_admin_db() -> sqlite3.Connection:
+    """Gets a new connection to the shared database with every game shard attached to it. The caller is responsible
+    for closing it
+
+    Returns:
+        sqlite3.Connection: The connection
+    """
+    db = sqlite3.connect(_config("SQL_DATABASE_URI"))
+    attach_shards(db)
+    db.row_factory = dict_factory
+    return db
 
 
-def regenerate_db():
+def regenerate_db(db: sqlite3.Connection | None = None):
     with open(
-        os.path.join(
-            current_app.config.get("MODULE_BASE_DIR", ""), "app", "db", "schema.sql"
-        ),
+        os.path.join(_config("MODULE_BASE_DIR", ""), "app", "db", "schema.sql"),
         "r",
     ) as f:
         schema = f.read()
-    get_db().executescript(schema)
+    (db or get_db()).executescript(schema)
@@ -0,0 +1,166 @@
+"""Per-request batching of database lookups
+
+Resolving a resource's related resources one `BasicQuery` at a time results in one database round trip per related
+resource. Instead, a `Loader` collects every `load` call made while a request is being resolved, and issues them as a
+single `BatchQuery` the first time one of the loaded records is actually needed. Every record fetched is kept in the
+loader's identity map, so loading the same record twice within a request never hits the database twice.
+
+Implements:
+    - `Loader`, the batching loader
+    - `Deferred`, the placeholder returned by `Loader.load`
+    - `get_loader`, which gets the loader bound to the current request
+"""
+
+from __future__ import annotations
+
+from typing import Generic, TypeVar
+
+from flask import g, has_app_context
+
+from .query_factory import BatchQuery, _id_column
+
+T = TypeVar("T")
+
+# SQLite limits the number of bound parameters in a single statement, each id takes up two (source, id)
+MAX_BATCH_SIZE = 400
+
+
+class Deferred(Generic[T]):
+    """A record that has been requested from a `Loader` but not necessarily fetched yet. Calling `get` fetches it,
+    along with every other record of the same type that is pending in the loader
+    """
+
+    def __init__(self, loader: Loader, cls: type, id_: int) -> None:
+        self.loader = loader
+        self.cls = cls
+        self.id = id_
+
+    def get(self) -> T | None:
+        """Gets the loaded record, dispatching the pending batch if it has not been fetched yet
+
+        Returns:
+            Optional[T]: The record cast using `cls.from_record`, or None if it does not exist in the database
+        """
+        return self.loader.resolve(self.cls, self.id)
+
+    def __repr__(self) -> str:
+        return f"Deferred({self.cls.__name__}, {self.id})"
+
+
+class Loader:
+    """Collects individual record lookups for a single game and resolves them in batches
+
+    Models passed to the loader must define `TABLENAME` and `from_record` (as with any other `Query`), and can define
+    `ID_COLUMN` if their id column is not named after the class
+    """
+
+    def __init__(self, game: str) -> None:
+        """
+        Args:
+            game (str): The game (source) that the records are loaded from
+        """
+        self.game = game
+
+        self._pending: dict[type, list[int]] = {}
+        self._identity: dict[tuple[type, int], object] = {}
+
+    def load(self, cls: type[T], id_: int) -> Deferred[T]:
+        """Queue a record to be fetched with the next batch
+
+        Args:
+            cls (type[T]): The model of the record to load
+            id_ (int): The id of the record
+
+        Returns:
+            Deferred[T]: Placeholder that fetches the record when `get` is called
+        """
+        id_ = int(id_)
+        if (cls, id_) not in self._identity:
+            pending = self._pending.setdefault(cls, [])
+            if id_ not in pending:
+                pending.append(id_)
+        return Deferred(self, cls, id_)
+
+    def load_many(self, cls: type[T], ids: list[int]) -> list[T | None]:
+        """Load all the given records, fetching any that are not already known with as few queries as possible
+
+        Args:
+            cls (type[T]): The model of the records to load
+            ids (list[int]): The ids of the records
+
+        Returns:
+            list[Optional[T]]: The records in the same order as `ids` (None for records that do not exist)
+        """
+        return [d.get() for d in [self.load(cls, id_) for id_ in ids]]
+
+    def prime(self, cls: type[T], id_: int, obj: T | None) -> None:
+        """Add an already known record to the identity map so that it is never fetched
+
+        Args:
+            cls (type[T]): The model of the record
+            id_ (int): The id of the record
+            obj (Optional[T]): The record
+        """
+        self._identity[(cls, int(id_))] = obj
+
+    def resolve(self, cls: type[T], id_: int) -> T | None:
+        """Get a record from the identity map, dispatching the pending lookups for its model if needed
+
+        Args:
+            cls (type[T]): The model of the record
+            id_ (int): The id of the record
+
+        Returns:
+            Optional[T]: The record, or None if it does not exist in the database
+        """
+        key = (cls, int(id_))
+        if key not in self._identity:
+            self.load(cls, id_)
+            self.dispatch(cls)
+        return self._identity.get(key)
+
+    def dispatch(self, cls: type | None = None) -> None:
+        """Fetch every pending lookup (or only the pending lookups of `cls`) using one query per model
+
+        Args:
+            cls (Optional[type], optional): Only dispatch lookups for this model. Defaults to None.
+        """
+        for model in [cls] if cls is not None else list(self._pending):
+            ids = self._pending.pop(model, [])
+            for i in range(0, len(ids), MAX_BATCH_SIZE):
+                self._fetch(model, ids[i : i + MAX_BATCH_SIZE])
+
+    def clear(self) -> None:
+        """Forget every pending lookup and every record in the identity map"""
+        self._pending.clear()
+        self._identity.clear()
+
+    def _fetch(self, cls: type, ids: list[int]) -> None:
+        column = _id_column(cls)
+        records = {
+            int(r[column]): r for r in BatchQuery(cls, self.game, ids).execute() or []
+        }
+        for id_ in ids:
+            record = records.get(id_)
+            self._identity[(cls, id_)] = (
+                cls.from_record(record) if record is not None else None
+            )
+
+
+def get_loader(game: str) -> Loader:
+    """Gets the loader for the given game that is bound to the current request. Outside of an app context a new
+    loader is returned every time
+
+    Args:
+        game (str): The game to get the loader for
+
+    Returns:
+        Loader: The loader
+    """
+    if not has_app_context():
+        return Loader(game)
+
+    loaders = g.setdefault("_loaders", {})
+    if game not in loaders:
+        loaders[game] = Loader(game)
+    return loaders[game]
@@ -15,9 +15,16 @@ class Query(Generic[T]):
     """
 
     def __init__(
-        self, cast_function: callable, select: str, from_: str, where: str, args: tuple
+        self,
+        cast_function: callable,
+        select: str,
+        from_: str,
+        where: str,
+        args: tuple,
+        game: str | None = None,
     ) -> None:
         self.cast = cast_function
+        self.game = game
 
         self.select_string = select
         self.from_string = from_
@@ -39,7 +46,7 @@ class Query(Generic[T]):
         Returns:
             T | list[T] | None: _description_
         """
-        db_records = query_db(self.get_querystring(), self.args, one)
+        db_records = query_db(self.get_querystring(), self.args, one, game=self.game)
         if db_records:
             return self.cast(db_records)
         return None
@@ -117,6 +124,7 @@ class BasicQuery(Query[T]):
             cls.TABLENAME,
             _create_query_string(cls.TABLENAME, source=game, **kwargs),
             tuple((game, *tuple(kwargs.values()))),
+            game,
         )
 
 
@@ -139,6 +147,7 @@ class LimitedQuery(Query[T]):
             cls.TABLENAME,
             _create_query_string(cls.TABLENAME, source=game, **kwargs),
             tuple((game, *tuple(kwargs.values()))),
+            game,
         )
 
 
@@ -165,23 +174,69 @@ class JoinQuery(Query[T]):
             _join_tables(*queries, on=on),
             queries[0].where_string,
             tuple(arg for q in queries for arg in q.args),
+            queries[0].game,
         )
         print(self)
 
 
-def insert_one(obj) -> bool:
+def insert_one(obj, game: str | None = None) -> bool:
     args = obj.to_record()
     update_db(
         f"INSERT INTO {obj.TABLENAME} VALUES ({', '.join('?' for _ in args)});",
         args=args,
+        game=game,
     )
 
 
-def insert_many(objs: list) -> bool:
+def insert_many(objs: list, game: str | None = None) -> bool:
     args = [obj.to_record() for obj in objs]
     update_db(
         f"INSERT INTO {objs[0].TABLENAME} VALUES "
         + ", ".join(f"({', '.join('?' for _ in args[0])})" for _ in objs)
         + ";",
         args=tuple(e for obj_data in args for e in obj_data),
+        game=game,
     )
+
+
+def _id_column(cls) -> str:
+    """Gets the name of the column that identifies a record of the given model within its source. Models can set
+    `ID_COLUMN` explicitly, otherwise it is derived from the class name (`Player` -> `player_id`)
+
+    Args:
+        cls: The model class
+
+    Returns:
+        str: The name of the id column
+    """
+    return getattr(cls, "ID_COLUMN", None) or f"{cls.__name__.lower()}_id"
+
+
+class BatchQuery(Query[T]):
+    """A query that fetches every record of a model whose id is contained in the given ids using a single statement,
+    rather than executing one `BasicQuery` per id
+
+    For example BatchQuery(Player, "valorant", [1, 2, 3]).execute() would execute
+    `SELECT players.* FROM players WHERE (players.source, players.player_id) IN (VALUES (?, ?), (?, ?), (?, ?));`
+
+    The records are returned as they come out of the database (not cast), so that the caller can map them back to the
+    ids that were requested
+
+    Args:
+        Query: Parent `Query` class that implements the database execute method
+    """
+
+    def __init__(self, cls, game: str, ids: list) -> None:
+        if not ids:
+            raise ValueError("A batch query requires at least one id")
+
+        super().__init__(
+            lambda records: records,
+            f"{cls.TABLENAME}.*",
+            cls.TABLENAME,
+            f"({cls.TABLENAME}.source, {cls.TABLENAME}.{_id_column(cls)}) IN (VALUES "
+            + ", ".join("(?, ?)" for _ in ids)
+            + ")",
+            tuple(arg for id_ in ids for arg in (game, id_)),
+            game,
+        )
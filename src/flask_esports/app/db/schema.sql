@@ -58,4 +58,60 @@ CREATE TABLE player_team_association (
     PRIMARY KEY (source, player_id, team_id, joined_at),
     FOREIGN KEY (source, player_id) REFERENCES players (source, player_id)
     FOREIGN KEY (source, team_id) REFERENCES teams (source, team_id)
-)
+);
+
+-- Full text search indexes, kept in sync with their content tables by the triggers below
+CREATE VIRTUAL TABLE players_search USING fts5 (
+    alias,
+    forename,
+    surname,
+
+    content='players',
+    content_rowid='rowid',
+    prefix='1 2 3',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER players_search_insert AFTER INSERT ON players BEGIN
+    INSERT INTO players_search (rowid, alias, forename, surname)
+    VALUES (new.rowid, new.alias, new.forename, new.surname);
+END;
+
+CREATE TRIGGER players_search_delete AFTER DELETE ON players BEGIN
+    INSERT INTO players_search (players_search, rowid, alias, forename, surname)
+    VALUES ('delete', old.rowid, old.alias, old.forename, old.surname);
+END;
+
+CREATE TRIGGER players_search_update AFTER UPDATE OF alias, forename, surname ON players BEGIN
+    INSERT INTO players_search (players_search, rowid, alias, forename, surname)
+    VALUES ('delete', old.rowid, old.alias, old.forename, old.surname);
+    INSERT INTO players_search (rowid, alias, forename, surname)
+    VALUES (new.rowid, new.alias, new.forename, new.surname);
+END;
+
+CREATE VIRTUAL TABLE teams_search USING fts5 (
+    team_name,
+    team_tag,
+
+    content='teams',
+    content_rowid='rowid',
+    prefix='1 2 3',
+    tokenize='unicode61 remove_diacritics 2'
+);
+
+CREATE TRIGGER teams_search_insert AFTER INSERT ON teams BEGIN
+    INSERT INTO teams_search (rowid, team_name, team_tag)
+    VALUES (new.rowid, new.team_name, new.team_tag);
+END;
+
+CREATE TRIGGER teams_search_delete AFTER DELETE ON teams BEGIN
+    INSERT INTO teams_search (teams_search, rowid, team_name, team_tag)
+    VALUES ('delete', old.rowid, old.team_name, old.team_tag);
+END;
+
+CREATE TRIGGER teams_search_update AFTER UPDATE OF team_name, team_tag ON teams BEGIN
+    INSERT INTO teams_search (teams_search, rowid, team_name, team_tag)
+    VALUES ('delete', old.rowid, old.team_name, old.team_tag);
+    INSERT INTO teams_search (rowid, team_name, team_tag)
+    VALUES (new.rowid, new.team_name, new.team_tag);
+END;
@@ -0,0 +1,119 @@
+"""Full text search over the players and teams stored in the database
+
+The searchable columns are indexed by the FTS5 tables `players_search` and `teams_search` (see schema.sql), which are
+kept in sync with the `players` and `teams` tables by triggers, so nothing has to be done on the write path.
+
+Implements:
+    - `match_expression`, which turns user input into a safe FTS5 prefix query
+    - `search_resources`, which searches the players and teams of a game
+"""
+
+import re
+
+from .db import query_db
+
+# Column weights used by bm25 when ranking results. A match on an alias or team name is worth more than one on a real name
+PLAYER_WEIGHTS = (10.0, 2.0, 2.0)
+TEAM_WEIGHTS = (10.0, 5.0)
+
+# Words shorter than this match a large fraction of a big table, so searches made up only of them are not ranked
+RANKED_PREFIX_LENGTH = 3
+
+
+def match_expression(text: str) -> str | None:
+    """Create an FTS5 query that prefix-matches every word of the given text. Each word is quoted so that any FTS5
+    syntax in the user's input is treated as plain text
+
+    For example `match_expression("sen tenz")` would return `"sen"* "tenz"*`
+
+    Args:
+        text (str): The text that was searched for
+
+    Returns:
+        Optional[str]: The FTS5 query, or None if the text does not contain any searchable words
+    """
+    words = re.findall(r"\w+", text)
+    return " ".join(f'"{word}"*' for word in words) if words else None
+
+
+def _search(
+    table: str,
+    columns: str,
+    weights: tuple,
+    expression: str,
+    game: str,
+    limit: int,
+    ranked: bool,
+):
+    rank = f"bm25({table}_search, {', '.join(map(str, weights))})" if ranked else "0"
+    # CROSS JOIN makes SQLite read the full text index first, rather than scanning every row of the game and probing
+    # the index for each of them
+    return query_db(
+        f"SELECT {columns}, {rank} AS rank "
+        f"FROM {table}_search CROSS JOIN {table} ON ({table}.rowid = {table}_search.rowid) "
+        f"WHERE {table}_search MATCH ? AND {table}.source = ?{' ORDER BY rank' if ranked else ''} LIMIT ?;",
+        (expression, game, limit),
+        game=game,
+    )
+
+
+def search_resources(game: str, text: str, limit: int = 10) -> list[dict]:
+    """Search the players and teams of the given game, ordered by how relevant they are to the text
+
+    Players and teams are ranked separately (their bm25 scores come from different tables, so cannot be compared), and
+    the two lists are interleaved. Text whose every word is shorter than `RANKED_PREFIX_LENGTH` matches too many rows to
+    rank them all within the typeahead budget, so those results are the first matches found, unranked
+
+    Args:
+        game (str): The game to search
+        text (str): The text to search for
+        limit (int, optional): The maximum number of results. Defaults to 10.
+
+    Returns:
+        list[dict]: The results, best match first
+    """
+    expression = match_expression(text)
+    if expression is None:
+        return []
+    ranked = max(len(word) for word in re.findall(r"\w+", text)) >= RANKED_PREFIX_LENGTH
+
+    players = [
+        {
+            "type": "player",
+            "id": p["player_id"],
+            "alias": p["alias"],
+            "forename": p["forename"],
+            "surname": p["surname"],
+        }
+        for p in _search(
+            "players",
+            "players.player_id, players.alias, players.forename, players.surname",
+            PLAYER_WEIGHTS,
+            expression,
+            game,
+            limit,
+            ranked,
+        )
+    ]
+    teams = [
+        {
+            "type": "team",
+            "id": t["team_id"],
+            "name": t["team_name"],
+            "display-tag": t["team_tag"],
+        }
+        for t in _search(
+            "teams",
+            "teams.team_id, teams.team_name, teams.team_tag",
+            TEAM_WEIGHTS,
+            expression,
+            game,
+            limit,
+            ranked,
+        )
+    ]
+
+    results = []
+    for i in range(max(len(players), len(teams))):
+        results.extend(r[i] for r in (teams, players) if i < len(r))
+    return results[:limit]
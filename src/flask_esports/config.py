@@ -18,9 +18,105 @@ class Config:
     SQL_DATABASE_URI = os.environ.get("SQL_DATABASE_URI") or os.path.join(
         BASE_DIRECTORY, "app.db"
     )
+    # Store each game's data in its own database file (in SQL_SHARD_DIRECTORY) instead of the shared database
+    SQL_SHARD_BY_GAME = os.environ.get("SQL_SHARD_BY_GAME", "").lower() in ("1", "true")
+    SQL_SHARD_DIRECTORY = os.environ.get("SQL_SHARD_DIRECTORY") or os.path.join(
+        BASE_DIRECTORY, "shards"
+    )
+
+    # Statements slower than this are logged along with their query plan (None to disable)
+    SLOW_QUERY_THRESHOLD_MS = 100
+    QUERY_STATS_ENABLED = True
+
+    # Encoding used for BLOB columns, see app/db/codec.py
+    BLOB_ENCODING = "binary"
+    BLOB_COMPRESSION = "zlib"
+    BLOB_COMPRESSION_THRESHOLD = 256
+
+    # HTTP settings used when scraping, see scraping/http.py
+    SCRAPE_TIMEOUT = 10.0
+    SCRAPE_RETRIES = 3
+    SCRAPE_BACKOFF = 0.5
+    SCRAPE_POOL_SIZE = 10
+    SCRAPE_USER_AGENT = "flask-esports"
+    # Limits used by the concurrent scraping engine (scraping/engine.py). Rates are requests per second per host
+    SCRAPE_CONCURRENCY = 16
+    SCRAPE_HOST_RATE = 4.0
+    SCRAPE_HOST_BURST = 8
+    # Where pages are parsed by ParseExecutor (scraping/executor.py): "thread" or "process"
+    SCRAPE_PARSE_MODE = os.environ.get("SCRAPE_PARSE_MODE", "process")
+    SCRAPE_PARSE_WORKERS = int(os.environ.get("SCRAPE_PARSE_WORKERS", "0")) or None
+    # Where scraped pages are cached (scraping/cache.py). Caching is disabled if this is not set
+    SCRAPE_CACHE_PATH = os.environ.get("SCRAPE_CACHE_PATH")
+    # How long pages without caching headers are considered fresh for, in seconds
+    SCRAPE_CACHE_DEFAULT_MAX_AGE = 0
+
+    # Change detection (see scraping.changes). SQLite database of page and resource hashes, tracking is off if unset
+    SCRAPE_CHANGES_PATH = os.environ.get("SCRAPE_CHANGES_PATH")
+
+    # Background crawl scheduler (see api.scheduler)
+    CRAWL_WORKERS = 2
+    # Refreshes per second, across every game and per game
+    CRAWL_RATE = 2.0
+    CRAWL_GAME_RATE = 1.0
+    # Seconds after which a resource counts as fully stale, and the minimum seconds between refreshes of it
+    CRAWL_MAX_AGE = 3600
+    CRAWL_MIN_INTERVAL = 300
+    # Seconds for the popularity of a resource to halve
+    CRAWL_POPULARITY_HALF_LIFE = 3600
+
+    # Admission control of game endpoints (see api.admission): requests in flight per game and per endpoint, requests
+    # waiting per game and the seconds they wait, and the Retry-After seconds of the 503s sent to the requests shed
+    ADMISSION_ENABLED = True
+    ADMISSION_GAME_CONCURRENCY = 32
+    ADMISSION_ENDPOINT_CONCURRENCY = 16
+    ADMISSION_QUEUE_SIZE = 64
+    ADMISSION_QUEUE_TIMEOUT = 2.0
+    ADMISSION_RETRY_AFTER = 5
+    # Retry-After seconds of the 503s sent when every data source of a resource failed
+    SOURCES_RETRY_AFTER = 30
+
+    # Metrics (see metrics.py), exported at METRICS_PATH in the Prometheus text format. When METRICS_TOKEN is set, only
+    # to requests sending it as a bearer token
+    METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "").lower() in ("1", "true")
+    METRICS_PATH = "/metrics"
+    METRICS_TOKEN = os.environ.get("METRICS_TOKEN")
+
+    # Per-request profiling (see profiling.py), for requests sending PROFILING_TOKEN in the PROFILING_HEADER header
+    PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "").lower() in ("1", "true")
+    PROFILING_TOKEN = os.environ.get("PROFILING_TOKEN")
+    PROFILING_HEADER = "X-Profile-Token"
+    PROFILING_DIRECTORY = os.environ.get("PROFILING_DIRECTORY") or os.path.join(
+        BASE_DIRECTORY, "profiles"
+    )
+    # Number of functions included in profile reports
+    PROFILING_TOP = 25
+
+    # Tracing (see tracing.py). The fraction of requests traced, and where traces are exported (jsonl or otel)
+    TRACING_ENABLED = os.environ.get("TRACING_ENABLED", "").lower() in ("1", "true")
+    TRACING_SAMPLE_RATE = float(os.environ.get("TRACING_SAMPLE_RATE", "0.01"))
+    TRACING_EXPORTER = os.environ.get("TRACING_EXPORTER", "jsonl")
+    TRACING_PATH = os.environ.get("TRACING_PATH") or os.path.join(
+        BASE_DIRECTORY, "traces.jsonl"
+    )
+
+    # Production server (see server.py)
+    SERVER_HOST = os.environ.get("SERVER_HOST", "127.0.0.1")
+    SERVER_PORT = int(os.environ.get("SERVER_PORT", "5000"))
+    SERVER_WORKERS = int(os.environ.get("SERVER_WORKERS", "0")) or os.cpu_count() or 1
+    # Workers are replaced after serving this many requests, plus a random jitter of up to SERVER_MAX_REQUESTS_JITTER
+    # so that they are not all replaced at once (0 to never replace them)
+    SERVER_MAX_REQUESTS = 10000
+    SERVER_MAX_REQUESTS_JITTER = 1000
+    # Seconds workers are given to finish the request they are serving when stopped, before they are killed
+    SERVER_GRACEFUL_TIMEOUT = 30
+    # Paths each worker requests from itself to warm up before it accepts any traffic
+    SERVER_WARMUP_PATHS: tuple[str, ...] = ()
 
     APP_DEBUG = True
     APP_TESTING = False
+    # Import every game when the app is created, rather than on the first request to each game (see create_app)
+    APP_EAGER_GAMES = os.environ.get("APP_EAGER_GAMES", "").lower() in ("1", "true")
 
 
 def set_endpoint_directory(dir_: str) -> None:
@@ -0,0 +1,359 @@
+"""Built-in metrics for the API, exported in the Prometheus text format at `Config.METRICS_PATH` (/metrics)
+
+Metrics are off unless `Config.METRICS_ENABLED` is set, since they expose the endpoints being hit and the normalized
+statements run against the database. When `Config.METRICS_TOKEN` is configured, the metrics are only served to
+requests sending it as a bearer token (`Authorization: Bearer <token>`, which Prometheus sends with
+`authorization.credentials`).
+
+Metrics are recorded into per-thread shards, so recording a value never takes a lock or contends with other threads:
+each thread only ever writes to its own shard, and the shards are only summed when the metrics are collected. Shards
+of threads that have exited are folded into a single retired shard, so a server that starts a thread per request does
+not accumulate them.
+
+Recorded out of the box:
+    - `flask_esports_requests_total` and `flask_esports_request_duration_seconds`, per game, endpoint and status
+    - `flask_esports_requests_shed_total`, the requests turned away by admission control
+    - `flask_esports_source_calls_total` and `flask_esports_source_call_duration_seconds`, per game, resource and
+    `DataSource`, counting whether each call returned a resource, nothing, or raised an error
+    - the hits and misses of the default `HttpCache` and the counts of the default `ChangeTracker`
+    - the timings of every database statement from `app.db.db.query_stats`
+
+Implements:
+    - `Counter` and `Histogram`, sharded metrics
+    - `Registry`, which collects metrics and renders them, and the default `registry`
+    - `metrics_view`, the view exporting the default registry
+"""
+
+from __future__ import annotations
+
+import abc
+import bisect
+import hmac
+import math
+import threading
+from collections.abc import Callable, Iterable, Iterator
+
+from flask import Response, current_app, request
+
+# Latency buckets in seconds, from a cached database read to a slow scrape
+DEFAULT_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+)
+
+# A sample is (name suffix, labels, value)
+Sample = tuple[str, dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items()) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Sharded(abc.ABC):
+    """Keeps one dict of label values -> cell per thread, which only that thread writes to
+
+    Shards are keyed by thread ident. Idents of finished threads are reused by new threads, which take over the finished
+    thread's shard, so servers that start a thread per request (werkzeug's threaded server, for example) do not
+    allocate a shard per request, only one per thread running at once
+    """
+
+    # The shards of dead threads are retired every time this many more shards have been created
+    RETIRE_EVERY = 64
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        # Shard of every thread that has recorded a value, by thread ident
+        self._shards: dict[int, dict] = {}
+        self._created = 0
+        self._retired: dict = {}
+
+    @abc.abstractmethod
+    def _new_cell(self) -> list:
+        """Return a new cell of zeros, holding the values recorded for one set of label values"""
+
+    def _cell(self, key: tuple) -> list:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            ident = threading.get_ident()
+            with self._lock:
+                shard = self._shards.get(ident)
+                if shard is None:
+                    shard = self._shards[ident] = {}
+                    self._created += 1
+                    if self._created % self.RETIRE_EVERY == 0:
+                        self._retire()
+            self._local.shard = shard
+        cell = shard.get(key)
+        if cell is None:
+            cell = shard[key] = self._new_cell()
+        return cell
+
+    @staticmethod
+    def _merge(into: dict, shard: dict) -> None:
+        # Another thread may add a key while the shard is being copied
+        while True:
+            try:
+                items = list(shard.items())
+                break
+            except RuntimeError:
+                continue
+        for key, cell in items:
+            total = into.get(key)
+            if total is None:
+                into[key] = list(cell)
+            else:
+                for i, value in enumerate(cell):
+                    total[i] += value
+
+    def _retire(self) -> None:
+        live = {thread.ident for thread in threading.enumerate()}
+        for ident in [ident for ident in self._shards if ident not in live]:
+            self._merge(self._retired, self._shards.pop(ident))
+
+    def _collect(self) -> dict:
+        with self._lock:
+            self._retire()
+            totals: dict = {}
+            self._merge(totals, self._retired)
+            for shard in self._shards.values():
+                self._merge(totals, shard)
+        return totals
+
+
+class Counter(_Sharded):
+    """A value that only goes up, like the number of requests served"""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()) -> None:
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+
+    def _new_cell(self) -> list:
+        return [0.0]
+
+    def inc(self, *labels: str, amount: float = 1) -> None:
+        """Increment the counter for the given label values (in the order of `labelnames`)"""
+        self._cell(labels)[0] += amount
+
+    def samples(self) -> Iterator[Sample]:
+        for key, (value,) in sorted(self._collect().items()):
+            yield "_total", dict(zip(self.labelnames, key)), value
+
+
+class Histogram(_Sharded):
+    """Counts observations (like request latencies) into cumulative buckets"""
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__()
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_cell(self) -> list:
+        # A count per bucket (plus one for +Inf), then the sum of every observation
+        return [0.0] * (len(self.buckets) + 2)
+
+    def observe(self, value: float, *labels: str) -> None:
+        """Record an observation for the given label values (in the order of `labelnames`)"""
+        cell = self._cell(labels)
+        cell[bisect.bisect_left(self.buckets, value)] += 1
+        cell[-1] += value
+
+    def samples(self) -> Iterator[Sample]:
+        for key, cell in sorted(self._collect().items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0.0
+            for bound, count in zip((*self.buckets, math.inf), cell):
+                cumulative += count
+                yield "_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield "_sum", labels, cell[-1]
+            yield "_count", labels, cumulative
+
+
+class Callback:
+    """A metric whose samples are read from elsewhere when it is collected"""
+
+    def __init__(
+        self, name: str, help: str, type: str, read: Callable[[], Iterable[Sample]]
+    ) -> None:
+        self.name = name
+        self.help = help
+        self.type = type
+        self.read = read
+
+    def samples(self) -> Iterable[Sample]:
+        return self.read()
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: dict[str, Counter | Histogram | Callback] = {}
+
+    def register(self, metric):
+        """Add a metric to the registry, returning it"""
+        if metric.name in self._metrics:
+            raise ValueError(f"A metric named {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Iterable[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Iterable[str] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def callback(
+        self, name: str, help: str, type: str, read: Callable[[], Iterable[Sample]]
+    ) -> Callback:
+        return self.register(Callback(name, help, type, read))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        for metric in self._metrics.values():
+            # The samples of a counter are named with a _total suffix, and its metadata must use the same name
+            family = f"{metric.name}_total" if metric.type == "counter" else metric.name
+            lines.append(f"# HELP {family} {metric.help}")
+            lines.append(f"# TYPE {family} {metric.type}")
+            for suffix, labels, value in metric.samples():
+                lines.append(
+                    f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}"
+                )
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()
+
+requests_total = registry.counter(
+    "flask_esports_requests",
+    "Requests served by game endpoints",
+    ("game", "endpoint", "status"),
+)
+request_duration = registry.histogram(
+    "flask_esports_request_duration_seconds",
+    "Time spent serving requests to game endpoints",
+    ("game", "endpoint"),
+)
+requests_shed_total = registry.counter(
+    "flask_esports_requests_shed",
+    "Requests to game endpoints answered with a 503 by admission control, by reason (queue_full or timeout)",
+    ("game", "endpoint", "reason"),
+)
+source_calls_total = registry.counter(
+    "flask_esports_source_calls",
+    "DataSource calls made to fetch resources, by outcome (success, empty or error)",
+    ("game", "resource", "source", "outcome"),
+)
+source_call_duration = registry.histogram(
+    "flask_esports_source_call_duration_seconds",
+    "Time spent in DataSource calls",
+    ("game", "resource", "source"),
+)
+
+
+def _http_cache_samples() -> Iterator[Sample]:
+    from .scraping.cache import get_http_cache
+
+    cache = get_http_cache()
+    if cache is not None:
+        for result in ("hits", "revalidated", "misses"):
+            yield "_total", {"result": result}, getattr(cache, result)
+
+
+def _change_samples() -> Iterator[Sample]:
+    from .scraping.changes import get_change_tracker
+
+    tracker = get_change_tracker()
+    if tracker is not None:
+        for kind, counts in tracker.stats().items():
+            for result, count in counts.items():
+                yield "_total", {"kind": kind, "result": result}, count
+
+
+def _query_samples() -> Iterator[Sample]:
+    from .app.db.db import query_stats
+
+    for statement, stats in query_stats.snapshot().items():
+        labels = {"statement": statement}
+        yield "", {**labels, "quantile": "0.5"}, stats["p50-ms"] / 1000
+        yield "", {**labels, "quantile": "0.99"}, stats["p99-ms"] / 1000
+        yield "_sum", labels, stats["total-ms"] / 1000
+        yield "_count", labels, stats["count"]
+
+
+registry.callback(
+    "flask_esports_http_cache_lookups",
+    "Lookups in the HTTP cache of scraped pages, by result",
+    "counter",
+    _http_cache_samples,
+)
+registry.callback(
+    "flask_esports_scrape_changes",
+    "Pages and resources checked for changes, by kind and result",
+    "counter",
+    _change_samples,
+)
+registry.callback(
+    "flask_esports_db_statement_duration_seconds",
+    "Time spent executing database statements, by normalized statement",
+    "summary",
+    _query_samples,
+)
+
+
+def metrics_view() -> Response:
+    token = current_app.config.get("METRICS_TOKEN")
+    if token:
+        scheme, _, credentials = request.headers.get("Authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not hmac.compare_digest(
+            credentials.encode(), token.encode()
+        ):
+            return Response(
+                "Unauthorized\n",
+                401,
+                {"WWW-Authenticate": "Bearer"},
+                mimetype="text/plain",
+            )
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
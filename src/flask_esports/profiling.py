@@ -0,0 +1,210 @@
+"""On-demand profiling of single requests in production
+
+When `Config.PROFILING_ENABLED` is set and `Config.PROFILING_TOKEN` is configured, a request that sends the token
+in the `Config.PROFILING_HEADER` header (X-Profile-Token) is run under cProfile. By default the response is replaced
+by a JSON report of where the time went, for example:
+
+    curl -H "X-Profile-Token: $TOKEN" https://api.example.com/valorant/team/2/matches
+
+Sending `X-Profile-Output: store` instead returns the normal response, with the profile saved in
+`Config.PROFILING_DIRECTORY` (for snakeviz, `python -m pstats` etc.) under the id in the `X-Profile-Id` header.
+
+The report splits the time spent in every function (excluding the functions it called) into categories: blueprint
+(routing and responses), datasource (the game modules), scraping (fetching and parsing pages), db, and other. The
+middleware is only installed when profiling is enabled, so with it disabled requests pay nothing, and with it
+enabled requests without the header only pay for a header lookup.
+
+Implements:
+    - `ProfilingMiddleware`, the WSGI middleware installed by `create_app`
+    - `profile_report`, which summarizes a profile
+    - `categorize`, which gets the category of a profiled function
+"""
+
+from __future__ import annotations
+
+import cProfile
+import hmac
+import json
+import os
+import pstats
+import threading
+import time
+import uuid
+from collections.abc import Callable, Iterable
+
+from .config import Config
+
+HEADER_OUTPUT = "HTTP_X_PROFILE_OUTPUT"
+
+CATEGORIES = ("blueprint", "datasource", "scraping", "db", "other")
+
+_package = os.path.dirname(os.path.abspath(__file__))
+_api = os.path.join(_package, "api")
+
+# (category, test on the profiled function's file and name), checked in order
+_RULES: list[tuple[str, Callable[[str, str], bool]]] = [
+    ("db", lambda file, name: file.startswith(os.path.join(_package, "app", "db"))),
+    ("db", lambda file, name: file == "~" and "sqlite3" in name),
+    (
+        "scraping",
+        lambda file, name: file.startswith(os.path.join(_package, "scraping")),
+    ),
+    (
+        "scraping",
+        lambda file, name: any(
+            f"{os.sep}{package}{os.sep}" in file
+            for package in ("requests", "urllib3", "lxml")
+        ),
+    ),
+    ("scraping", lambda file, name: file == "~" and "lxml" in name),
+    ("datasource", lambda file, name: file == os.path.join(_api, "source.py")),
+    (
+        "datasource",
+        lambda file, name: file.startswith(os.path.abspath(Config.API_ENDPOINT_DIR)),
+    ),
+    ("blueprint", lambda file, name: file.startswith(_api)),
+    ("blueprint", lambda file, name: file.startswith(os.path.join(_package, "utils"))),
+]
+
+
+def categorize(file: str, name: str) -> str:
+    """Get the category of a profiled function
+
+    Args:
+        file (str): The file the function is defined in (~ for builtins)
+        name (str): The name of the function
+
+    Returns:
+        str: One of `CATEGORIES`
+    """
+    for category, matches in _RULES:
+        if matches(file, name):
+            return category
+    return "other"
+
+
+def profile_report(profile: cProfile.Profile, top: int = 25) -> dict:
+    """Summarize a profile as the time spent per category and the functions that took the most time
+
+    Args:
+        profile (cProfile.Profile): The finished profile
+        top (int, optional): The number of functions to include. Defaults to 25.
+
+    Returns:
+        dict: The report
+    """
+    stats = pstats.Stats(profile).stats
+    categories = dict.fromkeys(CATEGORIES, 0.0)
+    functions = []
+    for (file, line, name), (_, calls, total, cumulative, _) in stats.items():
+        category = categorize(file, name)
+        categories[category] += total
+        functions.append(
+            {
+                "function": name,
+                "file": file,
+                "line": line,
+                "category": category,
+                "calls": calls,
+                "total-ms": total * 1000,
+                "cumulative-ms": cumulative * 1000,
+            }
+        )
+    functions.sort(key=lambda f: f["total-ms"], reverse=True)
+    return {
+        "categories-ms": {k: v * 1000 for k, v in categories.items()},
+        "top": functions[:top],
+    }
+
+
+class ProfilingMiddleware:
+    """Runs the requests that carry the profiling token under cProfile"""
+
+    def __init__(
+        self,
+        wsgi_app,
+        token: str,
+        header: str | None = None,
+        directory: str | None = None,
+        top: int | None = None,
+    ) -> None:
+        """
+        Args:
+            wsgi_app: The WSGI app to profile requests to
+            token (str): The token that requests must send to be profiled
+            header (Optional[str], optional): The header carrying the token. Defaults to `Config.PROFILING_HEADER`.
+            directory (Optional[str], optional): Where stored profiles are saved. Defaults to
+            `Config.PROFILING_DIRECTORY`.
+            top (Optional[int], optional): Functions in each report. Defaults to `Config.PROFILING_TOP`.
+        """
+        self.wsgi_app = wsgi_app
+        self.token = token.encode()
+        self.environ_key = "HTTP_" + (
+            header or Config.PROFILING_HEADER
+        ).upper().replace("-", "_")
+        self.directory = directory or Config.PROFILING_DIRECTORY
+        self.top = top or Config.PROFILING_TOP
+        # Only one profiler can be active at a time, so concurrent profiled requests are served unprofiled
+        self._lock = threading.Lock()
+
+    def __call__(self, environ: dict, start_response) -> Iterable[bytes]:
+        token = environ.get(self.environ_key)
+        if token is None or not hmac.compare_digest(token.encode(), self.token):
+            return self.wsgi_app(environ, start_response)
+        if not self._lock.acquire(blocking=False):
+            return self.wsgi_app(environ, start_response)
+
+        captured = {}
+        chunks = []
+
+        def capture(status, headers, exc_info=None):
+            captured["status"], captured["headers"] = status, headers
+            return chunks.append
+
+        def run() -> bytes:
+            body = self.wsgi_app(environ, capture)
+            try:
+                chunks.extend(body)
+            finally:
+                if hasattr(body, "close"):
+                    body.close()
+            return b"".join(chunks)
+
+        try:
+            profile = cProfile.Profile()
+            start = time.perf_counter()
+            body = profile.runcall(run)
+            duration = time.perf_counter() - start
+        finally:
+            self._lock.release()
+
+        if environ.get(HEADER_OUTPUT, "report").lower() == "store":
+            profile_id = uuid.uuid4().hex
+            os.makedirs(self.directory, exist_ok=True)
+            profile.dump_stats(os.path.join(self.directory, f"{profile_id}.prof"))
+            start_response(
+                captured["status"],
+                [*captured["headers"], ("X-Profile-Id", profile_id)],
+            )
+            return [body]
+
+        report = {
+            "path": environ.get("PATH_INFO", ""),
+            "status": captured["status"],
+            "duration-ms": duration * 1000,
+            **profile_report(profile, self.top),
+        }
+        start_response("200 OK", [("Content-Type", "application/json")])
+        return [json.dumps(report).encode()]
+
+
+def install_profiling(app) -> None:
+    """Wrap the app's WSGI app in `ProfilingMiddleware`, if profiling is enabled and a token is configured"""
+    if app.config.get("PROFILING_ENABLED") and app.config.get("PROFILING_TOKEN"):
+        app.wsgi_app = ProfilingMiddleware(
+            app.wsgi_app,
+            app.config["PROFILING_TOKEN"],
+            app.config.get("PROFILING_HEADER"),
+            app.config.get("PROFILING_DIRECTORY"),
+            app.config.get("PROFILING_TOP"),
+        )
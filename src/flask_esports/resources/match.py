@@ -1,6 +1,6 @@
 from __future__ import annotations
-from typing import Optional
 
+from ..app.db.codec import LazyBlob, resolve
 from ..source import SourceId
 
 
@@ -8,14 +8,14 @@ class Match:
     def __init__(
         self,
         match_id: SourceId,
-        event_id: Optional[int] = None,
-        match_name: Optional[str] = None,
-        home_team: Optional[int] = None,
-        away_team: Optional[int] = None,
-        home_score: Optional[int] = None,
-        away_score: Optional[int] = None,
-        match_epoch: Optional[float] = None,
-        match_stats: Optional[dict] = None,
+        event_id: int | None = None,
+        match_name: str | None = None,
+        home_team: int | None = None,
+        away_team: int | None = None,
+        home_score: int | None = None,
+        away_score: int | None = None,
+        match_epoch: float | None = None,
+        match_stats: dict | LazyBlob | None = None,
     ) -> None:
         self.match = match_id
         self.event = event_id
@@ -25,6 +25,15 @@ class Match:
         self.match_epoch = match_epoch
         self.stats = match_stats
 
+    @property
+    def stats(self) -> dict | None:
+        """The match stats. If they were loaded as a `LazyBlob` they are only decoded the first time this is accessed"""
+        return resolve(self._stats)
+
+    @stats.setter
+    def stats(self, stats: dict | LazyBlob | None) -> None:
+        self._stats = stats
+
     def __repr__(self) -> str:
         return f"{self.match_name}: {self.teams[0]}({self.score[0]}) vs {self.teams[1]}({self.score[1]})"
 
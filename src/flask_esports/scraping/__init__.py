@@ -1,7 +1,14 @@
-"""This module contains features useful when scraping data from external sites for your API. It contains two sub-modules,
-utils and xpath.
+"""This module contains features useful when scraping data from external sites for your API. It contains the
+sub-modules utils, xpath, http, cache, changes, engine, stream, executor and recording.
 
 `utils` implements commonly used methods when scraping
 `xpath` implements `XpathParser`, a class to streamline scraping web pages using xpaths, in addition to other xpath
 utility functions
+`http` manages the pooled HTTP sessions that pages are fetched with
+`cache` implements `HttpCache`, a conditional-request cache of scraped pages
+`changes` implements `ChangeTracker`, which detects pages and resources that are unchanged since last scraped
+`engine` implements `ScrapeEngine`, which scrapes many pages concurrently with per-host rate limits
+`stream` implements streaming parsing of very large pages, element by element
+`executor` implements `ParseExecutor`, which parses pages on a pool of worker processes or threads
+`recording` implements recording and replaying of scraped responses, for offline tests and benchmarks
 """
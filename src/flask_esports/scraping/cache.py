@@ -0,0 +1,223 @@
+"""This module implements an HTTP cache for scraped pages, so that pages that have not changed since they were last
+fetched are neither downloaded nor parsed again.
+
+Responses are stored in SQLite along with their `ETag` and `Last-Modified` headers and their expiry (from the
+`Cache-Control: max-age` or `Expires` headers):
+    - a page that has not expired is served straight from the cache, without any request
+    - an expired page is revalidated with `If-None-Match` / `If-Modified-Since`. If the site answers 304 Not Modified,
+    the cached page is used and its expiry is extended
+
+The most recently used parsed trees are also kept in memory, so a page served from the cache is usually not parsed
+again either. Trees are shared between parsers, so they must be treated as read only.
+
+Implements:
+    - `HttpCache`
+    - `get_http_cache` / `set_http_cache`, which manage the cache used by `XpathParser` by default
+"""
+
+from __future__ import annotations
+
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from email.utils import parsedate_to_datetime
+
+import requests
+from lxml import html
+
+from ..config import Config
+
+_max_age = re.compile(r"max-age\s*=\s*(\d+)")
+
+
+def expiry_from_headers(headers: dict, now: float) -> float | None:
+    """Get the time a response expires at from its caching headers
+
+    Args:
+        headers (dict): The response headers
+        now (float): The time the response was received
+
+    Returns:
+        Optional[float]: The epoch the response expires at, or None if it must not be stored at all
+    """
+    cache_control = headers.get("Cache-Control", "").lower()
+    if "no-store" in cache_control:
+        return None
+    if "no-cache" in cache_control:
+        return now
+    if match := _max_age.search(cache_control):
+        return now + int(match.group(1))
+    if "Expires" in headers:
+        try:
+            return parsedate_to_datetime(headers["Expires"]).timestamp()
+        except (TypeError, ValueError):
+            return now
+    return now + Config.SCRAPE_CACHE_DEFAULT_MAX_AGE
+
+
+class HttpCache:
+    """Stores scraped pages along with the information needed to revalidate them"""
+
+    def __init__(self, path: str | None = None, max_trees: int = 128) -> None:
+        """
+        Args:
+            path (Optional[str], optional): SQLite database to store the pages in. Defaults to
+            `Config.SCRAPE_CACHE_PATH`, or an in-memory database if that is not set either.
+            max_trees (int, optional): The number of parsed trees to keep in memory. Defaults to 128.
+        """
+        self.max_trees = max_trees
+        self.hits = self.revalidated = self.misses = 0
+
+        self._db = sqlite3.connect(
+            path or Config.SCRAPE_CACHE_PATH or ":memory:", check_same_thread=False
+        )
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache (url VARCHAR PRIMARY KEY, etag VARCHAR, last_modified VARCHAR, "
+            "expires FLOAT, fetched_at FLOAT, body BLOB);"
+        )
+        self._lock = threading.Lock()
+        self._trees: OrderedDict[str, tuple[float, html.HtmlElement]] = OrderedDict()
+
+    def _entry(self, url: str) -> tuple | None:
+        with self._lock:
+            return self._db.execute(
+                "SELECT etag, last_modified, expires, fetched_at, body FROM http_cache WHERE url = ?;",
+                (url,),
+            ).fetchone()
+
+    def _tree(self, url: str, fetched_at: float, body: bytes) -> html.HtmlElement:
+        with self._lock:
+            cached = self._trees.get(url)
+            if cached is not None and cached[0] == fetched_at:
+                self._trees.move_to_end(url)
+                return cached[1]
+        tree = html.fromstring(body)
+        self._remember(url, fetched_at, tree)
+        return tree
+
+    def _remember(self, url: str, fetched_at: float, tree: html.HtmlElement) -> None:
+        with self._lock:
+            self._trees[url] = (fetched_at, tree)
+            self._trees.move_to_end(url)
+            while len(self._trees) > self.max_trees:
+                self._trees.popitem(last=False)
+
+    def fetch(self, url: str, session: requests.Session) -> html.HtmlElement | None:
+        """Get the parsed page at the url, using the cache wherever possible
+
+        Args:
+            url (str): The url of the page
+            session (requests.Session): The session to make any request with
+
+        Returns:
+            Optional[html.HtmlElement]: The parsed page, or None if it could not be fetched
+        """
+        now = time.time()
+        entry = self._entry(url)
+        if entry is not None:
+            etag, last_modified, expires, fetched_at, body = entry
+            if expires is not None and expires > now:
+                self.hits += 1
+                return self._tree(url, fetched_at, body)
+
+            headers = {}
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+            response = session.get(url, headers=headers)
+            if response.status_code == 304:
+                self.revalidated += 1
+                with self._lock:
+                    self._db.execute(
+                        "UPDATE http_cache SET expires = ? WHERE url = ?;",
+                        (expiry_from_headers(response.headers, now) or now, url),
+                    )
+                    self._db.commit()
+                return self._tree(url, fetched_at, body)
+        else:
+            response = session.get(url)
+
+        self.misses += 1
+        if response.status_code != 200:
+            return None
+
+        tree = html.fromstring(response.content)
+        self.store(url, response, now, tree)
+        return tree
+
+    def store(
+        self,
+        url: str,
+        response: requests.Response,
+        now: float | None = None,
+        tree: html.HtmlElement | None = None,
+    ) -> None:
+        """Store a fetched page, unless its headers forbid it
+
+        Args:
+            url (str): The url of the page
+            response (requests.Response): The response the page was fetched with
+            now (Optional[float], optional): The time the page was fetched. Defaults to now.
+            tree (Optional[html.HtmlElement], optional): The parsed page. Defaults to None.
+        """
+        now = now or time.time()
+        expires = expiry_from_headers(response.headers, now)
+        if expires is None:
+            return
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?);",
+                (
+                    url,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    expires,
+                    now,
+                    response.content,
+                ),
+            )
+            self._db.commit()
+        if tree is not None:
+            self._remember(url, now, tree)
+
+    def is_fresh(self, url: str) -> bool:
+        """Whether the page at the url is cached and has not expired, so it can be fetched without any request"""
+        entry = self._entry(url)
+        return entry is not None and entry[2] is not None and entry[2] > time.time()
+
+    def invalidate(self, url: str) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM http_cache WHERE url = ?;", (url,))
+            self._db.commit()
+            self._trees.pop(url, None)
+
+    def hit_ratio(self) -> float:
+        """The fraction of fetches that did not have to download the page"""
+        total = self.hits + self.revalidated + self.misses
+        return (self.hits + self.revalidated) / total if total else 0.0
+
+    def close(self) -> None:
+        self._db.close()
+
+
+_http_cache: HttpCache | None = None
+
+
+def set_http_cache(cache: HttpCache | None) -> None:
+    """Set the cache used by every `XpathParser` that is not given one explicitly (None to disable caching)"""
+    global _http_cache
+    _http_cache = cache
+
+
+def get_http_cache() -> HttpCache | None:
+    """Get the cache used by default. If none has been set but `Config.SCRAPE_CACHE_PATH` is, a cache stored there
+    is created
+    """
+    global _http_cache
+    if _http_cache is None and Config.SCRAPE_CACHE_PATH:
+        _http_cache = HttpCache(Config.SCRAPE_CACHE_PATH)
+    return _http_cache
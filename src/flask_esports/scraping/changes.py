@@ -0,0 +1,326 @@
+"""This module implements change detection for background refreshes, which mostly re-scrape pages and resources that
+have not changed since they were last scraped.
+
+A `ChangeTracker` stores a content hash per page and per extracted resource in SQLite. Checking a hash never records
+it, as whatever was extracted has to be persisted before it can be skipped next time. Instead, everything checked
+within `ChangeTracker.changes` is gathered into a `ChangeSet`, which is committed once the refresh has been persisted:
+    - an `XpathParser` fetching within a change set hashes the page body before parsing it. If the hash is unchanged,
+    the parser's `changed` attribute is False and the page is only parsed if its content is used anyway. Pages fetched
+    outside of any change set are not hashed
+    - `ChangeTracker.pages` lists the pages committed for a scope, so that a refresh can fetch just those pages first
+    and skip extraction entirely if none of them changed (see `api.scheduler.CrawlScheduler.refresh`)
+    - `ChangeSet.resource_changed` tells whether a refreshed resource differs from the last one committed, so that
+    unchanged resources can skip the database write and any cache invalidation. A resource whose every page was
+    checked and unchanged is unchanged without hashing it
+
+Page hashes are recorded per change set scope (the refreshed resource, for example), so that a page committed by the
+refresh of one resource is not reported as unchanged to another resource extracted from it.
+
+Pages served from the HTTP cache (see `scraping.cache`), and pages that failed to be fetched, are not hashed. They are
+noted by the change set as unchecked, so a resource using any of them is always hashed.
+
+Implements:
+    - `ChangeTracker`
+    - `ChangeSet`
+    - `active_change_set`, which gets the change set pages fetched in the current context are checked into
+    - `get_change_tracker` / `set_change_tracker`, which manage the tracker used by `XpathParser` by default
+"""
+
+from __future__ import annotations
+
+import contextvars
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from typing import Any
+
+from ..config import Config
+
+# The change set that pages checked in this context are gathered into
+_change_set: contextvars.ContextVar[ChangeSet | None] = contextvars.ContextVar(
+    "flask_esports_change_set", default=None
+)
+
+
+def content_hash(content: bytes) -> str:
+    return hashlib.blake2b(content, digest_size=16).hexdigest()
+
+
+def resource_hash(data: Any) -> str:
+    if hasattr(data, "to_dict"):
+        data = data.to_dict()
+    return content_hash(
+        json.dumps(data, sort_keys=True, separators=(",", ":"), default=str).encode()
+    )
+
+
+class ChangeSet:
+    """The pages and resources checked within `ChangeTracker.changes`, whose hashes are recorded by `commit`"""
+
+    def __init__(self, tracker: ChangeTracker, scope: str) -> None:
+        self.tracker = tracker
+        self.scope = scope
+        # Digest and whether it changed, by url
+        self.pages: dict[str, tuple[str, bool]] = {}
+        # Pages fetched within the set that could not be checked (served from the HTTP cache, or failed)
+        self.unchecked: set[str] = set()
+        # Digest and whether it changed, by (game, resource, id)
+        self.resources: dict[tuple[str, str, int], tuple[str, bool]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def pages_changed(self) -> bool | None:
+        """Whether any page checked so far changed, None if no page has been checked or any page fetched could not
+        be checked
+        """
+        with self._lock:
+            if not self.pages or self.unchecked:
+                return None
+            return any(changed for _, changed in self.pages.values())
+
+    def add_page(self, url: str, digest: str, changed: bool) -> None:
+        with self._lock:
+            self.pages[url] = (digest, changed)
+
+    def add_unchecked(self, url: str) -> None:
+        with self._lock:
+            self.unchecked.add(url)
+
+    def resource_changed(self, game: str, resource: str, id_: int, data: Any) -> bool:
+        """Check whether a resource differs from the last time it was committed. If every page fetched within the
+        set was checked and unchanged, so is the resource
+
+        Args:
+            game (str): The game (source) of the resource
+            resource (str): The type of resource (player, team etc.)
+            id_ (int): The id of the resource
+            data (Any): The resource, either as an object with a `to_dict` method or as serializable data
+
+        Returns:
+            bool: False if the resource is identical to the last time it was committed
+        """
+        key = (game, resource, int(id_))
+        if self.pages_changed is False and self.tracker.has_resource(*key):
+            self.tracker.count("resources", False)
+            return False
+        digest = resource_hash(data)
+        changed = self.tracker.check_resource(*key, digest)
+        with self._lock:
+            self.resources[key] = (digest, changed)
+        return changed
+
+    def commit(self) -> None:
+        """Record the hash of every page and resource checked, once what was extracted from them has been persisted.
+        The pages replace those last committed for the scope, unless any page could not be checked, in which case none
+        are recorded, so that the scope's pages are never taken to be all of its pages
+        """
+        with self._lock:
+            pages, resources = dict(self.pages), dict(self.resources)
+            if self.unchecked:
+                pages = {}
+        self.tracker.record(
+            [(self.scope, url, digest) for url, (digest, _) in pages.items()],
+            [(*key, digest) for key, (digest, _) in resources.items()],
+            replace_scope=self.scope,
+        )
+
+
+class ChangeTracker:
+    """Remembers the hash of every page and resource recorded, and counts how many pages were changed, unchanged or
+    failed to be fetched, and how many resources were changed or unchanged
+    """
+
+    def __init__(self, path: str | None = None) -> None:
+        """
+        Args:
+            path (Optional[str], optional): SQLite database to store the hashes in. Defaults to
+            `Config.SCRAPE_CHANGES_PATH`, or an in-memory database if that is not set either.
+        """
+        self._db = sqlite3.connect(
+            path or Config.SCRAPE_CHANGES_PATH or ":memory:", check_same_thread=False
+        )
+        self._db.executescript(
+            "CREATE TABLE IF NOT EXISTS page_hashes (scope VARCHAR, url VARCHAR, digest VARCHAR, checked_at FLOAT, "
+            "PRIMARY KEY (scope, url));"
+            "CREATE TABLE IF NOT EXISTS resource_hashes (source VARCHAR, resource VARCHAR, resource_id INTEGER, "
+            "digest VARCHAR, checked_at FLOAT, PRIMARY KEY (source, resource, resource_id));"
+        )
+        self._lock = threading.Lock()
+        self._stats = {
+            "pages": {"changed": 0, "unchanged": 0, "failed": 0},
+            "resources": {"changed": 0, "unchanged": 0},
+        }
+
+    def count(self, kind: str, changed: bool) -> None:
+        with self._lock:
+            self._stats[kind]["changed" if changed else "unchanged"] += 1
+
+    def _compare(self, select: str, key: tuple, digest: str) -> bool:
+        with self._lock:
+            row = self._db.execute(select, key).fetchone()
+        return row is None or row[0] != digest
+
+    @contextmanager
+    def changes(self, scope: str) -> Iterator[ChangeSet]:
+        """Gather every page checked within this block (and threads started with a copy of its context) into a
+        `ChangeSet`, to commit once what was extracted from them has been persisted
+
+        Args:
+            scope (str): What the pages are scraped for (the refreshed resource, for example). Pages are compared with
+            those last committed in the same scope
+
+        Yields:
+            ChangeSet: The change set
+        """
+        changes = ChangeSet(self, scope)
+        token = _change_set.set(changes)
+        try:
+            yield changes
+        finally:
+            _change_set.reset(token)
+
+    def check_page(self, url: str, content: bytes) -> bool:
+        """Check whether a page differs from the last time it was recorded, without recording it. Within `changes`,
+        the page is compared with the change set's scope and added to the change set
+
+        Args:
+            url (str): The url of the page
+            content (bytes): The body of the page
+
+        Returns:
+            bool: False if the page is identical to the last time it was recorded
+        """
+        changes = _change_set.get()
+        if changes is not None and changes.tracker is not self:
+            changes = None
+        digest = content_hash(content)
+        changed = self._compare(
+            "SELECT digest FROM page_hashes WHERE scope = ? AND url = ?;",
+            (changes.scope if changes is not None else "", url),
+            digest,
+        )
+        self.count("pages", changed)
+        if changes is not None:
+            changes.add_page(url, digest, changed)
+        return changed
+
+    def pages(self, scope: str) -> list[str]:
+        """Get the urls of the pages last committed by a change set with the given scope"""
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT url FROM page_hashes WHERE scope = ? ORDER BY url;", (scope,)
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    def record_page(self, url: str, content: bytes) -> None:
+        """Record the content of a page, outside of any change set"""
+        self.record([("", url, content_hash(content))], [])
+
+    def has_resource(self, game: str, resource: str, id_: int) -> bool:
+        with self._lock:
+            return (
+                self._db.execute(
+                    "SELECT 1 FROM resource_hashes WHERE source = ? AND resource = ? AND resource_id = ?;",
+                    (game, resource, int(id_)),
+                ).fetchone()
+                is not None
+            )
+
+    def check_resource(self, game: str, resource: str, id_: int, digest: str) -> bool:
+        """Check whether the hash of a resource (see `resource_hash`) differs from the last one recorded, without
+        recording it
+
+        Returns:
+            bool: False if the resource is identical to the last time it was recorded
+        """
+        changed = self._compare(
+            "SELECT digest FROM resource_hashes WHERE source = ? AND resource = ? AND resource_id = ?;",
+            (game, resource, int(id_)),
+            digest,
+        )
+        self.count("resources", changed)
+        return changed
+
+    def record(
+        self,
+        pages: list[tuple[str, str, str]],
+        resources: list[tuple[str, str, int, str]],
+        replace_scope: str | None = None,
+    ) -> None:
+        """Record hashes of pages, as (scope, url, digest), and of resources, as (game, resource, id, digest)
+
+        Args:
+            pages (list[tuple[str, str, str]]): The pages to record
+            resources (list[tuple[str, str, int, str]]): The resources to record
+            replace_scope (Optional[str], optional): Forget every page previously recorded for this scope first.
+            Defaults to None.
+        """
+        now = time.time()
+        with self._lock:
+            if replace_scope is not None:
+                self._db.execute(
+                    "DELETE FROM page_hashes WHERE scope = ?;", (replace_scope,)
+                )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO page_hashes VALUES (?, ?, ?, ?);",
+                [(*page, now) for page in pages],
+            )
+            self._db.executemany(
+                "INSERT OR REPLACE INTO resource_hashes VALUES (?, ?, ?, ?, ?);",
+                [(*resource, now) for resource in resources],
+            )
+            self._db.commit()
+
+    def record_failure(self, url: str) -> None:
+        """Count a page that could not be fetched"""
+        with self._lock:
+            self._stats["pages"]["failed"] += 1
+
+    def stats(self) -> dict[str, dict[str, int]]:
+        """Get the number of pages that were changed, unchanged or failed, and of resources that were changed or
+        unchanged, so far
+        """
+        with self._lock:
+            return {kind: dict(counts) for kind, counts in self._stats.items()}
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            for counts in self._stats.values():
+                for result in counts:
+                    counts[result] = 0
+
+    def close(self) -> None:
+        self._db.close()
+
+
+def active_change_set(tracker: ChangeTracker | None = None) -> ChangeSet | None:
+    """Get the change set of the current context, if there is one (and it belongs to the given tracker, if one is
+    given)
+    """
+    changes = _change_set.get()
+    if changes is not None and tracker is not None and changes.tracker is not tracker:
+        return None
+    return changes
+
+
+_change_tracker: ChangeTracker | None = None
+
+
+def set_change_tracker(tracker: ChangeTracker | None) -> None:
+    """Set the tracker used by every `XpathParser` that is not given one explicitly (None to disable tracking)"""
+    global _change_tracker
+    _change_tracker = tracker
+
+
+def get_change_tracker() -> ChangeTracker | None:
+    """Get the tracker used by default. If none has been set but `Config.SCRAPE_CHANGES_PATH` is, a tracker stored
+    there is created
+    """
+    global _change_tracker
+    if _change_tracker is None and Config.SCRAPE_CHANGES_PATH:
+        _change_tracker = ChangeTracker(Config.SCRAPE_CHANGES_PATH)
+    return _change_tracker
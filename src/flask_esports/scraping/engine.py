@@ -0,0 +1,217 @@
+"""This module implements an engine for scraping many pages concurrently, for example every match page of an event.
+
+Pages are fetched on a pool of worker threads (using the pooled sessions from `scraping.http`), scheduled by an
+asyncio event loop that enforces:
+    - a global limit on the number of requests in flight
+    - a token bucket rate limit per host, so that no single site sees more than its configured rate
+
+Implements:
+    - `ScrapeEngine`, the engine itself
+    - `TokenBucket`, the rate limiter used per host
+"""
+
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import queue
+import threading
+import time
+from collections.abc import AsyncIterator, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+import requests
+
+from ..config import Config
+from .xpath import XpathParser
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts of up to `capacity`. Acquisitions reserve their
+    token up front, so waiters are served in the order that they arrived. Thread safe
+    """
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """
+        Args:
+            rate (float): The number of tokens added per second
+            capacity (float): The maximum number of tokens that can be saved up
+        """
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take a token, going into debt if there are none left
+
+        Returns:
+            float: How many seconds the caller must wait before the token it took is available
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(
+                self.capacity, self._tokens + (now - self._updated) * self.rate
+            )
+            self._updated = now
+            self._tokens -= 1
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    async def acquire(self) -> None:
+        """Wait (asynchronously) until a token is available"""
+        wait = self.reserve()
+        if wait:
+            await asyncio.sleep(wait)
+
+    def acquire_blocking(self) -> None:
+        """Wait (blocking the calling thread) until a token is available"""
+        wait = self.reserve()
+        if wait:
+            time.sleep(wait)
+
+
+class ScrapeEngine:
+    """Fetches and parses many pages concurrently, respecting the global concurrency limit and the rate limit of
+    each host
+
+    For example:
+        for parser in ScrapeEngine().scrape(match_urls):
+            matches.append(parse_match(parser))
+    """
+
+    def __init__(
+        self,
+        concurrency: int | None = None,
+        host_rate: float | None = None,
+        host_burst: float | None = None,
+        session: requests.Session | None = None,
+    ) -> None:
+        """
+        Args:
+            concurrency (Optional[int], optional): Maximum requests in flight. Defaults to `Config.SCRAPE_CONCURRENCY`.
+            host_rate (Optional[float], optional): Requests per second per host. Defaults to `Config.SCRAPE_HOST_RATE`.
+            host_burst (Optional[float], optional): Burst size per host. Defaults to `Config.SCRAPE_HOST_BURST`.
+            session (Optional[requests.Session], optional): Session to fetch every page with. Defaults to the shared
+            session of each page's host.
+        """
+        self.concurrency = concurrency or Config.SCRAPE_CONCURRENCY
+        self.host_rate = host_rate or Config.SCRAPE_HOST_RATE
+        self.host_burst = host_burst or Config.SCRAPE_HOST_BURST
+        self.session = session
+
+        self._buckets: dict[str, TokenBucket] = {}
+
+    def bucket(self, url: str) -> TokenBucket:
+        """Get the rate limiter of the url's host. Buckets are kept for the lifetime of the engine, so reusing an
+        engine keeps rate limits across calls
+        """
+        host = urlsplit(url).netloc.lower()
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(self.host_rate, self.host_burst)
+        return self._buckets[host]
+
+    async def iter_scrape(self, urls: Iterable[str]) -> AsyncIterator[XpathParser]:
+        """Fetch and parse every url, yielding each parser as soon as it is ready (not in the order of `urls`)
+
+        Args:
+            urls (Iterable[str]): The urls to scrape
+
+        Yields:
+            XpathParser: The parser of each page. Check `was_success` as failed pages are yielded too
+        """
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        executor = ThreadPoolExecutor(self.concurrency, "scrape")
+
+        async def fetch(url: str) -> XpathParser:
+            # The host's token is taken before a slot, so that a throttled host does not hold slots other hosts
+            # could use while it waits
+            await self.bucket(url).acquire()
+            async with semaphore:
+                # run_in_executor does not carry the context over, so spans and `share_pages` would be lost
+                context = contextvars.copy_context()
+                return await loop.run_in_executor(
+                    executor, context.run, XpathParser, url, self.session
+                )
+
+        tasks = [asyncio.ensure_future(fetch(url)) for url in urls]
+        try:
+            for task in asyncio.as_completed(tasks):
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Waiting for fetches still in flight would block the event loop, so they finish in the background
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    async def scrape_all_async(self, urls: Iterable[str]) -> list[XpathParser]:
+        urls = list(urls)
+        parsers = {}
+        async for parser in self.iter_scrape(urls):
+            parsers[parser.url] = parser
+        return [parsers[url] for url in urls]
+
+    def scrape_all(self, urls: Iterable[str]) -> list[XpathParser]:
+        """Fetch and parse every url, blocking until they are all done
+
+        Args:
+            urls (Iterable[str]): The urls to scrape
+
+        Returns:
+            list[XpathParser]: The parsers, in the same order as `urls`
+        """
+        return asyncio.run(self.scrape_all_async(urls))
+
+    def scrape(self, urls: Iterable[str]) -> Iterator[XpathParser]:
+        """Synchronous version of `iter_scrape`, for use outside of an event loop. The scraping runs on a background
+        thread (in the caller's context) and each parser is yielded as soon as it is ready. If the caller stops
+        iterating early, the pages that have not started fetching yet are cancelled
+
+        Args:
+            urls (Iterable[str]): The urls to scrape
+
+        Yields:
+            XpathParser: The parser of each page
+        """
+        done = object()
+        results: queue.Queue = queue.Queue()
+
+        async def produce() -> None:
+            try:
+                async for parser in self.iter_scrape(urls):
+                    results.put(parser)
+            finally:
+                results.put(done)
+
+        def run() -> None:
+            try:
+                # Waiting on the task rather than running it leaves its error to be raised by the caller
+                loop.run_until_complete(asyncio.wait([task]))
+                loop.run_until_complete(loop.shutdown_asyncgens())
+            finally:
+                loop.close()
+
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(produce(), context=contextvars.copy_context())
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        try:
+            while (item := results.get()) is not done:
+                yield item
+            thread.join()
+            if task.exception() is not None:
+                raise task.exception()
+        finally:
+            if thread.is_alive():
+                # Stopped early, so cancel the remaining fetches (those in flight finish in the background)
+                try:
+                    loop.call_soon_threadsafe(task.cancel)
+                except RuntimeError:
+                    # The loop closed in the meantime
+                    pass
+            else:
+                thread.join()
@@ -0,0 +1,131 @@
+"""This module implements an executor that moves the CPU bound part of scraping (parsing HTML and extracting values
+from it) off of the threads serving requests.
+
+In `process` mode the page's bytes and a `Schema` are sent to a pool of worker processes, which parse the page,
+extract the schema and send back the plain extracted data, so parsing no longer competes with request handling for the
+GIL and scales with the number of cores. `thread` mode runs the same work on a thread pool, which avoids the cost of
+sending pages between processes for small workloads.
+
+Schemas sent to a process pool must be picklable, so their converters and `into` types must be defined at module level.
+Worker processes are started with the `forkserver` method (or `spawn` where it is unavailable) rather than forked, as
+the serving process runs many threads and forking it could copy locks held by them.
+
+Implements:
+    - `ParseExecutor`
+    - `extract_content`, the function that is run by the workers
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+from collections.abc import Iterable, Iterator
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Self
+
+from lxml import html
+
+from ..config import Config
+from .xpath import Schema
+
+MODES = ("thread", "process")
+START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+def extract_content(content: bytes, schema: Schema) -> Any:
+    """Parse a page and extract the schema from it
+
+    Args:
+        content (bytes): The HTML of the page
+        schema (Schema): The schema to extract
+
+    Returns:
+        Any: The extracted data
+    """
+    return schema.extract(html.fromstring(content))
+
+
+class ParseExecutor:
+    """Parses pages and extracts schemas from them on a pool of worker threads or processes
+
+    For example:
+        with ParseExecutor("process") as executor:
+            matches = list(executor.map(pages, MATCH_SCHEMA))
+    """
+
+    def __init__(self, mode: str | None = None, max_workers: int | None = None) -> None:
+        """
+        Args:
+            mode (Optional[str], optional): `thread` or `process`. Defaults to `Config.SCRAPE_PARSE_MODE`.
+            max_workers (Optional[int], optional): The size of the pool. Defaults to `Config.SCRAPE_PARSE_WORKERS`
+            (or the number of cores if that is not set either).
+        """
+        self.mode = mode or Config.SCRAPE_PARSE_MODE
+        if self.mode not in MODES:
+            raise ValueError(f"Parse mode must be one of {MODES}, not {self.mode!r}")
+        self.max_workers = (
+            max_workers or Config.SCRAPE_PARSE_WORKERS or os.cpu_count() or 1
+        )
+
+        self._executor: Executor | None = None
+
+    @property
+    def executor(self) -> Executor:
+        # The pool is only started when it is first needed
+        if self._executor is None:
+            self._executor = (
+                ProcessPoolExecutor(
+                    self.max_workers,
+                    mp_context=multiprocessing.get_context(START_METHOD),
+                )
+                if self.mode == "process"
+                else ThreadPoolExecutor(self.max_workers, "parse")
+            )
+        return self._executor
+
+    def submit(self, content: bytes, schema: Schema) -> Future:
+        """Parse a page and extract a schema from it in the pool
+
+        Args:
+            content (bytes): The HTML of the page
+            schema (Schema): The schema to extract
+
+        Returns:
+            Future: Resolves to the extracted data
+        """
+        return self.executor.submit(extract_content, content, schema)
+
+    def map(self, contents: Iterable[bytes], schema: Schema) -> Iterator[Any]:
+        """Parse many pages and extract the same schema from each of them in the pool
+
+        Args:
+            contents (Iterable[bytes]): The HTML of each page
+            schema (Schema): The schema to extract
+
+        Returns:
+            Iterator[Any]: The extracted data of each page, in order
+        """
+        contents = list(contents)
+        return self.executor.map(
+            extract_content,
+            contents,
+            [schema] * len(contents),
+            chunksize=(
+                max(1, len(contents) // (4 * self.max_workers))
+                if self.mode == "process"
+                else 1
+            ),
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait)
+            self._executor = None
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
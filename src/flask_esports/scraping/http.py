@@ -0,0 +1,113 @@
+"""This module manages the HTTP sessions used to fetch pages when scraping.
+
+Every host gets its own `requests.Session`, shared by every scrape of that host, so that connections (and their TLS
+handshakes) are pooled and kept alive between pages. Each session applies the timeout, retry and backoff settings from
+`Config`.
+
+Implements:
+    - `get_session`, which gets the shared session for a url's host
+    - `set_session_factory`, which changes how new sessions are created (to inject sessions in tests)
+    - `clear_sessions`, which closes every shared session
+"""
+
+from __future__ import annotations
+
+import threading
+from collections.abc import Callable
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from ..config import Config
+
+_sessions: dict[str, requests.Session] = {}
+_lock = threading.Lock()
+
+
+class ScrapeSession(requests.Session):
+    """A `requests.Session` that applies a default timeout to every request made with it"""
+
+    def __init__(self, timeout: float | None = None) -> None:
+        super().__init__()
+        self.timeout = timeout
+
+    def request(self, method, url, **kwargs) -> requests.Response:
+        kwargs.setdefault("timeout", self.timeout)
+        return super().request(method, url, **kwargs)
+
+
+def create_session(host: str) -> requests.Session:
+    """Create a pooled session with the timeout, retry and connection pool settings from `Config`
+
+    Args:
+        host (str): The host the session will be used for
+
+    Returns:
+        requests.Session: The session
+    """
+    session = ScrapeSession(Config.SCRAPE_TIMEOUT)
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=Config.SCRAPE_POOL_SIZE,
+        max_retries=Retry(
+            total=Config.SCRAPE_RETRIES,
+            backoff_factor=Config.SCRAPE_BACKOFF,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=("GET", "HEAD"),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        ),
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(
+        {"Accept-Encoding": "gzip, deflate", "User-Agent": Config.SCRAPE_USER_AGENT}
+    )
+    return session
+
+
+_session_factory: Callable[[str], requests.Session] = create_session
+
+
+def set_session_factory(
+    factory: Callable[[str], requests.Session] | None = None,
+) -> None:
+    """Change the function used to create the session for a host, closing any existing sessions. Passing None
+    restores the default factory
+
+    Args:
+        factory (Optional[Callable[[str], requests.Session]], optional): Function taking a host and returning the
+        session to use for it. Defaults to None.
+    """
+    global _session_factory
+    clear_sessions()
+    _session_factory = factory or create_session
+
+
+def get_session(url: str) -> requests.Session:
+    """Get the shared session for the host of the given url, creating it if this is the first request to the host
+
+    Args:
+        url (str): The url that is going to be requested
+
+    Returns:
+        requests.Session: The session
+    """
+    host = urlsplit(url).netloc.lower()
+    session = _sessions.get(host)
+    if session is None:
+        with _lock:
+            session = _sessions.get(host)
+            if session is None:
+                session = _sessions[host] = _session_factory(host)
+    return session
+
+
+def clear_sessions() -> None:
+    """Close and forget every shared session"""
+    with _lock:
+        for session in _sessions.values():
+            session.close()
+        _sessions.clear()
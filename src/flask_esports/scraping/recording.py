@@ -0,0 +1,205 @@
+"""This module implements recording and replaying of the HTTP responses that scrapers receive, so that scrapers can be
+tested and benchmarked against real pages without any network access.
+
+A `Recording` is a directory holding one pair of files per url: `<key>.json` (the url, status and headers) and
+`<key>.body` (the raw body). `RecordingSession` is a drop-in replacement for the shared sessions in `scraping.http`,
+which either records every response it receives or replays them from a recording:
+
+    use_recording("tests/recordings/vlr", mode="record")  # Scrape the live sites once, saving every page
+    use_recording("tests/recordings/vlr")                 # Every later scrape is served from disk
+    use_recording(None)                                   # Back to the live sites
+
+Implements:
+    - `Recording`, a directory of recorded responses
+    - `RecordingSession`, a session that records to or replays from a `Recording`
+    - `use_recording`, which makes every scraper use a `RecordingSession`
+    - `MissingRecording`, raised when replaying a url that was never recorded
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+from urllib.parse import urlsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from .http import create_session, set_session_factory
+
+MODES = ("record", "replay", "auto")
+
+
+class MissingRecording(requests.ConnectionError):
+    """Raised when replaying a request that is not in the recording. Subclasses `requests.ConnectionError` so that
+    scrapers handle it the same way as a site being unreachable
+    """
+
+
+class Recording:
+    """A directory of recorded responses, keyed by url"""
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+
+    @staticmethod
+    def key(url: str) -> str:
+        return hashlib.sha1(url.encode()).hexdigest()[:20]
+
+    def _path(self, url: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{self.key(url)}.{extension}")
+
+    def __contains__(self, url: str) -> bool:
+        return os.path.exists(self._path(url, "json"))
+
+    def load(self, url: str) -> requests.Response | None:
+        """Load the response recorded for a url
+
+        Args:
+            url (str): The url
+
+        Returns:
+            Optional[requests.Response]: The recorded response, or None if the url has not been recorded
+        """
+        try:
+            with open(self._path(url, "json")) as f:
+                meta = json.load(f)
+            with open(self._path(url, "body"), "rb") as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+
+        response = requests.Response()
+        response.url = meta["url"]
+        response.status_code = meta["status"]
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response.encoding = meta.get("encoding")
+        response._content = body
+        return response
+
+    def save(
+        self,
+        url: str,
+        body: bytes,
+        status: int = 200,
+        headers: dict | None = None,
+        encoding: str | None = None,
+    ) -> None:
+        """Record the response for a url, replacing any previous recording of it
+
+        Args:
+            url (str): The url
+            body (bytes): The raw body of the response
+            status (int, optional): The status code. Defaults to 200.
+            headers (Optional[dict], optional): The response headers. Defaults to None.
+            encoding (Optional[str], optional): The encoding of the body. Defaults to None.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._path(url, "body"), "wb") as f:
+            f.write(body)
+        # Hop-by-hop and transfer headers describe the original connection, not the recorded body
+        headers = {
+            k: v
+            for k, v in (headers or {}).items()
+            if k.lower()
+            not in ("content-encoding", "transfer-encoding", "connection", "keep-alive")
+        }
+        with open(self._path(url, "json"), "w") as f:
+            json.dump(
+                {
+                    "url": url,
+                    "status": status,
+                    "headers": headers,
+                    "encoding": encoding,
+                },
+                f,
+                indent=2,
+            )
+
+    def urls(self) -> list[str]:
+        """Get every url in the recording"""
+        if not os.path.isdir(self.directory):
+            return []
+        urls = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".json"):
+                with open(os.path.join(self.directory, name)) as f:
+                    urls.append(json.load(f)["url"])
+        return urls
+
+
+class RecordingSession(requests.Session):
+    """A session that records the responses to its GET requests, or replays them from a recording
+
+    Modes:
+        - record: make every request and record its response
+        - replay: serve every request from the recording, raising `MissingRecording` for urls that were never
+        recorded
+        - auto: serve recorded urls from the recording, and make and record every other request
+    """
+
+    def __init__(
+        self,
+        recording: Recording | str,
+        mode: str = "replay",
+        session: requests.Session | None = None,
+    ) -> None:
+        """
+        Args:
+            recording (Recording | str): The recording (or its directory)
+            mode (str, optional): One of record, replay or auto. Defaults to "replay".
+            session (Optional[requests.Session], optional): The session to make real requests with. Defaults to a
+            session from `scraping.http.create_session`.
+        """
+        if mode not in MODES:
+            raise ValueError(f"Unknown recording mode {mode}, expected one of {MODES}")
+        super().__init__()
+        self.recording = (
+            recording if isinstance(recording, Recording) else Recording(recording)
+        )
+        self.mode = mode
+        self._session = session
+
+    def request(self, method, url, **kwargs) -> requests.Response:
+        if method.upper() != "GET":
+            raise ValueError(f"Only GET requests can be recorded, not {method}")
+
+        if self.mode != "record":
+            response = self.recording.load(url)
+            if response is not None:
+                return response
+            if self.mode == "replay":
+                raise MissingRecording(f"{url} has not been recorded")
+
+        if self._session is None:
+            self._session = create_session(urlsplit(url).netloc.lower())
+        response = self._session.get(url, **kwargs)
+        self.recording.save(
+            url,
+            response.content,
+            response.status_code,
+            dict(response.headers),
+            getattr(response, "encoding", None),
+        )
+        return response
+
+    def close(self) -> None:
+        if self._session is not None:
+            self._session.close()
+        super().close()
+
+
+def use_recording(directory: str | None, mode: str = "replay") -> None:
+    """Make every scraper that uses the shared sessions of `scraping.http` record to or replay from a recording
+
+    Args:
+        directory (Optional[str]): The directory of the recording, or None to go back to the live sites
+        mode (str, optional): One of record, replay or auto (see `RecordingSession`). Defaults to "replay".
+    """
+    if directory is None:
+        set_session_factory(None)
+        return
+
+    recording = Recording(directory)
+    set_session_factory(lambda host: RecordingSession(recording, mode))
@@ -0,0 +1,112 @@
+"""This module implements streaming parsing of very large pages, for example an event's full match history.
+
+Instead of downloading the whole page and then building its whole tree, the response is read in chunks which are fed
+into an incremental lxml parser. Each element matching the requested tag and attributes (each match row, for example)
+is handed back as soon as its closing tag has been parsed, and is freed (along with everything before it) once the
+caller moves on to the next one. Peak memory is therefore bounded by the size of a row rather than the size of the page.
+
+Elements are only valid until the next one is requested, so extract what is needed from each element inside the loop
+(a `Schema` or `Rows` is a good fit). Matching elements should not be nested inside each other.
+
+Implements:
+    - `iter_elements`, which streams matching elements out of an iterable of byte chunks
+    - `stream_elements`, which streams matching elements out of a page as it is downloaded
+"""
+
+from __future__ import annotations
+
+import logging
+from collections.abc import Iterable, Iterator
+
+import requests
+from lxml import etree, html
+
+from .http import get_session
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def _matches(elem: html.HtmlElement, filters: dict[str, str]) -> bool:
+    return all(value in (elem.get(attr) or "") for attr, value in filters.items())
+
+
+def iter_elements(
+    chunks: Iterable[bytes], tag: str, **kwargs
+) -> Iterator[html.HtmlElement]:
+    """Incrementally parse HTML from the given chunks, yielding every element with the given tag whose attributes
+    contain the values given by the keyword arguments (the same filters as `xpath`, so `class_` and `id_` can be used)
+
+    Args:
+        chunks (Iterable[bytes]): The HTML, in chunks
+        tag (str): The tag of the elements to yield
+
+    Yields:
+        html.HtmlElement: Each matching element, as soon as it has been completely parsed
+    """
+    filters = {
+        "class": kwargs.pop("class_", None),
+        "id": kwargs.pop("id_", None),
+        **kwargs,
+    }
+    filters = {k: v for k, v in filters.items() if v}
+
+    parser = etree.HTMLPullParser(events=("end",), tag=tag)
+    parser.set_element_class_lookup(html.HtmlElementClassLookup())
+
+    def matched() -> Iterator[html.HtmlElement]:
+        for _, elem in parser.read_events():
+            if not _matches(elem, filters):
+                continue
+            yield elem
+            # The caller is done with the element, so free it and everything parsed before it. Rows are often grouped
+            # (matches by day, for example), so earlier groups are freed along with earlier rows
+            elem.clear(keep_tail=True)
+            node = elem
+            for ancestor in elem.iterancestors():
+                while node.getprevious() is not None:
+                    del ancestor[0]
+                node = ancestor
+
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from matched()
+    parser.close()
+    yield from matched()
+
+
+def stream_elements(
+    url: str,
+    tag: str,
+    session: requests.Session | None = None,
+    chunk_size: int = CHUNK_SIZE,
+    **kwargs,
+) -> Iterator[html.HtmlElement]:
+    """Download the page at the url, yielding every matching element while the page is still being downloaded. See
+    `iter_elements` for how elements are matched. Pages are streamed straight from the network, so the HTTP cache
+    is not used
+
+    Args:
+        url (str): The url of the page
+        tag (str): The tag of the elements to yield
+        session (Optional[requests.Session], optional): The session to fetch the page with. Defaults to the shared
+        session for the url's host.
+        chunk_size (int, optional): The number of bytes to read at a time. Defaults to 64KiB.
+
+    Yields:
+        html.HtmlElement: Each matching element, as soon as it has been completely parsed
+    """
+    try:
+        response = (session or get_session(url)).get(url, stream=True)
+    except requests.RequestException as e:
+        logger.warning("Failed to fetch %s: %s", url, e)
+        return
+
+    try:
+        if response.status_code != 200:
+            logger.warning("Failed to fetch %s: status %s", url, response.status_code)
+            return
+        yield from iter_elements(response.iter_content(chunk_size), tag, **kwargs)
+    finally:
+        response.close()
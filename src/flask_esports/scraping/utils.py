@@ -4,9 +4,35 @@ API.
 Implements:
     - `get_url_segment`
     - `epoch_from_timestamp`
+    - `epochs_from_timestamps`
 """
 
-from datetime import datetime
+import re
+from collections.abc import Iterable
+from datetime import UTC, datetime, timedelta, timezone
+from functools import lru_cache
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Below this many distinct timestamps, numpy's setup costs more than it saves
+NUMPY_THRESHOLD = 256
+
+# The same patterns that `datetime.strptime` uses for each numeric directive, so that the fast parser accepts (and
+# rejects) exactly the same timestamps. Formats using any other directive are left to `strptime`
+_DIRECTIVES = {
+    "d": r"(?P<d>3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])",
+    "f": r"(?P<f>[0-9]{1,6})",
+    "H": r"(?P<H>2[0-3]|[0-1]\d|\d)",
+    "m": r"(?P<m>1[0-2]|0[1-9]|[1-9])",
+    "M": r"(?P<M>[0-5]\d|\d)",
+    "S": r"(?P<S>6[0-1]|[0-5]\d|\d)",
+    "y": r"(?P<y>\d\d)",
+    "Y": r"(?P<Y>\d\d\d\d)",
+    "z": r"(?P<z>[+-]\d\d:?[0-5]\d(:?[0-5]\d(\.\d{1,6})?)?|(?-i:Z))",
+}
 
 
 def get_url_segment(url: str, index: int, rtype: type = str):
@@ -25,9 +51,80 @@ def get_url_segment(url: str, index: int, rtype: type = str):
     return rtype(url.split("/")[index].strip())
 
 
+@lru_cache(maxsize=128)
+def _compile_format(fmt: str) -> re.Pattern | None:
+    """Compile a timestamp format into a regex with a named group per directive, or None if the format uses a
+    directive that the fast parser does not handle
+    """
+    pattern = []
+    seen = set()
+    i = 0
+    while i < len(fmt):
+        char = fmt[i]
+        if char != "%":
+            pattern.append(r"\s+" if char.isspace() else re.escape(char))
+            # strptime treats any run of whitespace in the format as one or more whitespace characters
+            while char.isspace() and i + 1 < len(fmt) and fmt[i + 1].isspace():
+                i += 1
+        elif i + 1 < len(fmt) and fmt[i + 1] == "%":
+            pattern.append("%")
+            i += 1
+        elif i + 1 < len(fmt) and fmt[i + 1] in _DIRECTIVES and fmt[i + 1] not in seen:
+            seen.add(fmt[i + 1])
+            pattern.append(_DIRECTIVES[fmt[i + 1]])
+            i += 1
+        else:
+            return None
+        i += 1
+    return re.compile("".join(pattern), re.IGNORECASE)
+
+
+def _offset(z: str) -> timezone:
+    """Convert a matched %z into a timezone, the same way that strptime does"""
+    if z == "Z":
+        return UTC
+    if z[3] == ":":
+        z = z[:3] + z[4:]
+        if len(z) > 5:
+            if z[5] != ":":
+                raise ValueError(f"Inconsistent use of : in {z}")
+            z = z[:5] + z[6:]
+    seconds = int(z[1:3]) * 3600 + int(z[3:5]) * 60 + int(z[5:7] or 0)
+    micro = int(z[8:].ljust(6, "0")) if len(z) > 8 else 0
+    if z.startswith("-"):
+        seconds, micro = -seconds, -micro
+    return timezone(timedelta(seconds=seconds, microseconds=micro))
+
+
+def _fields(match: re.Match) -> tuple:
+    found = match.groupdict()
+    if found.get("Y"):
+        year = int(found["Y"])
+    elif found.get("y"):
+        year = int(found["y"])
+        year += 2000 if year <= 68 else 1900
+    else:
+        year = 1900
+    return (
+        year,
+        int(found.get("m") or 1),
+        int(found.get("d") or 1),
+        int(found.get("H") or 0),
+        int(found.get("M") or 0),
+        int(found.get("S") or 0),
+        int((found.get("f") or "0").ljust(6, "0")),
+        _offset(found["z"]) if found.get("z") else None,
+    )
+
+
+@lru_cache(maxsize=4096)
 def epoch_from_timestamp(ts: str, fmt: str) -> float:
     """Converts a given timestamp to seconds from the epoch, given the format of the timestamp
 
+    Formats made up of numeric directives (%Y %y %m %d %H %M %S %f %z) are parsed with a regex compiled once per
+    format, anything else falls back to `datetime.strptime`. Results are memoized, as scraped pages tend to repeat the
+    same dates many times
+
     Args:
         ts (str): The timestamp to convert
         fmt (str): The format of the timestamp to convert to
@@ -35,4 +132,78 @@ def epoch_from_timestamp(ts: str, fmt: str) -> float:
     Returns:
         float: The time in seconds since the 1st Jan 1970
     """
-    return datetime.strptime(ts, fmt).timestamp()
+    pattern = _compile_format(fmt)
+    if pattern is None:
+        return datetime.strptime(ts, fmt).timestamp()
+
+    match = pattern.fullmatch(ts)
+    if match is None:
+        raise ValueError(f"time data {ts!r} does not match format {fmt!r}")
+    *fields, tz = _fields(match)
+    return datetime(*fields, tzinfo=tz).timestamp()
+
+
+def epochs_from_timestamps(
+    timestamps: Iterable[str], fmt: str, use_numpy: bool | None = None
+) -> list[float]:
+    """Converts a list of timestamps that share a format to seconds from the epoch, giving the same results as calling
+    `epoch_from_timestamp` on each of them. Each distinct timestamp is only converted once
+
+    If numpy is installed and the format includes a UTC offset (%z), large lists are converted with vectorized
+    datetime64 arithmetic. Timestamps without an offset are in local time, which has to be converted one at a time
+
+    Args:
+        timestamps (Iterable[str]): The timestamps to convert
+        fmt (str): The format of the timestamps
+        use_numpy (Optional[bool], optional): Whether to use numpy. Defaults to using it when it is worthwhile.
+
+    Returns:
+        list[float]: The time in seconds since the 1st Jan 1970 of each timestamp
+    """
+    timestamps = list(timestamps)
+    unique = list(dict.fromkeys(timestamps))
+
+    pattern = _compile_format(fmt)
+    if use_numpy is None:
+        use_numpy = len(unique) >= NUMPY_THRESHOLD
+    if (
+        use_numpy
+        and np is not None
+        and pattern is not None
+        and "(?P<z>" in pattern.pattern
+    ):
+        converted = _numpy_epochs(unique, pattern, fmt)
+    else:
+        converted = {ts: epoch_from_timestamp(ts, fmt) for ts in unique}
+    return [converted[ts] for ts in timestamps]
+
+
+def _numpy_epochs(
+    timestamps: list[str], pattern: re.Pattern, fmt: str
+) -> dict[str, float]:
+    fields = []
+    for ts in timestamps:
+        match = pattern.fullmatch(ts)
+        if match is None:
+            # Raise the same error as a single conversion would
+            epoch_from_timestamp(ts, fmt)
+        *values, tz = _fields(match)
+        fields.append((*values, tz.utcoffset(None) // timedelta(microseconds=1)))
+    year, month, day, hour, minute, second, micro, offset = np.array(
+        fields, dtype=np.int64
+    ).T
+
+    months = (year - 1970) * 12 + (month - 1)
+    month_start = months.astype("datetime64[M]").astype("datetime64[D]")
+    month_length = (months + 1).astype("datetime64[M]").astype(
+        "datetime64[D]"
+    ) - month_start
+    invalid = (day > month_length.astype(np.int64)) | (second > 59) | (year < 1)
+    for i in np.flatnonzero(invalid):
+        epoch_from_timestamp(timestamps[i], fmt)
+
+    days = month_start.astype(np.int64) + day - 1
+    microseconds = (
+        (((days * 24 + hour) * 60 + minute) * 60 + second) * 1_000_000 + micro - offset
+    )
+    return dict(zip(timestamps, (microseconds / 1_000_000).tolist()))
@@ -3,29 +3,219 @@
 Implements:
     - `XpathParser`, a class that can be used to scrape sites by xpath strings
     - `xpath`, a function that generates xpath strings based on the arguments passed
+    - `compile_xpath`, a function that gets the (cached) compiled form of an xpath string
+    - `prefetch`, a function that concurrently fetches the pages of lazy `XpathParser`s
+    - `share_pages`, within which parsers for the same url share a single fetch and parse
+    - `Schema`, `Rows` and `Field`, which declare everything to extract from a page so that it can be extracted in a
+    single pass
 """
 
+from __future__ import annotations
+
+import contextvars
+import logging
+import threading
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+from typing import Any
+
 import requests
-from typing import Optional
+from lxml import etree, html
+
+from .. import tracing
+from ..config import Config
+from .cache import HttpCache, get_http_cache
+from .changes import ChangeSet, ChangeTracker, active_change_set
+from .http import get_session
+
+logger = logging.getLogger(__name__)
+
+# Maximum number of compiled xpaths kept per thread
+XPATH_CACHE_SIZE = 1024
+
+_compiled = threading.local()
+
+
+def compile_xpath(xpath: str) -> etree.XPath:
+    """Get the compiled form of an XPATH string, so that lxml does not have to parse the expression every time it is
+    evaluated. Compiled expressions are cached per thread, as lxml only lets one thread evaluate a compiled expression
+    at a time
 
-from lxml import html
+    Args:
+        xpath (str): The XPATH to compile
+
+    Returns:
+        etree.XPath: The compiled XPATH, which can be called with the element to evaluate it against
+    """
+    cache = getattr(_compiled, "cache", None)
+    if cache is None:
+        cache = _compiled.cache = {}
+
+    compiled = cache.get(xpath)
+    if compiled is None:
+        if len(cache) >= XPATH_CACHE_SIZE:
+            cache.clear()
+        compiled = cache[xpath] = etree.XPath(xpath)
+    return compiled
+
+
+# Marks a parser whose page has not been fetched yet
+_UNFETCHED = object()
+# Marks a parser whose page was fetched but not parsed, as it was unchanged (see `scraping.changes`)
+_UNPARSED = object()
+
+# The first parser for each url fetched within `share_pages`, whose page the later parsers for the url reuse
+_shared_pages: contextvars.ContextVar[dict[str, XpathParser] | None] = (
+    contextvars.ContextVar("flask_esports_shared_pages", default=None)
+)
+_shared_lock = threading.Lock()
+
+
+@contextmanager
+def share_pages() -> Iterator[None]:
+    """Within this block (and threads started with a copy of its context), parsers for the same url share a single
+    fetch and parse of the page, so that resources scraped from the same pages concurrently only fetch them once. The
+    shared trees must be treated as read only
+    """
+    token = _shared_pages.set({})
+    try:
+        yield
+    finally:
+        _shared_pages.reset(token)
 
 
 class XpathParser:
     """Wrapper class around a `requests.get()` call that implements easier methods of parsing XPATH
-    directly from the URL
+    directly from the URL. Pages are fetched with a pooled, keep-alive session shared by every parser for the same host
     """
 
-    def __init__(self, url: str) -> None:
+    def __init__(
+        self,
+        url: str,
+        session: requests.Session | None = None,
+        cache: HttpCache | None = None,
+        lazy: bool = False,
+        tracker: ChangeTracker | None = None,
+    ) -> None:
         """Creates a parser that is capable of taking XPATH's and returning desired objects
 
         Args:
             url (str): The url of the website to parse
+            session (Optional[requests.Session], optional): The session to fetch the page with. Defaults to the
+            shared session for the url's host (see `scraping.http`).
+            cache (Optional[HttpCache], optional): The cache to fetch the page through. Defaults to the default cache
+            (see `scraping.cache`), if there is one.
+            lazy (bool, optional): Don't fetch the page until its content is first needed, so that parsers can be
+            created up front and fetched together with `prefetch`. Defaults to False.
+            tracker (Optional[ChangeTracker], optional): Only hash the page within change sets of this tracker. Pages
+            are only hashed (so that an unchanged page is not parsed unless its content is used) when fetched within
+            `ChangeTracker.changes`. Defaults to the change set of any tracker.
         """
-        response = requests.get(url)
-        self.content = (
-            html.fromstring(response.content) if response.status_code == 200 else None
-        )
+        self.url = url
+        self._session = session
+        self._cache = cache
+        self._tracker = tracker
+        self._content = _UNFETCHED
+        self._body: bytes | None = None
+        # Whether the page changed since it was last committed, None if unknown (fetched outside of a change set, cached
+        # or failed pages)
+        self.changed: bool | None = None
+        self._lock = threading.Lock()
+
+        if not lazy:
+            self.fetch()
+
+    @property
+    def content(self) -> html.HtmlElement | None:
+        """The parsed page (or None if it could not be fetched), fetching it first if the parser is lazy"""
+        if self._content is _UNFETCHED:
+            self.fetch()
+        if self._content is _UNPARSED:
+            with self._lock:
+                if self._content is _UNPARSED:
+                    with tracing.span("scrape.parse", url=self.url):
+                        self._content = html.fromstring(self._body)
+                    self._body = None
+        return self._content
+
+    def is_fetched(self) -> bool:
+        return self._content is not _UNFETCHED
+
+    def fetch(self) -> bool:
+        """Fetch and parse the page, unless that has already been done. Safe to call from multiple threads
+
+        Returns:
+            bool: Whether the page was fetched successfully
+        """
+        with self._lock:
+            if self._content is _UNFETCHED and not self._fetch_shared():
+                with tracing.span("scrape.fetch", url=self.url):
+                    self._content = self._fetch(
+                        self._session or get_session(self.url),
+                        self._cache or get_http_cache(),
+                        active_change_set(self._tracker),
+                    )
+        return self._content is not None
+
+    def _fetch_shared(self) -> bool:
+        """Take the page from the first parser for the url within `share_pages`, if this is not that parser"""
+        shared = _shared_pages.get()
+        if shared is None:
+            return False
+        with _shared_lock:
+            owner = shared.setdefault(self.url, self)
+        if owner is self:
+            return False
+        owner.fetch()
+        self._content, self.changed = owner.content, owner.changed
+        return True
+
+    def _fetch(
+        self,
+        session: requests.Session,
+        cache: HttpCache | None,
+        changes: ChangeSet | None = None,
+    ) -> Any:
+        try:
+            if cache is not None:
+                if changes is not None:
+                    changes.add_unchecked(self.url)
+                return cache.fetch(self.url, session)
+            response = session.get(self.url)
+        except requests.RequestException as e:
+            logger.warning("Failed to fetch %s: %s", self.url, e)
+            response = None
+
+        if response is None or response.status_code != 200:
+            if changes is not None:
+                changes.tracker.record_failure(self.url)
+                changes.add_unchecked(self.url)
+            return None
+        if changes is not None:
+            self.changed = changes.tracker.check_page(self.url, response.content)
+            if not self.changed:
+                # Left unparsed until the content is actually used
+                self._body = response.content
+                return _UNPARSED
+        with tracing.span("scrape.parse", url=self.url):
+            return html.fromstring(response.content)
+
+    @classmethod
+    def from_content(cls, url: str, content: bytes | None) -> XpathParser:
+        """Creates a parser from a page that has already been fetched, without making any request
+
+        Args:
+            url (str): The url the page was fetched from
+            content (Optional[bytes]): The body of the page (or None if it could not be fetched)
+
+        Returns:
+            XpathParser: The parser
+        """
+        parser = cls(url, lazy=True)
+        parser._content = html.fromstring(content) if content is not None else None
+        return parser
 
     def was_success(self) -> bool:
         """Did the parser recieve a 200 response from the provided url, without any error
@@ -33,9 +223,9 @@ class XpathParser:
         Returns:
             bool: True if the contents of the web page have been successfully loaded else False
         """
-        return self.content is not None
+        return self.fetch()
 
-    def get_element(self, xpath: str) -> Optional[html.HtmlElement]:
+    def get_element(self, xpath: str) -> html.HtmlElement | None:
         """Gets a single HTML element from an XPATH string
 
         Args:
@@ -44,7 +234,7 @@ class XpathParser:
         Returns:
             html.HtmlElement: the HtmlElement at the desired XPATH
         """
-        elem = self.content.xpath(xpath)
+        elem = compile_xpath(xpath)(self.content)
         return elem[0] if elem else None
 
     def get_elements(self, xpath: str, attr: str = "") -> list[html.HtmlElement]:
@@ -60,13 +250,10 @@ class XpathParser:
         Returns:
             list[str | html.HtmlElement]: The list of elements that match the given XPATH
         """
-        return (
-            [elem.get(attr, None) for elem in self.content.xpath(xpath)]
-            if attr
-            else self.content.xpath(xpath)
-        )
+        elems = compile_xpath(xpath)(self.content)
+        return [elem.get(attr, None) for elem in elems] if attr else elems
 
-    def get_img(self, xpath: str) -> Optional[str]:
+    def get_img(self, xpath: str) -> str | None:
         """Gets an image src from a given XPATH string
 
         Args:
@@ -77,7 +264,7 @@ class XpathParser:
         """
         return self.get_element(xpath).get("src", "").strip() or None
 
-    def get_href(self, xpath: str) -> Optional[str]:
+    def get_href(self, xpath: str) -> str | None:
         """Gets an link href from a given XPATH string
 
         Args:
@@ -88,7 +275,18 @@ class XpathParser:
         """
         return self.get_element(xpath).get("href", "").strip() or None
 
-    def get_text(self, xpath: str) -> Optional[str]:
+    def extract(self, schema: Schema) -> Any:
+        """Extract everything declared by the schema from the page
+
+        Args:
+            schema (Schema): The schema to extract
+
+        Returns:
+            Any: The extracted dict (or object, if the schema has an `into` type)
+        """
+        return schema.extract(self.content)
+
+    def get_text(self, xpath: str) -> str | None:
         """Gets the inner text of the given XPATH
 
         Args:
@@ -107,6 +305,173 @@ class XpathParser:
         return elem.text.strip()
 
 
+def prefetch(
+    parsers: Iterable[XpathParser], max_workers: int | None = None
+) -> list[XpathParser]:
+    """Concurrently fetch every parser that has not been fetched yet, so that a resource spread over several pages
+    (a team's profile, roster and matches for example) takes one round trip rather than one per page
+
+    Args:
+        parsers (Iterable[XpathParser]): The (lazy) parsers to fetch
+        max_workers (Optional[int], optional): The maximum number of pages fetched at once. Defaults to
+        `Config.SCRAPE_CONCURRENCY`.
+
+    Returns:
+        list[XpathParser]: The parsers
+    """
+    parsers = list(parsers)
+    pending = [p for p in parsers if not p.is_fetched()]
+    if len(pending) == 1:
+        pending[0].fetch()
+    elif pending:
+        workers = min(len(pending), max_workers or Config.SCRAPE_CONCURRENCY)
+        with ThreadPoolExecutor(workers, "prefetch") as executor:
+            # Each fetch runs in a copy of the caller's context, so its spans belong to the caller's trace
+            contexts = [contextvars.copy_context() for _ in pending]
+            list(executor.map(lambda c, p: c.run(p.fetch), contexts, pending))
+    return parsers
+
+
+class Field:
+    """Declares a single value to extract from a page, relative to the node its schema is evaluated on
+
+    For example `Field(xpath("a", class_="team"), "href", get_url_segment, (2, int))` extracts the id from the link
+    of a team
+    """
+
+    def __init__(
+        self,
+        xpath: str = ".",
+        attr: str = "",
+        convert: Callable | None = None,
+        args: tuple = (),
+        default: Any = None,
+        many: bool = False,
+    ) -> None:
+        """
+        Args:
+            xpath (str, optional): XPATH of the element, relative to the node being evaluated (an XPATH starting with
+            `//` only searches below the node). Defaults to the node itself.
+            attr (str, optional): The attribute to take the value from, or '' for the element's text. Defaults to ''.
+            convert (Optional[Callable], optional): Called with the value (and `args`) to convert it. Must be a module
+            level function for the schema to be usable with `ParseExecutor` processes. Defaults to None.
+            args (tuple, optional): Extra arguments passed to `convert`. Defaults to ().
+            default (Any, optional): The value used if no element or value is found. Defaults to None.
+            many (bool, optional): Extract a list of the values of every matching element. Defaults to False.
+        """
+        self.xpath = f".{xpath}" if xpath.startswith("/") else xpath
+        self.attr = attr
+        self.convert = convert
+        self.args = args
+        self.default = default
+        self.many = many
+
+    def _value(self, elem: Any) -> str | float | bool | None:
+        if isinstance(elem, (bool, float)):
+            return elem
+        if isinstance(elem, str):
+            value = elem
+        elif self.attr:
+            value = elem.get(self.attr)
+        else:
+            value = elem.text
+        return value.strip() or None if value is not None else None
+
+    def evaluate(self, node: html.HtmlElement) -> Any:
+        elems = compile_xpath(self.xpath)(node)
+        # XPATHs such as count(...) or normalize-space(...) evaluate to a single number, boolean or string
+        if not isinstance(elems, list):
+            elems = [elems]
+        if self.many:
+            values = [v for v in map(self._value, elems) if v is not None]
+            return (
+                [self.convert(v, *self.args) for v in values]
+                if self.convert is not None
+                else values
+            )
+
+        value = self._value(elems[0]) if elems else None
+        if value is None:
+            return self.default
+        return self.convert(value, *self.args) if self.convert is not None else value
+
+    def compile(self) -> None:
+        """Compile the field's xpath for the calling thread ahead of its first evaluation"""
+        compile_xpath(self.xpath)
+
+
+class Schema:
+    """Declares everything to extract from a page (or part of a page) as a mapping of names to `Field`s, `Rows` or
+    nested `Schema`s. Every xpath is evaluated relative to the node the schema is extracted from, so a page is walked
+    once rather than from the root for every value
+
+    For example:
+        Schema({
+            "name": Field(xpath("h1", class_="team-name")),
+            "matches": Rows(xpath("a", class_="match-item"), {
+                "id": Field(".", "href", get_url_segment, (1, int)),
+                "date": Field(xpath("div", class_="date"), convert=epoch_from_timestamp, args=("%d/%m/%Y",)),
+            }),
+        })
+    """
+
+    def __init__(self, fields: dict[str, Field | Schema], into: type | None = None):
+        """
+        Args:
+            fields (dict[str, Field | Schema]): The values to extract, by name
+            into (Optional[type], optional): A type to construct with the extracted values as keyword arguments instead
+            of returning a dict. Defaults to None.
+        """
+        self.fields = fields
+        self.into = into
+
+    def evaluate(self, node: html.HtmlElement) -> Any:
+        values = {name: field.evaluate(node) for name, field in self.fields.items()}
+        return self.into(**values) if self.into is not None else values
+
+    def extract(self, node: html.HtmlElement | None) -> Any:
+        """Extract the schema from a node (usually the root of a page)
+
+        Args:
+            node (Optional[html.HtmlElement]): The node to extract from
+
+        Returns:
+            Any: The extracted dict (or object, if the schema has an `into` type), or None if there is no node
+        """
+        return self.evaluate(node) if node is not None else None
+
+    def compile(self) -> None:
+        """Compile every xpath in the schema for the calling thread ahead of its first extraction"""
+        for field in self.fields.values():
+            field.compile()
+
+
+class Rows(Schema):
+    """A schema that is evaluated against every element matching its xpath (a table row for example), producing a
+    list with one entry per element
+    """
+
+    def __init__(
+        self, xpath: str, fields: dict[str, Field | Schema], into: type | None = None
+    ) -> None:
+        """
+        Args:
+            xpath (str): XPATH of the row elements, relative to the node being evaluated
+            fields (dict[str, Field | Schema]): The values to extract from each row, relative to the row
+            into (Optional[type], optional): A type to construct from each row. Defaults to None.
+        """
+        super().__init__(fields, into)
+        self.xpath = f".{xpath}" if xpath.startswith("/") else xpath
+
+    def evaluate(self, node: html.HtmlElement) -> list:
+        return [Schema.evaluate(self, row) for row in compile_xpath(self.xpath)(node)]
+
+    def compile(self) -> None:
+        compile_xpath(self.xpath)
+        super().compile()
+
+
+@lru_cache(maxsize=1024)
 def xpath(elem: str, root: str = "", **kwargs) -> str:
     """Create an XPATH string that selects the element passed into the `elem` parameter which matches the htmlelement
     attributes specified using the keyword arguments.
@@ -135,6 +500,7 @@ def xpath(elem: str, root: str = "", **kwargs) -> str:
     )
 
 
+@lru_cache(maxsize=1024)
 def join(*xpath: list[str]) -> str:
     """Create an xpath that is the combination of the xpaths provided
     Performs a similar function to os.path.join()
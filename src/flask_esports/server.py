@@ -0,0 +1,309 @@
+"""A production server for the API, which needs nothing beyond this package's own dependencies.
+
+The app and every game are imported once in a master process, which binds the listening socket and then forks
+`Config.SERVER_WORKERS` worker processes, so the imported modules are shared copy-on-write rather than loaded once per
+worker. Each worker warms up (see `warmup`) before it starts accepting connections on the shared socket, serves
+requests one at a time (so that per-thread caches like compiled xpaths stay warm), and is replaced after serving
+`Config.SERVER_MAX_REQUESTS` requests. The master replaces any worker that exits.
+
+Signals sent to the master:
+    - SIGTERM / SIGINT: stop every worker gracefully, killing any still running after `Config.SERVER_GRACEFUL_TIMEOUT`
+    - SIGHUP: gracefully replace every worker
+
+Run it with `python -m flask_esports.server [--host HOST] [--port PORT] [--workers N]`. On platforms without
+`os.fork` the app is served by a single threaded process instead.
+
+Implements:
+    - `PreforkServer`
+    - `serve`, which creates the app and serves it
+    - `warmup` and `add_warmup_hook`, which prepare a worker before it accepts traffic
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import random
+import signal
+import socket
+import sys
+import threading
+import time
+from collections.abc import Callable
+
+from flask import Flask
+from werkzeug.serving import make_server, run_simple
+
+from .config import Config
+from .scraping.http import clear_sessions
+from .scraping.xpath import Schema
+
+logger = logging.getLogger(__name__)
+
+WarmupHook = Callable[[Flask], None]
+
+_warmup_hooks: list[WarmupHook] = []
+
+# Workers that exit within this many seconds of starting are restarted after a delay, so that a worker that crashes
+# on startup does not make the master spin
+MIN_WORKER_LIFETIME = 1.0
+
+
+def add_warmup_hook(hook: WarmupHook) -> None:
+    """Register a function that is called with the app in every worker before it accepts traffic"""
+    _warmup_hooks.append(hook)
+
+
+def compile_schemas(app: Flask) -> None:
+    """Compile the xpaths of every `Schema` defined at the top level of an imported module"""
+    for module in list(sys.modules.values()):
+        for value in list(getattr(module, "__dict__", {}).values()):
+            if isinstance(value, Schema):
+                value.compile()
+
+
+def request_warmup_paths(app: Flask) -> None:
+    """Request each of the app's `SERVER_WARMUP_PATHS`, priming its database connections, sessions and caches"""
+    client = app.test_client()
+    for path in app.config.get("SERVER_WARMUP_PATHS", ()):
+        status = client.get(path).status_code
+        if status >= 500:
+            logger.warning("Warmup request to %s failed with status %d", path, status)
+
+
+def warmup(app: Flask) -> None:
+    """Prepare the calling worker to serve the app: compile the xpaths of every schema, request the configured warmup
+    paths and run every registered warmup hook. Failing hooks are logged rather than stopping the worker
+    """
+    for hook in (compile_schemas, request_warmup_paths, *_warmup_hooks):
+        start = time.perf_counter()
+        try:
+            hook(app)
+        except Exception:
+            logger.exception("Warmup hook %s failed", hook.__name__)
+        else:
+            logger.debug(
+                "Warmup hook %s took %.1f ms",
+                hook.__name__,
+                (time.perf_counter() - start) * 1000,
+            )
+
+
+class PreforkServer:
+    """Serves an app from a pool of forked worker processes sharing one listening socket"""
+
+    def __init__(
+        self,
+        app: Flask,
+        host: str | None = None,
+        port: int | None = None,
+        workers: int | None = None,
+        max_requests: int | None = None,
+        max_requests_jitter: int | None = None,
+        graceful_timeout: float | None = None,
+    ) -> None:
+        """
+        Args:
+            app (Flask): The app to serve. Should already have every game imported (see `create_app(eager=True)`)
+            host (Optional[str], optional): Defaults to `Config.SERVER_HOST`.
+            port (Optional[int], optional): The port to listen on, 0 for any free port. Defaults to
+            `Config.SERVER_PORT`.
+            workers (Optional[int], optional): Defaults to `Config.SERVER_WORKERS`.
+            max_requests (Optional[int], optional): Defaults to `Config.SERVER_MAX_REQUESTS`.
+            max_requests_jitter (Optional[int], optional): Defaults to `Config.SERVER_MAX_REQUESTS_JITTER`.
+            graceful_timeout (Optional[float], optional): Defaults to `Config.SERVER_GRACEFUL_TIMEOUT`.
+        """
+        self.app = app
+        self.host = host or Config.SERVER_HOST
+        self.port = Config.SERVER_PORT if port is None else port
+        self.workers = workers or Config.SERVER_WORKERS
+        self.max_requests = (
+            Config.SERVER_MAX_REQUESTS if max_requests is None else max_requests
+        )
+        self.max_requests_jitter = (
+            Config.SERVER_MAX_REQUESTS_JITTER
+            if max_requests_jitter is None
+            else max_requests_jitter
+        )
+        self.graceful_timeout = (
+            Config.SERVER_GRACEFUL_TIMEOUT
+            if graceful_timeout is None
+            else graceful_timeout
+        )
+
+        self.socket: socket.socket | None = None
+        # pid -> time started
+        self._workers: dict[int, float] = {}
+        self._stopping = False
+
+    def bind(self) -> None:
+        """Open the listening socket (done by `serve_forever` if it has not been done already)"""
+        self.socket = socket.create_server((self.host, self.port), backlog=2048)
+        self.socket.set_inheritable(True)
+        # Every worker polls the socket, and those that lose the race to accept a connection must not block in
+        # accept(), or they could not be stopped until another connection arrives. A failed accept is ignored by
+        # socketserver, which goes back to polling
+        self.socket.setblocking(False)
+        self.port = self.socket.getsockname()[1]
+
+    def serve_forever(self) -> None:
+        """Start the workers and supervise them until the server is stopped"""
+        if self.socket is None:
+            self.bind()
+        logger.info(
+            "Listening on http://%s:%d with %d workers",
+            self.host,
+            self.port,
+            self.workers,
+        )
+
+        signal.signal(signal.SIGTERM, self._handle_stop)
+        signal.signal(signal.SIGINT, self._handle_stop)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        signal.signal(signal.SIGALRM, self._handle_timeout)
+
+        for _ in range(self.workers):
+            self._spawn()
+
+        while self._workers:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            started = self._workers.pop(pid, None)
+            if started is None or self._stopping:
+                continue
+
+            code = os.waitstatus_to_exitcode(status)
+            if code != 0:
+                logger.warning("Worker %d exited with %d", pid, code)
+            if code != 0 and time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            self._spawn()
+
+        signal.alarm(0)
+        self.socket.close()
+        logger.info("Stopped")
+
+    def _spawn(self) -> None:
+        pid = os.fork()
+        if pid:
+            self._workers[pid] = time.monotonic()
+            return
+
+        code = 0
+        try:
+            self._run_worker()
+        except BaseException:
+            logger.exception("Worker %d crashed", os.getpid())
+            code = 1
+        finally:
+            # Never return into the master's code
+            os._exit(code)
+
+    def _signal_workers(self, signum: int) -> None:
+        for pid in list(self._workers):
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def _handle_stop(self, signum, frame) -> None:
+        if self._stopping:
+            return
+        self._stopping = True
+        logger.info("Stopping workers")
+        self._signal_workers(signal.SIGTERM)
+        signal.alarm(max(int(self.graceful_timeout), 1))
+
+    def _handle_reload(self, signum, frame) -> None:
+        logger.info("Replacing workers")
+        self._signal_workers(signal.SIGTERM)
+
+    def _handle_timeout(self, signum, frame) -> None:
+        logger.warning("Killing %d workers that did not stop", len(self._workers))
+        self._signal_workers(signal.SIGKILL)
+
+    def _run_worker(self) -> None:
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGALRM):
+            signal.signal(signum, signal.SIG_DFL)
+        random.seed()
+        # Sessions opened by the master share their sockets with every worker
+        clear_sessions()
+
+        warmup(self.app)
+
+        limit = (
+            self.max_requests + random.randint(0, self.max_requests_jitter)
+            if self.max_requests
+            else None
+        )
+        served = 0
+
+        def app(environ, start_response):
+            nonlocal served
+            served += 1
+            if limit is not None and served == limit:
+                stop()
+            return self.app(environ, start_response)
+
+        server = make_server(self.host, self.port, app, fd=self.socket.fileno())
+
+        def stop(*args) -> None:
+            # shutdown() waits for serve_forever to return, so cannot be called from the serving thread
+            threading.Thread(target=server.shutdown, daemon=True).start()
+
+        signal.signal(signal.SIGTERM, stop)
+        server.serve_forever(poll_interval=0.5)
+
+
+def serve(
+    app: Flask | None = None,
+    host: str | None = None,
+    port: int | None = None,
+    workers: int | None = None,
+) -> None:
+    """Serve the API with `PreforkServer`, or a threaded single process server where `os.fork` is not available
+
+    Args:
+        app (Optional[Flask], optional): The app to serve. Defaults to `create_app(eager=True)`.
+        host (Optional[str], optional): Defaults to `Config.SERVER_HOST`.
+        port (Optional[int], optional): Defaults to `Config.SERVER_PORT`.
+        workers (Optional[int], optional): Defaults to `Config.SERVER_WORKERS`.
+    """
+    if app is None:
+        from .app import create_app
+
+        # Import every game before forking, so that the workers share them
+        app = create_app(eager=True)
+
+    if not hasattr(os, "fork"):
+        logger.warning("os.fork is not available, serving from a single process")
+        warmup(app)
+        run_simple(
+            host or Config.SERVER_HOST,
+            Config.SERVER_PORT if port is None else port,
+            app,
+            threaded=True,
+        )
+        return
+
+    PreforkServer(app, host, port, workers).serve_forever()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Serve the esports API")
+    parser.add_argument("--host")
+    parser.add_argument("--port", type=int)
+    parser.add_argument("--workers", type=int)
+    options = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO, format="[%(asctime)s] [%(process)d] %(message)s"
+    )
+    serve(host=options.host, port=options.port, workers=options.workers)
+
+
+if __name__ == "__main__":
+    main()
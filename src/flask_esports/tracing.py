@@ -0,0 +1,341 @@
+"""Lightweight tracing of where requests spend their time
+
+A trace is a tree of spans, each timing one operation. Spans are created with `span`, and the span that is current
+is tracked with a `contextvars.ContextVar`, so spans nest by themselves across function calls (and threads started
+with a copy of the context, like `scraping.xpath.prefetch`). Spans are created out of the box around:
+    - `GameBlueprint` endpoint handlers (the root span of each request) and each `DataSource` call
+    - `XpathParser` fetches and parses
+    - `query_db` and `update_db` statements
+    - `ResponseFactory` serialization
+
+Tracing is off unless `Config.TRACING_ENABLED` is set, in which case `Config.TRACING_SAMPLE_RATE` of root spans are
+sampled (along with every span under them). Spans that are not sampled cost a flag check. Sampled traces are handed to
+every exporter once all of their spans have finished: `JsonLinesExporter` writes them to a local file and
+`OpenTelemetryExporter` forwards them to an OpenTelemetry SDK tracer (if `opentelemetry-sdk` is installed).
+
+Implements:
+    - `span`, which creates a span
+    - `configure_tracing`, `add_exporter` and `clear_exporters`
+    - `Span`, `Trace`, `JsonLinesExporter` and `OpenTelemetryExporter`
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import random
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Protocol, Self
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class Exporter(Protocol):
+    def export(self, trace: Trace) -> None: ...
+
+
+class _Noop:
+    """Stands in for a span when tracing is disabled or the trace is not sampled"""
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc) -> bool:
+        return False
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+NOOP = _Noop()
+
+# The innermost span entered in the current context, NOOP within an unsampled trace and None outside of any trace
+_current: ContextVar[Span | _Noop | None] = ContextVar(
+    "flask_esports_span", default=None
+)
+
+_enabled = Config.TRACING_ENABLED
+_sample_rate = Config.TRACING_SAMPLE_RATE
+_exporters: list[Exporter] = []
+
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+
+class Trace:
+    """The spans of one sampled root span and everything beneath it
+
+    The trace is exported once every span that was entered has finished, rather than when the root span does, so that
+    spans of threads that outlive the root (a prefetch the request did not wait for, for example) are not lost. Spans
+    entered after that are dropped.
+    """
+
+    def __init__(self) -> None:
+        self.trace_id = _new_id(128)
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+        self._open = 0
+        self._exported = False
+
+    def start(self, span: Span) -> None:
+        with self._lock:
+            self._open += 1
+
+    def finish(self, span: Span) -> None:
+        with self._lock:
+            self._open -= 1
+            if self._exported:
+                logger.debug(
+                    "Dropped span %s finished after trace %s was exported",
+                    span.name,
+                    self.trace_id,
+                )
+                return
+            self.spans.append(span)
+            if self._open > 0:
+                return
+            self._exported = True
+        for exporter in _exporters:
+            try:
+                exporter.export(self)
+            except Exception:
+                logger.exception("Failed to export trace %s", self.trace_id)
+
+    def to_dict(self) -> dict:
+        return {
+            "trace-id": self.trace_id,
+            "spans": [s.to_dict() for s in self.spans],
+        }
+
+
+class Span:
+    """A timed operation, used as a context manager"""
+
+    __slots__ = (
+        "_token",
+        "attributes",
+        "end_ns",
+        "error",
+        "name",
+        "parent_id",
+        "span_id",
+        "start_ns",
+        "trace",
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace: Trace,
+        parent_id: str | None,
+        attributes: dict[str, Any],
+    ) -> None:
+        self.name = name
+        self.trace = trace
+        self.span_id = _new_id(64)
+        self.parent_id = parent_id
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: str | None = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> Self:
+        self.trace.start(self)
+        self._token = _current.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> bool:
+        self.end_ns = time.time_ns()
+        if exc is not None:
+            self.error = repr(exc)
+        _current.reset(self._token)
+        self.trace.finish(self)
+        return False
+
+    @property
+    def duration_ms(self) -> float:
+        return (self.end_ns - self.start_ns) / 1e6
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span-id": self.span_id,
+            "parent-id": self.parent_id,
+            "start-ns": self.start_ns,
+            "duration-ms": self.duration_ms,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _Unsampled:
+    """Marks everything beneath an unsampled root as unsampled, so that its children are not sampled on their own"""
+
+    def __enter__(self) -> _Noop:
+        self._token = _current.set(NOOP)
+        return NOOP
+
+    def __exit__(self, *exc) -> bool:
+        _current.reset(self._token)
+        return False
+
+
+def span(name: str, **attributes: Any) -> Span | _Noop | _Unsampled:
+    """Create a span timing the code within its `with` block, as a child of the current span. Outside of any span, a
+    new (sampled) trace is started
+
+    For example:
+        with span("scrape.fetch", url=url):
+            response = session.get(url)
+
+    Args:
+        name (str): What the span is timing
+        **attributes: Details of the operation, exported along with the span
+
+    Returns:
+        Span | _Noop | _Unsampled: The context manager
+    """
+    if not _enabled:
+        return NOOP
+    parent = _current.get()
+    if parent is None:
+        if random.random() >= _sample_rate:
+            return _Unsampled()
+        return Span(name, Trace(), None, attributes)
+    if parent is NOOP:
+        return NOOP
+    return Span(name, parent.trace, parent.span_id, attributes)
+
+
+def current_span() -> Span | None:
+    """Get the span the caller is within, if it is being traced"""
+    current = _current.get()
+    return current if isinstance(current, Span) else None
+
+
+def configure_tracing(
+    enabled: bool | None = None, sample_rate: float | None = None
+) -> None:
+    """Change whether spans are recorded and the fraction of traces that are sampled (defaults to the values in
+    `Config`)
+    """
+    global _enabled, _sample_rate
+    _enabled = Config.TRACING_ENABLED if enabled is None else enabled
+    _sample_rate = Config.TRACING_SAMPLE_RATE if sample_rate is None else sample_rate
+
+
+def add_exporter(exporter: Exporter) -> None:
+    """Register an exporter, which is given every sampled trace once it is finished"""
+    _exporters.append(exporter)
+
+
+def clear_exporters() -> None:
+    _exporters.clear()
+
+
+class JsonLinesExporter:
+    """Appends every trace to a file as a line of JSON"""
+
+    def __init__(self, path: str | None = None) -> None:
+        """
+        Args:
+            path (Optional[str], optional): The file. Defaults to `Config.TRACING_PATH`.
+        """
+        self.path = path or Config.TRACING_PATH
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace) -> None:
+        line = json.dumps(trace.to_dict(), default=str)
+        with self._lock, open(self.path, "a") as f:
+            f.write(line + "\n")
+
+
+class OpenTelemetryExporter:
+    """Replays every trace into an OpenTelemetry tracer, to be exported by whatever span processors the OpenTelemetry
+    SDK has been configured with (OTLP, Jaeger, Zipkin etc.)
+
+    The replayed spans keep the trace's id, so a trace can be looked up by the id `JsonLinesExporter` would write.
+    They get span ids of their own from the SDK, and the original span id is kept in the `flask_esports.span_id`
+    attribute. To carry the trace id over, the root span is started under a remote parent with the root's original
+    span id, so backends show the root as having a parent that was never exported.
+    """
+
+    def __init__(self, tracer=None) -> None:
+        """
+        Args:
+            tracer (optional): The OpenTelemetry tracer. Defaults to the tracer of the global tracer provider.
+        """
+        try:
+            from opentelemetry import trace as otel
+        except ImportError as e:
+            raise ImportError(
+                "OpenTelemetryExporter requires opentelemetry-api and opentelemetry-sdk to be installed"
+            ) from e
+        self._otel = otel
+        self.tracer = tracer or otel.get_tracer("flask_esports")
+
+    def export(self, trace: Trace) -> None:
+        children: dict[str | None, list[Span]] = {}
+        for s in trace.spans:
+            children.setdefault(s.parent_id, []).append(s)
+
+        # Parents finish after their children, so walk the tree from the root to start every parent first
+        started = []
+        pending = [(s, self._remote_parent(trace, s)) for s in children.get(None, [])]
+        while pending:
+            s, parent = pending.pop()
+            otel_span = self.tracer.start_span(
+                s.name,
+                context=self._otel.set_span_in_context(parent),
+                attributes={
+                    **{k: str(v) for k, v in s.attributes.items()},
+                    "flask_esports.span_id": s.span_id,
+                },
+                start_time=s.start_ns,
+            )
+            if s.error is not None:
+                otel_span.set_status(
+                    self._otel.Status(self._otel.StatusCode.ERROR, s.error)
+                )
+            started.append((otel_span, s.end_ns))
+            pending.extend((child, otel_span) for child in children.get(s.span_id, []))
+        for otel_span, end_ns in reversed(started):
+            otel_span.end(end_time=end_ns)
+
+    def _remote_parent(self, trace: Trace, root: Span):
+        # A parent that is not recorded, only there for the root span to take the trace id from
+        return self._otel.NonRecordingSpan(
+            self._otel.SpanContext(
+                trace_id=int(trace.trace_id, 16),
+                span_id=int(root.span_id, 16),
+                is_remote=True,
+                trace_flags=self._otel.TraceFlags(self._otel.TraceFlags.SAMPLED),
+            )
+        )
+
+
+def install_exporter() -> None:
+    """Register the exporter named by `Config.TRACING_EXPORTER` (jsonl or otel), if tracing is enabled and it has not
+    been registered already
+    """
+    if not _enabled or _exporters:
+        return
+    if Config.TRACING_EXPORTER == "otel":
+        add_exporter(OpenTelemetryExporter())
+    elif Config.TRACING_EXPORTER == "jsonl":
+        os.makedirs(
+            os.path.dirname(os.path.abspath(Config.TRACING_PATH)), exist_ok=True
+        )
+        add_exporter(JsonLinesExporter())
+    else:
+        raise ValueError(f"Unknown tracing exporter {Config.TRACING_EXPORTER}")
@@ -0,0 +1,218 @@
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from flask_esports.api.admission import AdmissionController, Overloaded, get_admission_controller, set_admission_controller
+from flask_esports.api.blueprint import GameBlueprint
+from flask_esports.api.source import DataSource
+
+
+def test_requests_over_the_limits_are_queued_then_shed():
+    controller = AdmissionController(game_concurrency=2, endpoint_concurrency=1, queue_size=1, queue_timeout=0.01)
+    controller.acquire("valorant", "get_team")
+    controller.acquire("valorant", "get_player")
+    assert controller.in_flight("valorant") == 2
+    assert controller.in_flight("valorant", "get_team") == 1
+
+    # The game is at its limit, so the request waits in the queue until it times out
+    with pytest.raises(Overloaded) as e:
+        controller.acquire("valorant", "get_match")
+    assert e.value.reason == "timeout"
+    assert controller.waiting("valorant") == 0
+
+    # Other games have their own limits
+    with controller.admit("csgo", "get_team"):
+        assert controller.in_flight("csgo") == 1
+    assert controller.in_flight("csgo") == 0
+
+
+def test_full_queue_is_shed_without_waiting():
+    controller = AdmissionController(
+        game_concurrency=1, endpoint_concurrency=1, queue_size=0, queue_timeout=10, retry_after=3
+    )
+    controller.acquire("valorant", "get_team")
+    with pytest.raises(Overloaded) as e:
+        controller.acquire("valorant", "get_team")
+    assert (e.value.reason, e.value.retry_after) == ("queue_full", 3)
+
+
+def test_weighted_requests_take_up_a_slot_per_fetch():
+    controller = AdmissionController(game_concurrency=4, endpoint_concurrency=4, queue_size=0)
+    controller.acquire("valorant", "get_team", 3)
+    assert controller.in_flight("valorant") == 3
+    with pytest.raises(Overloaded):
+        controller.acquire("valorant", "get_team", 2)
+    controller.release("valorant", "get_team", 3)
+
+    # Weights over the limits are capped, so that the request can be admitted at all
+    with controller.admit("valorant", "get_team", 10):
+        assert controller.in_flight("valorant") == 4
+    assert controller.in_flight("valorant") == 0
+
+
+def test_queued_request_is_admitted_when_a_slot_frees():
+    controller = AdmissionController(game_concurrency=1, endpoint_concurrency=1, queue_size=1, queue_timeout=5)
+    controller.acquire("valorant", "get_team")
+    admitted = threading.Event()
+
+    def wait():
+        controller.acquire("valorant", "get_team")
+        admitted.set()
+
+    thread = threading.Thread(target=wait)
+    thread.start()
+    while controller.waiting("valorant") == 0:
+        pass
+    controller.release("valorant", "get_team")
+    thread.join()
+    assert admitted.is_set()
+    assert controller.in_flight("valorant", "get_team") == 1
+
+
+started = threading.Event()
+unblock = threading.Event()
+
+
+class Team:
+    def to_dict(self):
+        return {"name": "Sentinels"}
+
+
+class Slow(DataSource):
+    @staticmethod
+    def is_cached(method, id_, page=None):
+        return id_ == 99
+
+    @staticmethod
+    def get_team(team_id):
+        if team_id != 99:
+            started.set()
+            unblock.wait(5)
+        return Team()
+
+
+@pytest.fixture
+def controller():
+    controller = AdmissionController(game_concurrency=1, endpoint_concurrency=1, queue_size=0, retry_after=7)
+    set_admission_controller(controller)
+    yield controller
+    set_admission_controller(None)
+
+
+def test_blueprint_sheds_load_with_503(controller):
+    app = Flask(__name__)
+    with app.app_context():
+        GameBlueprint("admitgame", __name__, Slow).register(app)
+    client = app.test_client()
+    started.clear()
+    unblock.clear()
+
+    slow = threading.Thread(target=client.get, args=("/admitgame/team/1",))
+    slow.start()
+    started.wait(5)
+    try:
+        response = client.get("/admitgame/team/2")
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "7"
+        assert response.json["success"] is False
+
+        # Cached resources bypass the limiter
+        response = client.get("/admitgame/team/99")
+        assert response.status_code == 200
+        assert response.json["data"] == {"name": "Sentinels"}
+    finally:
+        unblock.set()
+        slow.join()
+    assert controller.in_flight("admitgame") == 0
+    assert client.get("/admitgame/team/3").status_code == 200
+
+
+def test_includes_count_against_the_limits():
+    controller = AdmissionController(game_concurrency=3, endpoint_concurrency=3, queue_size=0)
+    set_admission_controller(controller)
+    app = Flask(__name__)
+    with app.app_context():
+        GameBlueprint("weightgame", __name__, Slow).register(app)
+    client = app.test_client()
+    started.clear()
+    unblock.clear()
+
+    slow = threading.Thread(target=client.get, args=("/weightgame/team/1",))
+    slow.start()
+    started.wait(5)
+    try:
+        # The team and each of its includes are fetched concurrently, which is more than the slots left
+        assert client.get("/weightgame/team/2?include=players,matches").status_code == 503
+    finally:
+        unblock.set()
+        slow.join()
+        set_admission_controller(None)
+    assert controller.in_flight("weightgame") == 0
+
+
+class Fixture:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        return {"name": self.name}
+
+
+class FanOut(DataSource):
+    """Records the slots in flight, and the fetches running at once, while the includes of a match are fetched"""
+
+    lock = threading.Lock()
+    running = 0
+    most_running = 0
+    in_flight = []
+
+    @classmethod
+    def fetch(cls, name):
+        with cls.lock:
+            cls.running += 1
+            cls.most_running = max(cls.most_running, cls.running)
+        cls.in_flight.append(get_admission_controller().in_flight("fanoutgame"))
+        time.sleep(0.05)
+        with cls.lock:
+            cls.running -= 1
+        return Fixture(name=name)
+
+    @staticmethod
+    def get_match(match_id):
+        return Fixture(name="Grand Final", event=7, teams=[1, 2])
+
+    @classmethod
+    def get_team(cls, team_id):
+        return cls.fetch(f"Team {team_id}")
+
+    @classmethod
+    def get_event(cls, event_id):
+        return cls.fetch(f"Event {event_id}")
+
+
+def test_includes_of_several_ids_take_a_slot_per_id():
+    controller = AdmissionController(game_concurrency=4, endpoint_concurrency=4, queue_size=0)
+    set_admission_controller(controller)
+    app = Flask(__name__)
+    with app.app_context():
+        GameBlueprint("fanoutgame", __name__, FanOut).register(app)
+    client = app.test_client()
+    try:
+        # The match, its event and each of its two teams
+        response = client.get("/fanoutgame/match/1?include=teams,event")
+        assert response.json["data"]["included"] == {
+            "teams": [{"name": "Team 1"}, {"name": "Team 2"}],
+            "event": {"name": "Event 7"},
+        }
+        assert FanOut.in_flight == [4, 4, 4]
+        assert FanOut.most_running == 3
+        assert controller.in_flight("fanoutgame") == 0
+
+        # With a slot taken there is no room for all four fetches
+        controller.acquire("fanoutgame", "get_team")
+        assert client.get("/fanoutgame/match/1?include=teams,event").status_code == 503
+        controller.release("fanoutgame", "get_team")
+    finally:
+        set_admission_controller(None)
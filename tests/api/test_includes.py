@@ -0,0 +1,104 @@
+import threading
+
+from flask import Flask
+
+from flask_esports.api.blueprint import GameBlueprint
+from flask_esports.api.source import DataSource
+from flask_esports.app.db.db import query_db
+
+# Every fetch of a compound request waits for the others, so the request only succeeds if they run concurrently
+barrier = threading.Barrier(3, timeout=5)
+
+
+class Resource:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def to_dict(self):
+        return {k: v for k, v in self.__dict__.items() if k not in ("event", "teams")}
+
+
+class Source(DataSource):
+    @staticmethod
+    def get_team(team_id):
+        barrier.wait()
+        return Resource(name=f"Team {team_id}") if team_id != 404 else None
+
+    @staticmethod
+    def get_team_players(team_id):
+        barrier.wait()
+        return [Resource(alias="TenZ")]
+
+    @staticmethod
+    def get_team_matches(team_id, page):
+        barrier.wait()
+        return [Resource(page=page)]
+
+    @staticmethod
+    def get_match(match_id):
+        return Resource(name="Grand Final", event=7, teams=(1, 2))
+
+    @staticmethod
+    def get_event(event_id):
+        if event_id == 7:
+            barrier.wait()
+        return Resource(name=f"Event {event_id}")
+
+
+def client():
+    app = Flask(__name__)
+    with app.app_context():
+        GameBlueprint("includegame", __name__, Source).register(app)
+    barrier.reset()
+    return app.test_client()
+
+
+def test_includes_are_resolved_concurrently():
+    response = client().get("/includegame/team/2?include=players,matches,players&page=3")
+    assert response.json["data"] == {
+        "name": "Team 2",
+        "included": {"players": [{"alias": "TenZ"}], "matches": [{"page": 3}]},
+    }
+
+
+def test_includes_of_related_ids():
+    response = client().get("/includegame/match/1?include=teams,event")
+    assert response.json["data"]["included"] == {
+        "teams": [{"name": "Team 1"}, {"name": "Team 2"}],
+        "event": {"name": "Event 7"},
+    }
+
+
+def test_without_includes():
+    response = client().get("/includegame/event/8")
+    assert response.json == {"success": True, "data": {"name": "Event 8"}}
+
+
+def test_invalid_includes_and_missing_resources():
+    test_client = client()
+    response = test_client.get("/includegame/team/2?include=players,coaches")
+    assert response.json["success"] is False
+    assert "players, matches" in response.json["data"]["error-message"]
+
+    response = test_client.get("/includegame/team/404?include=players,matches")
+    assert response.json["success"] is False
+
+
+class DatabaseSource(DataSource):
+    @staticmethod
+    def get_team(team_id):
+        query_db("SELECT COUNT(*) AS players FROM players;")
+        return Resource(name=f"Team {team_id}")
+
+    @staticmethod
+    def get_team_players(team_id):
+        row = query_db("SELECT COUNT(*) AS players FROM players;", one=True)
+        return [Resource(alias="TenZ", count=row["players"])]
+
+
+def test_includes_get_their_own_database_connections(db_app):
+    with db_app.app_context():
+        GameBlueprint("dbincludegame", __name__, DatabaseSource).register(db_app)
+
+    response = db_app.test_client().get("/dbincludegame/team/2?include=players")
+    assert response.json["data"] == {"name": "Team 2", "included": {"players": [{"alias": "TenZ", "count": 0}]}}
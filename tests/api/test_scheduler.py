@@ -0,0 +1,228 @@
+import time
+
+from flask import Flask
+
+from flask_esports.api.blueprint import GameBlueprint
+from flask_esports.api.scheduler import CrawlScheduler, set_crawl_scheduler
+from flask_esports.api.source import DataSource
+from flask_esports.scraping.changes import ChangeTracker
+from flask_esports.scraping.xpath import XpathParser
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+class Source(DataSource):
+    fetched = []
+
+    @staticmethod
+    def get_player(player_id):
+        Source.fetched.append(("player", player_id))
+        return {"player_id": player_id}
+
+    @staticmethod
+    def get_team(team_id):
+        Source.fetched.append(("team", team_id))
+        return {"name": XpathParser(f"https://www.vlr.gg/team/{team_id}").get_text("//h1")}
+
+    @staticmethod
+    def get_team_matches(team_id, page):
+        Source.fetched.append(("team_matches", team_id, page))
+        return [page]
+
+
+def create_scheduler(clock, **kwargs):
+    app = Flask(__name__)
+    with app.app_context():
+        blueprint = GameBlueprint("valorant", __name__, Source)
+    Source.fetched = []
+    return CrawlScheduler(
+        {"valorant": blueprint}, app=app, rate=1000, game_rate=1000, max_age=100, min_interval=10, half_life=50,
+        clock=clock, **kwargs
+    )
+
+
+def test_popular_resources_are_refreshed_first():
+    clock = Clock()
+    scheduler = create_scheduler(clock)
+    for _ in range(3):
+        scheduler.record_request("valorant", "player", 2)
+    scheduler.record_request("valorant", "player", 1)
+    scheduler.record_request("valorant", "team_matches", 5)
+
+    assert scheduler.score("valorant", "player", 2) == 3
+    assert scheduler.next_job() == ("valorant", "player", 2)
+    # Taken jobs are not handed out twice
+    assert scheduler.next_job() in {("valorant", "player", 1), ("valorant", "team_matches", 5)}
+
+
+def test_stale_resources_overtake_fresh_ones():
+    clock = Clock()
+    scheduler = create_scheduler(clock)
+    for _ in range(3):
+        scheduler.record_request("valorant", "player", 2)
+    scheduler.record_request("valorant", "player", 1)
+    scheduler.mark_fetched("valorant", "player", 2, at=clock.now)
+    scheduler.mark_fetched("valorant", "player", 1, at=clock.now - 100)
+    clock.now += 20
+
+    assert scheduler.run_once() == ("valorant", "player", 1)
+    assert scheduler.run_once() == ("valorant", "player", 2)
+    # Both were refreshed less than min_interval ago
+    assert scheduler.run_once() is None
+
+    clock.now += 10
+    assert scheduler.run_once() is not None
+
+
+def test_refresh_calls_sources_and_callbacks():
+    clock = Clock()
+    scheduler = create_scheduler(clock)
+    refreshed = []
+    scheduler.add_refresh_callback(lambda *args: refreshed.append(args))
+    scheduler.record_request("valorant", "team_matches", 5)
+
+    assert scheduler.run_once() == ("valorant", "team_matches", 5)
+    assert Source.fetched == [("team_matches", 5, 1)]
+    assert refreshed == [("valorant", "team_matches", 5, [1])]
+    assert (scheduler.refreshed, scheduler.failed) == (1, 0)
+
+
+def test_failed_refreshes_are_counted():
+    clock = Clock()
+    scheduler = create_scheduler(clock)
+    scheduler.add_refresh_callback(lambda *args: 1 / 0)
+    scheduler.record_request("valorant", "player", 1)
+
+    assert scheduler.run_once() == ("valorant", "player", 1)
+    assert (scheduler.refreshed, scheduler.failed) == (0, 1)
+
+
+def test_unchanged_resources_skip_the_callbacks():
+    clock = Clock()
+    scheduler = create_scheduler(clock, tracker=ChangeTracker(":memory:"))
+    refreshed = []
+    failing = [True]
+
+    def persist(*args):
+        if failing.pop(0):
+            raise OSError("database is locked")
+        refreshed.append(args)
+
+    scheduler.add_refresh_callback(persist)
+    failing.extend([False, False])
+    for _ in range(3):
+        scheduler.record_request("valorant", "player", 1)
+        assert scheduler.run_once() == ("valorant", "player", 1)
+        clock.now += 10
+
+    # The first refresh failed to persist, so the second was not skipped, but the third was unchanged
+    assert refreshed == [("valorant", "player", 1, {"player_id": 1})]
+    assert (scheduler.refreshed, scheduler.failed, scheduler.unchanged) == (2, 1, 1)
+
+
+def test_resources_with_unchanged_pages_are_not_extracted(fake_session):
+    url = "https://www.vlr.gg/team/2"
+    fake_session.pages[url] = b"<html><body><h1>Sentinels</h1></body></html>"
+    clock = Clock()
+    scheduler = create_scheduler(clock, tracker=ChangeTracker(":memory:"))
+    refreshed = []
+    scheduler.add_refresh_callback(lambda *args: refreshed.append(args))
+
+    def refresh():
+        scheduler.record_request("valorant", "team", 2)
+        assert scheduler.run_once() == ("valorant", "team", 2)
+        clock.now += 10
+
+    refresh()
+    refresh()
+    # The second refresh only fetched the page, found it unchanged and stopped there
+    assert Source.fetched == [("team", 2)]
+    assert fake_session.requested == [url, url]
+    assert scheduler.unchanged == 1
+
+    fake_session.pages[url] = b"<html><body><h1>100 Thieves</h1></body></html>"
+    refresh()
+    # The page checked first is reused by the source, rather than fetched again
+    assert Source.fetched == [("team", 2), ("team", 2)]
+    assert fake_session.requested == [url] * 3
+    assert [value for *_, value in refreshed] == [{"name": "Sentinels"}, {"name": "100 Thieves"}]
+
+
+def test_heap_stays_bounded_under_repeated_requests():
+    clock = Clock()
+    scheduler = create_scheduler(clock)
+    for i in range(10_000):
+        scheduler.record_request("valorant", "player", i % 3)
+
+    assert len(scheduler._heap) <= 32
+    assert scheduler.next_job() == ("valorant", "player", 0)
+
+
+def test_unpopular_resources_are_forgotten():
+    clock = Clock()
+    scheduler = create_scheduler(clock)
+    scheduler.record_request("valorant", "player", 1)
+    clock.now += 1000
+
+    assert scheduler.next_job() is None
+    assert len(scheduler) == 0
+
+
+def test_workers_refresh_in_background():
+    clock = Clock()
+    scheduler = create_scheduler(clock, workers=2)
+    scheduler.start()
+    try:
+        for i in range(5):
+            scheduler.record_request("valorant", "player", i)
+        for _ in range(200):
+            if scheduler.refreshed == 5:
+                break
+            time.sleep(0.01)
+    finally:
+        scheduler.stop()
+    assert sorted(Source.fetched) == [("player", i) for i in range(5)]
+
+
+def test_blueprint_records_requests():
+    clock = Clock()
+    scheduler = create_scheduler(clock)
+    app = Flask(__name__)
+    with app.app_context():
+        GameBlueprint("valorant", __name__, Source).register(app)
+    set_crawl_scheduler(scheduler)
+    try:
+        app.test_client().get("/valorant/player/7")
+    finally:
+        set_crawl_scheduler(None)
+    job = scheduler._jobs[("valorant", "player", 7)]
+    assert job.popularity == 1
+    # The request fetched it, so it is not stale yet
+    assert job.last_fetched == clock.now
+    assert scheduler.score("valorant", "player", 7) == 0
+
+
+def test_resources_fetched_for_requests_are_not_refreshed_yet():
+    clock = Clock()
+    scheduler = create_scheduler(clock)
+    app = Flask(__name__)
+    with app.app_context():
+        GameBlueprint("valorant", __name__, Source).register(app)
+    set_crawl_scheduler(scheduler)
+    try:
+        app.test_client().get("/valorant/player/7")
+        app.test_client().get("/valorant/team/5/matches?page=2")
+    finally:
+        set_crawl_scheduler(None)
+
+    # Only the first page of paginated resources is refreshed, so fetching another page does not count
+    assert scheduler.next_job() == ("valorant", "team_matches", 5)
+    assert scheduler.next_job() is None
+    clock.now += 10
+    assert scheduler.next_job() == ("valorant", "player", 7)
@@ -1,6 +1,7 @@
 import pytest
+from flask import Flask
 
-from flask_esports.config import set_testing
+from flask_esports.config import Config, set_testing
 from flask_esports.app import create_app
 
 @pytest.fixture()
@@ -13,3 +14,48 @@ def app():
 @pytest.fixture()
 def client(app):
     return app.test_client()
+
+@pytest.fixture()
+def db_app():
+    """A bare app backed by a fresh in-memory database"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    app.config["SQL_DATABASE_URI"] = ":memory:"
+
+    yield app
+
+
+class FakeResponse:
+    def __init__(self, url, status_code=200, content=b"", headers=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers or {}
+
+
+class FakeSession:
+    """Stands in for a `requests.Session`, serving the pages in `pages` (url -> body or FakeResponse)"""
+
+    def __init__(self, pages=None):
+        self.pages = pages or {}
+        self.requested = []
+
+    def get(self, url, **kwargs):
+        self.requested.append(url)
+        page = self.pages.get(url)
+        if page is None:
+            return FakeResponse(url, 404)
+        return page if isinstance(page, FakeResponse) else FakeResponse(url, content=page)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture()
+def fake_session():
+    from flask_esports.scraping.http import set_session_factory
+
+    session = FakeSession()
+    set_session_factory(lambda host: session)
+    yield session
+    set_session_factory(None)
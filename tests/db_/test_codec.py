@@ -0,0 +1,61 @@
+import json
+
+import pytest
+
+from flask_esports.app.db.codec import CodecError, LazyBlob, binary_dumps, binary_loads, decode_blob, encode_blob
+from flask_esports.resources import Match
+from flask_esports.source import SourceId
+
+STATS = {
+    "rounds": 24,
+    "players": [{"acs": 241.5, "kills": 20, "deaths": -1, "agent": "Jett"}, {"acs": 198.0, "kills": 15, "deaths": 12, "agent": "Sova"}],
+    "overtime": False,
+    "mvp": None,
+    "big": 2**70,
+    "raw": b"\x00\x01",
+}
+
+
+@pytest.mark.parametrize("value", [None, True, False, 0, 1, -1, 300, -(2**40), 1.5, "", "héllo", b"", [], {}, [1, [2, [3]]], STATS])
+def test_binary_round_trip(value):
+    assert binary_loads(binary_dumps(value)) == value
+
+
+def test_binary_is_compact():
+    rows = [{"kills": i, "deaths": i, "assists": i} for i in range(100)]
+    assert len(binary_dumps(rows)) < len(json.dumps(rows, separators=(",", ":"))) / 2
+
+
+@pytest.mark.parametrize("encoding", ["json", "binary"])
+@pytest.mark.parametrize("compression", ["none", "zlib", None])
+def test_blob_round_trip(encoding, compression):
+    value = {k: v for k, v in STATS.items() if k != "raw"}
+    blob = encode_blob(value, encoding, compression)
+    assert blob.startswith(b"FE")
+    assert decode_blob(blob) == value
+
+
+def test_legacy_and_invalid_blobs():
+    assert encode_blob(None) is None
+    assert decode_blob(None) is None
+    assert decode_blob(b'{"kills": 1}') == {"kills": 1}
+    assert decode_blob('{"kills": 1}') == {"kills": 1}
+
+    with pytest.raises(CodecError):
+        encode_blob({}, encoding="pickle")
+    with pytest.raises(CodecError):
+        decode_blob(b"FE\x09\x00")
+    with pytest.raises(CodecError):
+        decode_blob(b"FE\x01\xf0")
+    with pytest.raises(CodecError):
+        binary_dumps(object())
+
+
+def test_lazy_match_stats():
+    stats = LazyBlob(encode_blob({"kills": 20}))
+    match = Match(SourceId("valorant", 1), match_stats=stats)
+
+    assert not stats.is_decoded()
+    assert match.to_dict()["match-stats"] == {"kills": 20}
+    assert stats.is_decoded()
+    assert match == Match(SourceId("valorant", 1), match_stats={"kills": 20})
@@ -0,0 +1,106 @@
+import logging
+import sqlite3
+import threading
+
+import pytest
+
+from flask_esports.config import Config
+
+from flask_esports.app.db.db import add_query_hook, get_admin_db, get_db, init_app, normalize_sql, query_db, query_stats, remove_query_hook, update_db
+
+
+@pytest.mark.parametrize("query, normalized", [
+    ("SELECT *   FROM players\n WHERE player_id = ?;", "SELECT * FROM players WHERE player_id = ?;"),
+    ("SELECT * FROM players WHERE alias = 'Ten''Z' AND player_id = 10;", "SELECT * FROM players WHERE alias = ? AND player_id = ?;"),
+    ("SELECT * FROM players WHERE player_id IN (?, ?, ?);", "SELECT * FROM players WHERE player_id IN (?, ...);"),
+    ("SELECT * FROM players WHERE (source, player_id) IN (VALUES (?, ?), (?, ?));", "SELECT * FROM players WHERE (source, player_id) IN (VALUES (?, ...), ...);"),
+    ("SELECT * FROM players_search2;", "SELECT * FROM players_search2;"),
+])
+def test_normalize_sql(query, normalized):
+    assert normalize_sql(query) == normalized
+
+
+def test_query_stats(db_app):
+    query_stats.reset()
+    with db_app.app_context():
+        for i in range(3):
+            update_db("INSERT INTO players (source, player_id) VALUES (?, ?);", ("valorant", i))
+        query_db("SELECT * FROM players WHERE player_id IN (?, ?);", (1, 2))
+        query_db("SELECT * FROM players WHERE player_id IN (?, ?, ?);", (1, 2, 3))
+
+    stats = query_stats.snapshot()
+    assert stats["INSERT INTO players (source, player_id) VALUES (?, ...);"]["count"] == 3
+    select = stats["SELECT * FROM players WHERE player_id IN (?, ...);"]
+    assert select["count"] == 2
+    assert select["rows"] == 4
+    assert 0 <= select["p50-ms"] <= select["p99-ms"] <= select["max-ms"]
+
+
+def test_slow_query_log(db_app, caplog):
+    db_app.config["SLOW_QUERY_THRESHOLD_MS"] = 0
+    calls = []
+
+    def hook(query, args, duration, rows):
+        calls.append((query, args, rows))
+
+    add_query_hook(hook)
+    try:
+        with db_app.app_context(), caplog.at_level(logging.WARNING):
+            query_db("SELECT * FROM players WHERE source = ? AND player_id = ?;", ("valorant", 1))
+    finally:
+        remove_query_hook(hook)
+
+    assert calls == [("SELECT * FROM players WHERE source = ? AND player_id = ?;", ("valorant", 1), 0)]
+    assert "Slow query" in caplog.text
+    assert "players USING INDEX" in caplog.text
+
+
+def test_sharded_by_game(db_app, tmp_path):
+    db_app.config.update(SQL_SHARD_BY_GAME=True, SQL_SHARD_DIRECTORY=str(tmp_path))
+    with db_app.app_context():
+        update_db("INSERT INTO players (source, player_id, alias) VALUES (?, ?, ?);", ("valorant", 1, "TenZ"), game="valorant")
+        update_db("INSERT INTO players (source, player_id, alias) VALUES (?, ?, ?);", ("tf2", 1, "b4nny"), game="tf2")
+
+        assert query_db("SELECT alias FROM players;", game="valorant") == [{"alias": "TenZ"}]
+        assert query_db("SELECT alias FROM players;", game="tf2") == [{"alias": "b4nny"}]
+        assert query_db("SELECT alias FROM players;") == []
+
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["tf2.db", "valorant.db"]
+
+    with db_app.app_context():
+        assert query_db("SELECT alias FROM players;", game="valorant") == [{"alias": "TenZ"}]
+        db = get_admin_db()
+        try:
+            rows = db.execute("SELECT alias FROM valorant.players UNION ALL SELECT alias FROM tf2.players ORDER BY alias;").fetchall()
+        finally:
+            db.close()
+    assert rows == [{"alias": "TenZ"}, {"alias": "b4nny"}]
+
+
+def test_shard_names_are_validated(db_app):
+    db_app.config["SQL_SHARD_BY_GAME"] = True
+    with db_app.app_context(), pytest.raises(ValueError):
+        query_db("SELECT 1;", game="../escape")
+
+
+def test_connections_are_closed_on_teardown(db_app, tmp_path):
+    init_app(db_app)
+    init_app(db_app)
+    assert db_app.teardown_appcontext_funcs.count(db_app.teardown_appcontext_funcs[0]) == 1
+
+    db_app.config.update(SQL_SHARD_BY_GAME=True, SQL_SHARD_DIRECTORY=str(tmp_path))
+    with db_app.app_context():
+        connections = [get_db(), get_db("valorant"), get_db("tf2")]
+    for db in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            db.execute("SELECT 1;")
+
+
+def test_connections_outside_app_context_are_per_thread(monkeypatch):
+    monkeypatch.setattr(Config, "SQL_DATABASE_URI", ":memory:")
+    connections = []
+    thread = threading.Thread(target=lambda: connections.append(get_db()))
+    thread.start()
+    thread.join()
+    assert get_db() is get_db()
+    assert connections[0] is not get_db()
@@ -0,0 +1,72 @@
+import pytest
+
+from flask_esports.app.db import query_factory
+from flask_esports.app.db.db import update_db
+from flask_esports.app.db.loader import Loader, get_loader
+
+
+class Player:
+    TABLENAME = "players"
+
+    def __init__(self, player_id, alias):
+        self.player_id = player_id
+        self.alias = alias
+
+    @staticmethod
+    def from_record(record):
+        return Player(record["player_id"], record["alias"])
+
+
+@pytest.fixture()
+def queries(db_app, monkeypatch):
+    executed = []
+    query_db = query_factory.query_db
+
+    def spy(query, args=(), one=False, game=None):
+        executed.append(query)
+        return query_db(query, args, one, game)
+
+    monkeypatch.setattr(query_factory, "query_db", spy)
+    with db_app.app_context():
+        for i, alias in enumerate(["TenZ", "zekken", "Sacy"]):
+            update_db("INSERT INTO players (source, player_id, alias) VALUES (?, ?, ?);", ("valorant", i, alias))
+        update_db("INSERT INTO players (source, player_id, alias) VALUES (?, ?, ?);", ("tf2", 1, "b4nny"))
+        yield executed
+
+
+def test_batch_query():
+    q = query_factory.BatchQuery(Player, "valorant", [1, 2])
+    assert q.get_querystring() == "SELECT players.* FROM players WHERE (players.source, players.player_id) IN (VALUES (?, ?), (?, ?));"
+    assert q.args == ("valorant", 1, "valorant", 2)
+
+    with pytest.raises(ValueError):
+        query_factory.BatchQuery(Player, "valorant", [])
+
+
+def test_loads_are_batched(queries):
+    loader = Loader("valorant")
+    deferred = [loader.load(Player, i) for i in (0, 1, 2, 5)]
+
+    assert queries == []
+    assert [d.get() and d.get().alias for d in deferred] == ["TenZ", "zekken", "Sacy", None]
+    assert len(queries) == 1
+
+
+def test_identity_map(queries):
+    loader = Loader("valorant")
+    first = loader.load(Player, 1).get()
+
+    assert loader.load(Player, "1").get() is first
+    assert loader.load_many(Player, [1, 5]) == [first, None]
+    assert loader.load(Player, 5).get() is None
+    assert len(queries) == 2
+
+    loader.prime(Player, 2, "primed")
+    assert loader.load(Player, 2).get() == "primed"
+    assert len(queries) == 2
+
+
+def test_loader_is_per_game(queries):
+    assert Loader("tf2").load(Player, 1).get().alias == "b4nny"
+    assert get_loader("valorant") is get_loader("valorant")
+    assert get_loader("valorant") is not get_loader("tf2")
@@ -0,0 +1,62 @@
+import pytest
+
+from flask_esports.api import GameBlueprint
+from flask_esports.app.db.db import add_query_hook, remove_query_hook, update_db
+from flask_esports.app.db.search import match_expression, search_resources
+
+
+@pytest.fixture()
+def search_app(db_app):
+    with db_app.app_context():
+        GameBlueprint("valorant", __name__).register(db_app)
+        for i, (alias, forename, surname) in enumerate([("TenZ", "Tyson", "Ngo"), ("zekken", "Zachary", "Patrone"), ("Sacy", "Gustavo", "Rossi")]):
+            update_db("INSERT INTO players (source, player_id, alias, forename, surname) VALUES (?, ?, ?, ?, ?);", ("valorant", i, alias, forename, surname))
+        update_db("INSERT INTO players (source, player_id, alias) VALUES (?, ?, ?);", ("tf2", 1, "Tenzo"))
+        update_db("INSERT INTO teams (source, team_id, team_name, team_tag) VALUES (?, ?, ?, ?);", ("valorant", 2, "Sentinels", "SEN"))
+        yield db_app
+
+
+@pytest.mark.parametrize("text, expression", [
+    ("tenz", '"tenz"*'), ("sen tenz", '"sen"* "tenz"*'), ('te"nz OR', '"te"* "nz"* "OR"*'), ("  ", None), ("*-", None)
+])
+def test_match_expression(text, expression):
+    assert match_expression(text) == expression
+
+
+def test_search_resources(search_app):
+    assert search_resources("valorant", "ten") == [{"type": "player", "id": 0, "alias": "TenZ", "forename": "Tyson", "surname": "Ngo"}]
+    assert sorted(r["type"] for r in search_resources("valorant", "s")) == ["player", "team"]
+    assert search_resources("valorant", "sen")[0] == {"type": "team", "id": 2, "name": "Sentinels", "display-tag": "SEN"}
+    assert len(search_resources("valorant", "s", limit=1)) == 1
+    assert search_resources("tf2", "ten")[0]["alias"] == "Tenzo"
+
+    update_db("UPDATE players SET alias = ? WHERE source = ? AND player_id = ?;", ("aspas", "valorant", 0))
+    assert search_resources("valorant", "tenz") == []
+    update_db("DELETE FROM teams;")
+    assert search_resources("valorant", "sentinels") == []
+
+
+def test_search_endpoint(search_app):
+    client = search_app.test_client()
+
+    response = client.get("/valorant/search?q=zek").get_json()
+    assert response["success"]
+    assert [r["alias"] for r in response["data"]] == ["zekken"]
+
+    response = client.get("/valorant/search").get_json()
+    assert not response["success"]
+
+
+def test_short_prefixes_are_not_ranked_and_types_are_interleaved(search_app):
+    statements = []
+    hook = lambda query, args, duration, rows: statements.append(query)
+    add_query_hook(hook)
+    try:
+        assert [r["type"] for r in search_resources("valorant", "s")] == ["team", "player"]
+        assert not any("bm25" in s for s in statements)
+
+        statements.clear()
+        search_resources("valorant", "sen")
+        assert all("bm25" in s for s in statements)
+    finally:
+        remove_query_hook(hook)
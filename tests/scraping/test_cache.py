@@ -0,0 +1,91 @@
+
+import pytest
+
+from flask_esports.scraping.cache import HttpCache, expiry_from_headers, set_http_cache
+from flask_esports.scraping.xpath import XpathParser
+from tests.conftest import FakeResponse, FakeSession
+
+URL = "https://www.vlr.gg/team/2"
+PAGE = b"<html><body><h1>Sentinels</h1></body></html>"
+
+
+class ConditionalSession:
+    """Serves PAGE with the given headers, answering 304 when the request's validators match"""
+
+    def __init__(self, headers):
+        self.headers = headers
+        self.requests = []
+
+    def get(self, url, headers=None, **kwargs):
+        headers = headers or {}
+        self.requests.append(headers)
+        validators = {"If-None-Match": self.headers.get("ETag"), "If-Modified-Since": self.headers.get("Last-Modified")}
+        if any(headers.get(k) == v for k, v in validators.items() if v):
+            return FakeResponse(url, 304, b"", self.headers)
+        return FakeResponse(url, 200, PAGE, self.headers)
+
+
+@pytest.mark.parametrize("headers, expires", [
+    ({}, 100), ({"Cache-Control": "public, max-age=60"}, 160), ({"Cache-Control": "no-cache"}, 100),
+    ({"Cache-Control": "no-store, max-age=60"}, None), ({"Expires": "Thu, 01 Jan 1970 00:10:00 GMT"}, 600),
+    ({"Expires": "invalid"}, 100),
+])
+def test_expiry_from_headers(headers, expires):
+    assert expiry_from_headers(headers, 100) == expires
+
+
+def test_fresh_pages_are_not_requested():
+    cache = HttpCache(":memory:")
+    session = ConditionalSession({"Cache-Control": "max-age=60"})
+
+    tree = cache.fetch(URL, session)
+    assert tree.xpath("//h1")[0].text == "Sentinels"
+    assert cache.fetch(URL, session) is tree
+    assert len(session.requests) == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_is_fresh():
+    cache = HttpCache(":memory:")
+    assert not cache.is_fresh(URL)
+    cache.fetch(URL, ConditionalSession({"Cache-Control": "max-age=60"}))
+    assert cache.is_fresh(URL)
+    cache.fetch("https://www.vlr.gg/team/3", ConditionalSession({"ETag": '"v1"'}))
+    assert not cache.is_fresh("https://www.vlr.gg/team/3")
+
+
+def test_expired_pages_are_revalidated():
+    cache = HttpCache(":memory:")
+    session = ConditionalSession({"ETag": '"v1"', "Last-Modified": "Wed, 01 Jan 2025 00:00:00 GMT"})
+
+    tree = cache.fetch(URL, session)
+    assert cache.fetch(URL, session) is tree
+    assert session.requests == [{}, {"If-None-Match": '"v1"', "If-Modified-Since": "Wed, 01 Jan 2025 00:00:00 GMT"}]
+    assert cache.revalidated == 1
+
+    session.headers = {"ETag": '"v2"'}
+    assert cache.fetch(URL, session) is not tree
+    assert cache.misses == 2
+    assert cache.hit_ratio() == pytest.approx(1 / 3)
+
+
+def test_uncacheable_and_failed_pages():
+    cache = HttpCache(":memory:")
+    session = ConditionalSession({"Cache-Control": "no-store"})
+    cache.fetch(URL, session)
+    cache.fetch(URL, session)
+    assert session.requests == [{}, {}]
+
+    assert cache.fetch("https://www.vlr.gg/404", FakeSession()) is None
+
+
+def test_parser_uses_default_cache():
+    cache = HttpCache(":memory:")
+    session = ConditionalSession({"Cache-Control": "max-age=60"})
+    set_http_cache(cache)
+    try:
+        assert XpathParser(URL, session).get_text("//h1") == "Sentinels"
+        assert XpathParser(URL, session).get_text("//h1") == "Sentinels"
+    finally:
+        set_http_cache(None)
+    assert len(session.requests) == 1
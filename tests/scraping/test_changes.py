@@ -0,0 +1,112 @@
+from unittest import mock
+
+from lxml import html
+
+from flask_esports.scraping.changes import ChangeTracker
+from flask_esports.scraping.xpath import XpathParser
+from tests.conftest import FakeSession
+
+URL = "https://www.vlr.gg/team/2"
+PAGE = b"<html><body><h1>Sentinels</h1></body></html>"
+
+
+def test_page_changes():
+    tracker = ChangeTracker(":memory:")
+    # Checking a page never records it
+    assert tracker.check_page(URL, PAGE)
+    assert tracker.check_page(URL, PAGE)
+    tracker.record_page(URL, PAGE)
+    assert not tracker.check_page(URL, PAGE)
+    assert tracker.check_page(URL, PAGE.replace(b"Sentinels", b"100 Thieves"))
+    assert tracker.stats() == {"pages": {"changed": 3, "unchanged": 1, "failed": 0}, "resources": {"changed": 0, "unchanged": 0}}
+
+
+def test_resource_changes():
+    tracker = ChangeTracker(":memory:")
+    with tracker.changes("refresh") as changes:
+        assert changes.resource_changed("valorant", "team", 2, {"name": "Sentinels", "roster": [1, 2]})
+    changes.commit()
+    with tracker.changes("refresh") as changes:
+        assert not changes.resource_changed("valorant", "team", 2, {"roster": [1, 2], "name": "Sentinels"})
+        assert changes.resource_changed("valorant", "player", 2, {"name": "Sentinels", "roster": [1, 2]})
+        assert changes.resource_changed("valorant", "team", 2, {"name": "Sentinels", "roster": [1, 3]})
+    changes.commit()
+
+    team = mock.Mock(to_dict=lambda: {"name": "Sentinels", "roster": [1, 3]})
+    with tracker.changes("refresh") as changes:
+        assert not changes.resource_changed("valorant", "team", 2, team)
+    assert tracker.stats()["resources"] == {"changed": 3, "unchanged": 2}
+
+
+def test_change_sets_are_committed_per_scope():
+    tracker = ChangeTracker(":memory:")
+    session = FakeSession({URL: PAGE})
+
+    with tracker.changes("valorant/team/2") as changes:
+        assert XpathParser(URL, session, tracker=tracker).changed
+        assert changes.pages_changed
+        assert changes.resource_changed("valorant", "team", 2, {"name": "Sentinels"})
+    # Not committed (the refresh failed to persist, for example), so still changed
+    with tracker.changes("valorant/team/2") as changes:
+        assert XpathParser(URL, session, tracker=tracker).changed
+        changes.resource_changed("valorant", "team", 2, {"name": "Sentinels"})
+    changes.commit()
+
+    with tracker.changes("valorant/team/2") as changes:
+        assert XpathParser(URL, session, tracker=tracker).changed is False
+        assert changes.pages_changed is False
+        # Every page is unchanged, so the resource is not even hashed
+        assert not changes.resource_changed("valorant", "team", 2, None)
+    # Other resources scraped from the page have not committed it
+    with tracker.changes("valorant/team_players/2"):
+        assert XpathParser(URL, session, tracker=tracker).changed
+
+
+def test_persists_between_trackers(tmp_path):
+    path = str(tmp_path / "changes.db")
+    ChangeTracker(path).record_page(URL, PAGE)
+    assert not ChangeTracker(path).check_page(URL, PAGE)
+
+
+def test_unchanged_pages_are_not_parsed():
+    tracker = ChangeTracker(":memory:")
+    session = FakeSession({URL: PAGE})
+
+    with tracker.changes("valorant/team/2") as changes:
+        assert XpathParser(URL, session, tracker=tracker).changed
+    changes.commit()
+    with tracker.changes("valorant/team/2"):
+        with mock.patch("flask_esports.scraping.xpath.html.fromstring", wraps=html.fromstring) as fromstring:
+            parser = XpathParser(URL, session, tracker=tracker)
+            assert parser.changed is False
+            assert parser.was_success()
+            fromstring.assert_not_called()
+
+            assert parser.get_text("//h1") == "Sentinels"
+            fromstring.assert_called_once()
+
+        XpathParser("https://www.vlr.gg/404", session, tracker=tracker)
+    assert tracker.stats()["pages"] == {"changed": 1, "unchanged": 1, "failed": 1}
+
+
+def test_pages_are_only_hashed_within_change_sets():
+    tracker = ChangeTracker(":memory:")
+    parser = XpathParser(URL, FakeSession({URL: PAGE}), tracker=tracker)
+    assert parser.was_success() and parser.changed is None
+    assert tracker.stats()["pages"] == {"changed": 0, "unchanged": 0, "failed": 0}
+
+
+def test_resources_using_unchecked_pages_are_hashed():
+    tracker = ChangeTracker(":memory:")
+    session = FakeSession({URL: PAGE})
+    for _ in range(2):
+        with tracker.changes("valorant/team/2") as changes:
+            XpathParser(URL, session, tracker=tracker)
+            XpathParser("https://www.vlr.gg/404", session, tracker=tracker)
+            assert changes.pages_changed is None
+            changes.resource_changed("valorant", "team", 2, {"name": "Sentinels"})
+        changes.commit()
+
+    # The resource was hashed both times, and the scope's pages are not recorded as they are incomplete
+    assert tracker.stats()["resources"] == {"changed": 1, "unchanged": 1}
+    assert tracker.pages("valorant/team/2") == []
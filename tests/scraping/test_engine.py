@@ -0,0 +1,94 @@
+import threading
+import time
+
+import pytest
+
+from flask_esports.scraping.engine import ScrapeEngine, TokenBucket
+from flask_esports.scraping.xpath import share_pages
+from tests.conftest import FakeResponse
+
+PAGE = b"<html><body><p>match</p></body></html>"
+
+
+class SlowSession:
+    def __init__(self, delay):
+        self.delay = delay
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.requested = []
+        self.lock = threading.Lock()
+
+    def get(self, url, **kwargs):
+        with self.lock:
+            self.requested.append(url)
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+        return FakeResponse(url, 404 if url.endswith("missing") else 200, PAGE)
+
+
+def test_token_bucket():
+    bucket = TokenBucket(rate=10, capacity=2)
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == pytest.approx(0.1, abs=0.01)
+    assert bucket.reserve() == pytest.approx(0.2, abs=0.01)
+
+
+def test_scrape_is_concurrent():
+    session = SlowSession(0.05)
+    engine = ScrapeEngine(concurrency=4, host_rate=1000, host_burst=1000, session=session)
+    urls = [f"https://www.vlr.gg/{i}" for i in range(8)] + ["https://www.vlr.gg/missing"]
+
+    start = time.perf_counter()
+    parsers = engine.scrape_all(urls)
+
+    assert time.perf_counter() - start < 0.05 * len(urls)
+    assert session.max_in_flight == 4
+    assert [p.url for p in parsers] == urls
+    assert [p.was_success() for p in parsers] == [True] * 8 + [False]
+    assert parsers[0].get_text("//p") == "match"
+
+
+def test_scrape_respects_host_rate():
+    engine = ScrapeEngine(concurrency=8, host_rate=20, host_burst=1, session=SlowSession(0))
+    urls = [f"https://www.vlr.gg/{i}" for i in range(5)] + [f"https://liquipedia.net/{i}" for i in range(5)]
+
+    start = time.perf_counter()
+    assert sorted(p.url for p in engine.scrape(urls)) == sorted(urls)
+    # 4 requests per host have to wait for a token, at 20 per second
+    assert 0.18 < time.perf_counter() - start < 0.5
+
+
+def test_throttled_hosts_do_not_hold_slots():
+    engine = ScrapeEngine(concurrency=1, host_rate=2, host_burst=1, session=SlowSession(0))
+    urls = [f"https://www.vlr.gg/{i}" for i in range(3)] + ["https://liquipedia.net/1"]
+
+    start = time.perf_counter()
+    finished = {p.url: time.perf_counter() - start for p in engine.scrape(urls)}
+    # vlr.gg waits half a second per page for its tokens, without holding up liquipedia.net
+    assert finished["https://liquipedia.net/1"] < 0.2
+    assert finished["https://www.vlr.gg/2"] > 0.9
+
+
+def test_scrape_stops_fetching_when_iteration_stops():
+    session = SlowSession(0.02)
+    engine = ScrapeEngine(concurrency=1, host_rate=1000, host_burst=1000, session=session)
+
+    for _ in engine.scrape([f"https://www.vlr.gg/{i}" for i in range(50)]):
+        break
+    time.sleep(0.2)
+    assert len(session.requested) < 5
+
+
+def test_scrape_runs_in_the_callers_context():
+    session = SlowSession(0.01)
+    engine = ScrapeEngine(concurrency=4, host_rate=1000, host_burst=1000, session=session)
+
+    url = "https://www.vlr.gg/1"
+    with share_pages():
+        assert all(p.was_success() for p in engine.scrape([url, url, url]))
+        engine.scrape_all([url])
+    assert session.requested == [url]
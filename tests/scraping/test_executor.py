@@ -0,0 +1,34 @@
+import pytest
+
+from flask_esports.scraping.executor import ParseExecutor
+from flask_esports.scraping.utils import get_url_segment
+from flask_esports.scraping.xpath import Field, Rows
+
+SCHEMA = Rows("//a", {"id": Field(".", "href", get_url_segment, (1, int)), "name": Field()})
+PAGES = [b"<html><body><a href='/%d/a'>A%d</a><a href='/%d/b'>B%d</a></body></html>" % (i, i, i + 1, i) for i in range(5)]
+
+
+@pytest.mark.parametrize("mode", ["thread", "process"])
+def test_parse_executor(mode):
+    with ParseExecutor(mode, 2) as executor:
+        assert executor.submit(PAGES[0], SCHEMA).result() == [{"id": 0, "name": "A0"}, {"id": 1, "name": "B0"}]
+        assert [r[1]["name"] for r in executor.map(PAGES, SCHEMA)] == [f"B{i}" for i in range(5)]
+    assert executor._executor is None
+
+
+def test_parse_executor_mode():
+    with pytest.raises(ValueError):
+        ParseExecutor("fibers")
+
+
+def test_parse_executor_pool(monkeypatch):
+    monkeypatch.setattr("flask_esports.config.Config.SCRAPE_PARSE_WORKERS", None)
+    monkeypatch.setattr("os.cpu_count", lambda: 3)
+    executor = ParseExecutor("process")
+    # The chunks are sized from the real size of the pool
+    assert executor.max_workers == 3
+
+    # The serving process has many threads, so workers are not forked from it
+    with executor:
+        assert executor.executor._mp_context.get_start_method() in ("forkserver", "spawn")
+        assert list(executor.map(PAGES, SCHEMA))[4][0]["id"] == 4
@@ -0,0 +1,32 @@
+import requests
+
+from flask_esports.config import Config
+from flask_esports.scraping.http import ScrapeSession, clear_sessions, get_session, set_session_factory
+
+
+def test_sessions_are_shared_per_host():
+    clear_sessions()
+    session = get_session("https://www.vlr.gg/team/2")
+
+    assert isinstance(session, ScrapeSession)
+    assert session is get_session("https://WWW.vlr.gg/player/9")
+    assert session is not get_session("https://liquipedia.net/valorant")
+    assert session.timeout == Config.SCRAPE_TIMEOUT
+    assert "gzip" in session.headers["Accept-Encoding"]
+
+    adapter = session.get_adapter("https://www.vlr.gg/")
+    assert adapter.max_retries.total == Config.SCRAPE_RETRIES
+    assert adapter.max_retries.backoff_factor == Config.SCRAPE_BACKOFF
+    clear_sessions()
+
+
+def test_session_factory():
+    created = []
+    set_session_factory(lambda host: created.append(host) or requests.Session())
+    try:
+        get_session("https://www.vlr.gg/team/2")
+        get_session("https://www.vlr.gg/team/3")
+        assert created == ["www.vlr.gg"]
+    finally:
+        set_session_factory(None)
+    assert isinstance(get_session("https://www.vlr.gg/"), ScrapeSession)
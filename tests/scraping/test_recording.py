@@ -0,0 +1,52 @@
+import pytest
+
+from flask_esports.scraping.recording import MissingRecording, Recording, RecordingSession, use_recording
+from flask_esports.scraping.xpath import XpathParser
+from tests.conftest import FakeResponse, FakeSession
+
+URL = "https://www.vlr.gg/team/2"
+PAGE = b"<html><body><h1>Sentinels</h1></body></html>"
+
+
+def test_record_then_replay(tmp_path):
+    live = FakeSession({URL: FakeResponse(URL, content=PAGE, headers={"ETag": '"v1"', "Content-Encoding": "gzip"})})
+    recorder = RecordingSession(str(tmp_path), "record", session=live)
+    assert recorder.get(URL).content == PAGE
+    recorder.get("https://www.vlr.gg/404")
+
+    replayer = RecordingSession(str(tmp_path))
+    response = replayer.get(URL)
+    assert (response.status_code, response.content) == (200, PAGE)
+    assert response.headers["etag"] == '"v1"'
+    assert "Content-Encoding" not in response.headers
+    assert replayer.get("https://www.vlr.gg/404").status_code == 404
+    assert sorted(Recording(str(tmp_path)).urls()) == ["https://www.vlr.gg/404", URL]
+
+    with pytest.raises(MissingRecording):
+        replayer.get("https://www.vlr.gg/team/3")
+
+
+def test_auto_only_requests_missing_urls(tmp_path):
+    Recording(str(tmp_path)).save(URL, PAGE)
+    live = FakeSession({"https://www.vlr.gg/team/3": PAGE})
+    session = RecordingSession(str(tmp_path), "auto", session=live)
+
+    session.get(URL)
+    session.get("https://www.vlr.gg/team/3")
+    session.get("https://www.vlr.gg/team/3")
+    assert live.requested == ["https://www.vlr.gg/team/3"]
+
+
+def test_parsers_replay_recordings(tmp_path):
+    Recording(str(tmp_path)).save(URL, PAGE)
+    use_recording(str(tmp_path))
+    try:
+        assert XpathParser(URL).get_text("//h1") == "Sentinels"
+        assert not XpathParser("https://www.vlr.gg/team/3").was_success()
+    finally:
+        use_recording(None)
+
+
+def test_invalid_mode(tmp_path):
+    with pytest.raises(ValueError):
+        RecordingSession(str(tmp_path), "rewind")
@@ -0,0 +1,65 @@
+from flask_esports.scraping.stream import iter_elements, stream_elements
+from flask_esports.scraping.xpath import Field, Schema, xpath
+from tests.conftest import FakeResponse
+
+PAGE = b"<html><body><div class='list'>" + b"".join(
+    b"<a class='match-item' href='/%d/match'><div class='team'>T%d</div></a><a class='other' href='/x'></a>" % (i, i) for i in range(50)
+) + b"</div></body></html>"
+
+
+def chunks(data, size=37):
+    return (data[i:i + size] for i in range(0, len(data), size))
+
+
+def test_iter_elements():
+    schema = Schema({"href": Field(".", "href"), "team": Field(xpath("div", class_="team"))})
+    rows = []
+    for elem in iter_elements(chunks(PAGE), "a", class_="match-item"):
+        # Every row that has already been handled has been freed
+        assert elem.getprevious() is None or elem.getprevious().get("class") == "other"
+        rows.append(schema.extract(elem))
+
+    assert rows == [{"href": f"/{i}/match", "team": f"T{i}"} for i in range(50)]
+
+
+GROUPED = b"<html><body><div class='header'>Matches</div>" + b"".join(
+    b"<div class='day'><div class='date'>Day %d</div>%s</div>" % (
+        day, b"".join(b"<a class='match-item' href='/%d/match'></a>" % (day * 10 + i) for i in range(10))
+    ) for day in range(20)
+) + b"</body></html>"
+
+
+def test_iter_elements_frees_earlier_groups():
+    hrefs = []
+    for elem in iter_elements(chunks(GROUPED), "a", class_="match-item"):
+        # Only the previous row (and the day holding it) is left of everything parsed before this row
+        assert len(elem.getparent().getparent()) <= 2
+        assert sum(1 for _ in elem.getroottree().iter()) < 10
+        hrefs.append(elem.get("href"))
+
+    assert hrefs == [f"/{i}/match" for i in range(200)]
+
+
+class StreamingSession:
+    def __init__(self, status=200):
+        self.status = status
+        self.closed = False
+
+    def get(self, url, stream=False, **kwargs):
+        assert stream
+        response = FakeResponse(url, self.status, PAGE)
+        response.iter_content = lambda size: chunks(PAGE, size)
+        response.close = lambda: setattr(self, "closed", True)
+        return response
+
+
+def test_stream_elements():
+    session = StreamingSession()
+    hrefs = [e.get("href") for e in stream_elements("https://www.vlr.gg/event/1", "a", session, chunk_size=64, class_="match-item")]
+
+    assert hrefs == [f"/{i}/match" for i in range(50)]
+    assert session.closed
+
+    session = StreamingSession(404)
+    assert list(stream_elements("https://www.vlr.gg/event/1", "a", session)) == []
+    assert session.closed
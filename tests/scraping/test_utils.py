@@ -1,8 +1,10 @@
-import pytest
-
+import random
 from contextlib import nullcontext
+from datetime import datetime
+
+import pytest
 
-from flask_esports.scraping.utils import get_url_segment, epoch_from_timestamp
+from flask_esports.scraping.utils import get_url_segment, epoch_from_timestamp, epochs_from_timestamps
 
 def test_xpath_parser():
     """How do we test this and guarantee it works every time since XPATHs will naturally change sometimes??
@@ -30,3 +32,49 @@ def test_get_url_segment(url, index, rtype, result, err):
 def test_epoch_from_timestamp(ts, fmt, epoch, err):
     with pytest.raises(err) if err else nullcontext():
         assert epoch_from_timestamp(ts, fmt) == epoch
+
+
+TIMESTAMPS = [
+    ("01/08/2024", "%d/%m/%Y"), ("1/8/24", "%d/%m/%y"), ("2024-08-01 17:05:09.25", "%Y-%m-%d %H:%M:%S.%f"),
+    ("2024-08-01T17:05:09+02:00", "%Y-%m-%dT%H:%M:%S%z"), ("2024-08-01T17:05:09Z", "%Y-%m-%dT%H:%M:%S%z"),
+    ("2024-08-01 17:05   -0130", "%Y-%m-%d %H:%M %z"), ("Thu, 01 Aug 2024", "%a, %d %b %Y"), ("10%", "%d%%"),
+    ("29/02/2024", "%d/%m/%Y"), ("2024-08-01T17:05:09+02:00:30.5", "%Y-%m-%dT%H:%M:%S%z"),
+]
+INVALID = [
+    ("29/02/2023", "%d/%m/%Y"), ("01/08/2024 extra", "%d/%m/%Y"), ("32/08/2024", "%d/%m/%Y"), ("2024-08-01T17:05:60+0000", "%Y-%m-%dT%H:%M:%S%z"),
+]
+
+
+@pytest.mark.parametrize("ts, fmt", TIMESTAMPS)
+def test_epoch_from_timestamp_matches_strptime(ts, fmt):
+    assert epoch_from_timestamp(ts, fmt) == datetime.strptime(ts, fmt).timestamp()
+
+
+@pytest.mark.parametrize("ts, fmt", INVALID)
+def test_epoch_from_timestamp_rejects_like_strptime(ts, fmt):
+    with pytest.raises(ValueError):
+        datetime.strptime(ts, fmt)
+    with pytest.raises(ValueError):
+        epoch_from_timestamp(ts, fmt)
+
+
+@pytest.mark.parametrize("use_numpy", [False, True])
+def test_epochs_from_timestamps(use_numpy):
+    if use_numpy:
+        pytest.importorskip("numpy")
+    rng = random.Random(0)
+    fmt = "%Y-%m-%dT%H:%M:%S.%f%z"
+    timestamps = [
+        f"{rng.randint(1900, 2100)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}T{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}:"
+        f"{rng.randint(0, 59):02d}.{rng.randint(0, 999999)}{rng.choice('+-')}{rng.randint(0, 14):02d}{rng.choice(['00', '30', '45'])}"
+        for _ in range(300)
+    ]
+    timestamps += timestamps[:50]
+
+    assert epochs_from_timestamps(timestamps, fmt, use_numpy) == [datetime.strptime(ts, fmt).timestamp() for ts in timestamps]
+    assert epochs_from_timestamps([ts for ts, _ in TIMESTAMPS[:1]] * 3, "%d/%m/%Y", use_numpy) == [epoch_from_timestamp("01/08/2024", "%d/%m/%Y")] * 3
+
+    with pytest.raises(ValueError):
+        epochs_from_timestamps(["2023-02-29T00:00:00.0+0000"] * 300, fmt, use_numpy)
+    with pytest.raises(ValueError):
+        epochs_from_timestamps(["2023-02-28T00:00:00.0+0000", "invalid"], fmt, use_numpy)
@@ -1,6 +1,9 @@
 import pytest
+import requests
+from lxml import etree
 
 from flask_esports.scraping import xpath as xp
+from flask_esports.scraping.utils import epoch_from_timestamp, get_url_segment
 
 @pytest.mark.parametrize("elem,root,kwargs,xpath", [
     ("div", '', {}, "//div"), # No filters
@@ -21,3 +24,146 @@ def test_create_xpath(elem, root, kwargs, xpath):
 ])
 def test_xpath_join(paths, xpath):
     assert xp.join(*paths) == xpath
+
+
+PAGE = b"<html><body><div class='team'><a href='/team/2/sentinels'>Sentinels</a><img src=' /logo.png '/></div></body></html>"
+
+
+def test_xpath_parser(fake_session):
+    fake_session.pages["https://www.vlr.gg/team/2"] = PAGE
+    parser = xp.XpathParser("https://www.vlr.gg/team/2")
+
+    assert parser.was_success()
+    assert parser.get_text(xp.xpath("a", xp.xpath("div", class_="team"))) == "Sentinels"
+    assert parser.get_href("//a") == "/team/2/sentinels"
+    assert parser.get_img("//img") == "/logo.png"
+    assert parser.get_elements("//a", "href") == ["/team/2/sentinels"]
+    assert fake_session.requested == ["https://www.vlr.gg/team/2"]
+
+    assert not xp.XpathParser("https://www.vlr.gg/team/404").was_success()
+
+
+def test_xpath_parser_session_injection(fake_session):
+    class FailingSession:
+        def get(self, url, **kwargs):
+            raise requests.ConnectionError("connection refused")
+
+    assert not xp.XpathParser("https://www.vlr.gg/team/2", session=FailingSession()).was_success()
+    assert fake_session.requested == []
+
+
+def test_compile_xpath():
+    compiled = xp.compile_xpath("//div[1]")
+    assert compiled is xp.compile_xpath("//div[1]")
+    assert compiled is not xp.compile_xpath("//div[2]")
+
+    with pytest.raises(etree.XPathError):
+        xp.compile_xpath("//div[")
+
+
+def test_xpath_builders_are_memoized():
+    assert xp.xpath("div", class_="test") is xp.xpath("div", class_="test")
+    assert xp.join("div[1]", "div[2]") is xp.join("div[1]", "div[2]")
+
+
+MATCHES = b"""<html><body>
+<h1 class="event-name"> Champions 2024 </h1>
+<a class="match-item" href="/101/sen-vs-fnc"><div class="team">SEN</div><div class="team">FNC</div><div class="date">01/08/2024</div></a>
+<a class="match-item" href="/102/drx-vs-prx"><div class="team">DRX</div><div class="team">PRX</div></a>
+</body></html>"""
+
+
+class Result:
+    def __init__(self, id, teams, date):
+        self.id, self.teams, self.date = id, teams, date
+
+
+def test_schema_extraction():
+    schema = xp.Schema({
+        "name": xp.Field(xp.xpath("h1", class_="event-name")),
+        "missing": xp.Field("//h2", default="none"),
+        "matches": xp.Rows(xp.xpath("a", class_="match-item"), {
+            "id": xp.Field(".", "href", get_url_segment, (1, int)),
+            "teams": xp.Field(xp.xpath("div", class_="team"), many=True),
+            "date": xp.Field(xp.xpath("div", class_="date"), convert=epoch_from_timestamp, args=("%d/%m/%Y",)),
+        }),
+    })
+    parser = xp.XpathParser.from_content("https://www.vlr.gg/event/1", MATCHES)
+
+    assert parser.extract(schema) == {
+        "name": "Champions 2024",
+        "missing": "none",
+        "matches": [
+            {"id": 101, "teams": ["SEN", "FNC"], "date": epoch_from_timestamp("01/08/2024", "%d/%m/%Y")},
+            {"id": 102, "teams": ["DRX", "PRX"], "date": None},
+        ],
+    }
+    assert schema.extract(None) is None
+
+
+def test_schema_into():
+    rows = xp.Rows("//a", {"id": xp.Field(".", "href", get_url_segment, (1, int)), "teams": xp.Field("div/text()", many=True), "date": xp.Field("@data-date")}, into=Result)
+    results = xp.XpathParser.from_content("", MATCHES).extract(rows)
+
+    assert [(r.id, r.teams, r.date) for r in results] == [(101, ["SEN", "FNC", "01/08/2024"], None), (102, ["DRX", "PRX"], None)]
+
+
+def test_schema_scalar_results():
+    schema = xp.Schema({
+        "name": xp.Field("normalize-space(//h1)"),
+        "matches": xp.Field("count(//a)", convert=int),
+        "has_date": xp.Field("boolean(//div[@class='date'])"),
+        "has_logo": xp.Field("boolean(//img)"),
+        "missing": xp.Field("normalize-space(//h2)", default="none"),
+        "teams": xp.Field("string(//a/div)", many=True),
+    })
+
+    assert xp.XpathParser.from_content("", MATCHES).extract(schema) == {
+        "name": "Champions 2024",
+        "matches": 2,
+        "has_date": True,
+        "has_logo": False,
+        "missing": "none",
+        "teams": ["SEN"],
+    }
+
+
+def test_lazy_xpath_parser(fake_session):
+    fake_session.pages["https://www.vlr.gg/team/2"] = PAGE
+    parser = xp.XpathParser("https://www.vlr.gg/team/2", lazy=True)
+
+    assert not parser.is_fetched()
+    assert fake_session.requested == []
+    assert parser.get_href("//a") == "/team/2/sentinels"
+    assert parser.is_fetched()
+    assert parser.fetch()
+    assert fake_session.requested == ["https://www.vlr.gg/team/2"]
+
+
+def test_prefetch(fake_session):
+    urls = [f"https://www.vlr.gg/team/{i}" for i in range(5)]
+    fake_session.pages.update({url: PAGE for url in urls[1:]})
+
+    parsers = [xp.XpathParser(url, lazy=True) for url in urls]
+    parsers[1].fetch()
+    assert xp.prefetch(parsers) == parsers
+
+    assert all(p.is_fetched() for p in parsers)
+    assert [p.was_success() for p in parsers] == [False, True, True, True, True]
+    assert sorted(fake_session.requested) == sorted(urls)
+
+
+def test_share_pages(fake_session):
+    url = "https://www.vlr.gg/team/2"
+    fake_session.pages[url] = PAGE
+
+    with xp.share_pages():
+        first = xp.XpathParser(url, lazy=True)
+        # Sibling fetches in threads started with a copy of the context share the page too
+        parsers = xp.prefetch([first, xp.XpathParser(url, lazy=True)])
+        later = xp.XpathParser(url)
+    assert parsers[1].content is first.content and later.content is first.content
+    assert fake_session.requested == [url]
+
+    xp.XpathParser(url)
+    assert fake_session.requested == [url, url]
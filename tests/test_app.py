@@ -0,0 +1,102 @@
+import sys
+
+import pytest
+
+from flask_esports.app import LazyGameDispatcher, create_app, game_manifest
+from flask_esports.config import Config
+
+GAME = """
+from flask_esports.api.blueprint import GameBlueprint
+from flask_esports.api.source import DataSource
+
+
+class Player:
+    def __init__(self, player_id):
+        self.player_id = player_id
+
+    def to_dict(self):
+        return {{"player-id": self.player_id, "game": "{game}"}}
+
+
+class Source(DataSource):
+    @staticmethod
+    def get_player(player_id):
+        return Player(player_id)
+
+
+router = GameBlueprint("{game}", __name__, Source)
+"""
+
+
+@pytest.fixture()
+def endpoints(tmp_path, monkeypatch, request):
+    """An endpoint directory (with a unique package name, as imports are cached) holding two games"""
+    directory = tmp_path / f"endpoints_{request.node.name}"
+    for game in ("valorant", "csgo"):
+        (directory / game).mkdir(parents=True)
+        (directory / game / "__init__.py").write_text(GAME.format(game=game))
+    (directory / "__pycache__").mkdir()
+    (directory / "README.md").write_text("")
+
+    monkeypatch.setattr(Config, "BASE_DIRECTORY", str(tmp_path))
+    monkeypatch.setattr(Config, "API_ENDPOINT_DIR", str(directory))
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield directory.name
+
+
+def test_game_manifest(endpoints):
+    assert game_manifest() == ["csgo", "valorant"]
+
+
+def test_lazy_app_imports_games_on_first_request(endpoints):
+    app = create_app(eager=False)
+    dispatcher = app.wsgi_app
+    assert isinstance(dispatcher, LazyGameDispatcher)
+    assert f"{endpoints}.valorant" not in sys.modules
+
+    client = app.test_client()
+    response = client.get("/valorant/player/2")
+    assert response.status_code == 200
+    assert response.json["data"]["game"] == "valorant"
+    assert dispatcher.is_loaded("valorant") and not dispatcher.is_loaded("csgo")
+    assert f"{endpoints}.csgo" not in sys.modules
+
+    assert client.get("/unknown/player/2").status_code == 404
+
+
+def test_eager_app_registers_every_game(endpoints):
+    app = create_app(eager=True)
+    assert not isinstance(app.wsgi_app, LazyGameDispatcher)
+    assert f"{endpoints}.csgo" in sys.modules
+    assert app.test_client().get("/csgo/player/2").status_code == 200
+
+
+def test_lazy_game_apps_run_the_main_apps_hooks(endpoints):
+    app = create_app(eager=False)
+    seen = []
+
+    @app.before_request
+    def before():
+        seen.append("before")
+
+    @app.after_request
+    def after(response):
+        response.headers["X-Hooked"] = "1"
+        return response
+
+    @app.teardown_appcontext
+    def teardown(exc):
+        seen.append("teardown")
+
+    @app.errorhandler(404)
+    def not_found(e):
+        return {"success": False, "error": "not found"}, 404
+
+    client = app.test_client()
+    response = client.get("/valorant/player/2")
+    assert response.headers["X-Hooked"] == "1"
+    assert seen == ["before", "teardown"]
+
+    response = client.get("/valorant/unknown")
+    assert response.status_code == 404
+    assert response.json == {"success": False, "error": "not found"}
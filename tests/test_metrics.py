@@ -0,0 +1,181 @@
+import threading
+
+import pytest
+from flask import Flask
+
+from flask_esports import metrics
+from flask_esports.api.blueprint import GameBlueprint
+from flask_esports.api.source import DataSource
+from flask_esports.app import create_app
+from flask_esports.config import Config
+from flask_esports.metrics import Registry
+
+
+@pytest.fixture(autouse=True)
+def metrics_enabled(monkeypatch):
+    monkeypatch.setattr(Config, "METRICS_ENABLED", True)
+
+
+def test_counters_are_summed_across_threads():
+    registry = Registry()
+    counter = registry.counter("hits", "Hits", ("game",))
+
+    def work():
+        for _ in range(1000):
+            counter.inc("valorant")
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    counter.inc("csgo", amount=2)
+
+    assert registry.render() == (
+        "# HELP hits_total Hits\n# TYPE hits_total counter\n"
+        'hits_total{game="csgo"} 2\nhits_total{game="valorant"} 4000\n'
+    )
+    # The shards of the finished threads have been retired
+    assert len(counter._shards) == 1
+
+
+def test_thread_per_request_reuses_shards():
+    registry = Registry()
+    counter = registry.counter("hits", "Hits")
+    for _ in range(200):
+        thread = threading.Thread(target=counter.inc)
+        thread.start()
+        thread.join()
+
+    assert registry.render().endswith("hits_total 200\n")
+    # New threads take over the shards of finished threads with the same ident
+    assert counter._created < 50
+
+
+def test_histogram_buckets():
+    registry = Registry()
+    histogram = registry.histogram("latency", "Latency", buckets=(0.1, 1))
+    for value in (0.05, 0.1, 0.5, 3):
+        histogram.observe(value)
+
+    assert registry.render().splitlines()[2:] == [
+        'latency_bucket{le="0.1"} 2',
+        'latency_bucket{le="1"} 3',
+        'latency_bucket{le="+Inf"} 4',
+        "latency_sum 3.65",
+        "latency_count 4",
+    ]
+
+
+def test_callback_metrics():
+    registry = Registry()
+    registry.callback("cache", "Cache", "counter", lambda: [("_total", {"result": 'a"b'}, 1.5)])
+    assert registry.render().splitlines()[2] == 'cache_total{result="a\\"b"} 1.5'
+
+
+class Empty(DataSource):
+    @staticmethod
+    def get_team(team_id):
+        return None
+
+
+class Broken(DataSource):
+    @staticmethod
+    def get_team(team_id):
+        raise ValueError("layout changed")
+
+
+class Team:
+    def to_dict(self):
+        return {"name": "Sentinels"}
+
+
+class Working(DataSource):
+    @staticmethod
+    def get_team(team_id):
+        return Team()
+
+
+def sample(name, **labels):
+    for suffix, sample_labels, value in getattr(metrics, name).samples():
+        if suffix in ("_total", "_count") and sample_labels == labels:
+            return value
+    return 0
+
+
+def test_blueprint_records_requests_and_sources():
+    app = Flask(__name__)
+    with app.app_context():
+        GameBlueprint("metricsgame", __name__, Empty, Broken, Working).register(app)
+    client = app.test_client()
+
+    assert client.get("/metricsgame/team/2").json["data"] == {"name": "Sentinels"}
+    client.get("/metricsgame/team/x")
+
+    # Errors are reported in the body, with a 200 status
+    assert sample("requests_total", game="metricsgame", endpoint="get_team", status="200") == 2
+    assert sample("request_duration", game="metricsgame", endpoint="get_team") == 2
+    for source, outcome in (("Empty", "empty"), ("Broken", "error"), ("Working", "success")):
+        assert sample("source_calls_total", game="metricsgame", resource="team", source=source, outcome=outcome) == 1
+
+
+def test_failing_sources_are_not_reported_as_not_found():
+    app = Flask(__name__)
+    with app.app_context():
+        GameBlueprint("failinggame", __name__, Empty, Broken).register(app)
+
+    response = app.test_client().get("/failinggame/team/2")
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(Config.SOURCES_RETRY_AFTER)
+    assert response.json["success"] is False
+    assert sample("source_calls_total", game="failinggame", resource="team", source="Broken", outcome="error") == 1
+    assert sample("requests_total", game="failinggame", endpoint="get_team", status="503") == 1
+
+
+def test_metrics_endpoint(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "API_ENDPOINT_DIR", str(tmp_path))
+    response = create_app().test_client().get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert "# TYPE flask_esports_request_duration_seconds histogram" in response.text
+    assert "# TYPE flask_esports_requests_total counter" in response.text
+
+
+def test_metrics_endpoint_is_disabled_by_default(tmp_path, monkeypatch):
+    monkeypatch.undo()
+    monkeypatch.setattr(Config, "API_ENDPOINT_DIR", str(tmp_path))
+    assert not Config.METRICS_ENABLED
+    assert create_app().test_client().get("/metrics").status_code == 404
+
+
+def test_metrics_endpoint_requires_the_token(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, "API_ENDPOINT_DIR", str(tmp_path))
+    monkeypatch.setattr(Config, "METRICS_TOKEN", "secret")
+    client = create_app().test_client()
+
+    response = client.get("/metrics")
+    assert response.status_code == 401
+    assert response.headers["WWW-Authenticate"] == "Bearer"
+    assert client.get("/metrics", headers={"Authorization": "Bearer wrong"}).status_code == 401
+    assert client.get("/metrics", headers={"Authorization": "Bearer secret"}).status_code == 200
+
+
+class StrictTeam(Team):
+    def __eq__(self, other):
+        # Like the resources, which compare attributes of the other object
+        return self.to_dict() == other.to_dict()
+
+
+class Strict(DataSource):
+    @staticmethod
+    def get_team(team_id):
+        return StrictTeam()
+
+
+def test_resources_are_not_compared_with_lists():
+    app = Flask(__name__)
+    with app.app_context():
+        GameBlueprint("strictgame", __name__, Strict).register(app)
+
+    assert app.test_client().get("/strictgame/team/2").json["data"] == {"name": "Sentinels"}
+    assert sample("source_calls_total", game="strictgame", resource="team", source="Strict", outcome="success") == 1
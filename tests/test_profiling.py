@@ -0,0 +1,80 @@
+import os
+import pstats
+
+from flask import Flask
+
+import flask_esports
+
+from flask_esports.api.blueprint import GameBlueprint
+from flask_esports.api.source import DataSource
+from flask_esports.profiling import ProfilingMiddleware, categorize, install_profiling
+from flask_esports.scraping.xpath import XpathParser
+
+PAGE = b"<html><body><h1>Sentinels</h1></body></html>"
+
+
+class Team:
+    def __init__(self, name):
+        self.name = name
+
+    def to_dict(self):
+        return {"name": self.name}
+
+
+class Source(DataSource):
+    @staticmethod
+    def get_team(team_id):
+        return Team(XpathParser.from_content("https://www.vlr.gg/team/2", PAGE).get_text("//h1"))
+
+
+def create_app(**config):
+    app = Flask(__name__)
+    app.config.update(config)
+    with app.app_context():
+        GameBlueprint("valorant", __name__, Source).register(app)
+    return app
+
+
+def test_categorize():
+    package = os.path.dirname(os.path.abspath(flask_esports.__file__))
+    assert categorize(os.path.join(package, "app", "db", "db.py"), "query_db") == "db"
+    assert categorize("~", "<method 'execute' of 'sqlite3.Connection' objects>") == "db"
+    assert categorize(os.path.join(package, "scraping", "xpath.py"), "get_text") == "scraping"
+    assert categorize("~", "<method 'xpath' of 'lxml.etree._Element' objects>") == "scraping"
+    assert categorize(os.path.join(package, "api", "blueprint.py"), "get_team") == "blueprint"
+    assert categorize(os.path.join(package, "api", "source.py"), "is_implemented") == "datasource"
+    assert categorize("/usr/lib/python3/json/encoder.py", "encode") == "other"
+
+
+def test_disabled_by_default():
+    app = create_app()
+    install_profiling(app)
+    assert not isinstance(app.wsgi_app, ProfilingMiddleware)
+
+
+def test_profiled_request_report():
+    app = create_app(PROFILING_ENABLED=True, PROFILING_TOKEN="secret")
+    install_profiling(app)
+    client = app.test_client()
+
+    assert client.get("/valorant/team/2").json["data"] == {"name": "Sentinels"}
+    assert client.get("/valorant/team/2", headers={"X-Profile-Token": "wrong"}).json["data"] == {"name": "Sentinels"}
+
+    report = client.get("/valorant/team/2", headers={"X-Profile-Token": "secret"}).json
+    assert report["path"] == "/valorant/team/2"
+    assert report["status"] == "200 OK"
+    assert set(report["categories-ms"]) == {"blueprint", "datasource", "scraping", "db", "other"}
+    assert report["categories-ms"]["scraping"] > 0
+    assert report["top"] and report["top"][0]["total-ms"] >= report["top"][-1]["total-ms"]
+
+
+def test_stored_profile(tmp_path):
+    app = create_app(PROFILING_ENABLED=True, PROFILING_TOKEN="secret", PROFILING_DIRECTORY=str(tmp_path))
+    install_profiling(app)
+
+    response = app.test_client().get(
+        "/valorant/team/2", headers={"X-Profile-Token": "secret", "X-Profile-Output": "store"}
+    )
+    assert response.json["data"] == {"name": "Sentinels"}
+    stats = pstats.Stats(str(tmp_path / f"{response.headers['X-Profile-Id']}.prof"))
+    assert any(name == "get_team" for _, _, name in stats.stats)
@@ -0,0 +1,98 @@
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+import pytest
+
+pytestmark = pytest.mark.skipif(not hasattr(os, "fork"), reason="requires os.fork")
+
+SERVER = """
+import os, sys
+from flask import Flask
+from flask_esports.server import PreforkServer, add_warmup_hook
+
+app = Flask(__name__)
+warmed = []
+add_warmup_hook(lambda app: warmed.append(os.getpid()))
+
+@app.route("/pid")
+def pid():
+    return {"pid": os.getpid(), "warmed": warmed == [os.getpid()]}
+
+server = PreforkServer(app, "127.0.0.1", 0, workers=2, max_requests=3, max_requests_jitter=0, graceful_timeout=5)
+server.bind()
+print(server.port, flush=True)
+server.serve_forever()
+"""
+
+
+def get(port):
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/pid", timeout=5) as response:
+        return json.load(response)
+
+
+def test_prefork_server_recycles_workers_and_stops():
+    process = subprocess.Popen(
+        [sys.executable, "-c", SERVER],
+        stdout=subprocess.PIPE,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(["src", os.environ.get("PYTHONPATH", "")])),
+    )
+    try:
+        port = int(process.stdout.readline())
+        responses = [get(port) for _ in range(12)]
+        assert all(r["warmed"] for r in responses)
+        # 2 workers serving at most 3 requests each must have been replaced along the way
+        assert len({r["pid"] for r in responses}) >= 4
+        assert process.poll() is None
+    finally:
+        process.send_signal(signal.SIGTERM)
+        assert process.wait(timeout=10) == 0
+
+
+# A worker whose every poll of the listening socket finds it ready, as when another worker accepts the connection first
+RACING_WORKER = """
+import os, selectors, socketserver, time
+from flask import Flask
+from flask_esports.server import PreforkServer
+
+class RacingSelector(socketserver._ServerSelector):
+    def select(self, timeout=None):
+        time.sleep(0.05)
+        return [(key, selectors.EVENT_READ) for key in self.get_map().values()]
+
+socketserver._ServerSelector = RacingSelector
+server = PreforkServer(Flask(__name__), "127.0.0.1", 0, workers=1, graceful_timeout=2)
+server.bind()
+server._spawn()
+(pid,) = server._workers
+print(pid, flush=True)
+print(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]), flush=True)
+"""
+
+
+def test_workers_losing_the_accept_race_stop_gracefully():
+    process = subprocess.Popen(
+        [sys.executable, "-c", RACING_WORKER],
+        stdout=subprocess.PIPE,
+        text=True,
+        env=dict(os.environ, PYTHONPATH=os.pathsep.join(["src", os.environ.get("PYTHONPATH", "")])),
+    )
+    pid = int(process.stdout.readline())
+    try:
+        # Let the worker warm up and start serving
+        time.sleep(1)
+        os.kill(pid, signal.SIGTERM)
+        # Within the graceful timeout, so the worker was not left blocked in accept()
+        output, _ = process.communicate(timeout=2)
+        assert output.strip() == "0"
+    finally:
+        try:
+            os.kill(pid, signal.SIGKILL)
+        except ProcessLookupError:
+            pass
+        process.kill()
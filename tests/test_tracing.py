@@ -0,0 +1,152 @@
+import contextvars
+import json
+import threading
+
+import pytest
+from flask import Flask
+
+from flask_esports import tracing
+from flask_esports.api.blueprint import GameBlueprint
+from flask_esports.api.source import DataSource
+from flask_esports.scraping.xpath import XpathParser, prefetch
+
+URL = "https://www.vlr.gg/team/2"
+PAGE = b"<html><body><h1>Sentinels</h1></body></html>"
+
+
+class Collector:
+    def __init__(self):
+        self.traces = []
+
+    def export(self, trace):
+        self.traces.append(trace)
+
+
+@pytest.fixture()
+def collector():
+    collector = Collector()
+    tracing.configure_tracing(enabled=True, sample_rate=1.0)
+    tracing.add_exporter(collector)
+    yield collector
+    tracing.clear_exporters()
+    tracing.configure_tracing()
+
+
+def tree(trace):
+    """The names of the spans of a trace as {name: parent name}"""
+    names = {s.span_id: s.name for s in trace.spans}
+    return {s.name: names.get(s.parent_id) for s in trace.spans}
+
+
+def test_disabled_spans_are_noops():
+    assert not tracing._enabled
+    with tracing.span("root") as span:
+        assert span is tracing.NOOP
+        assert tracing.current_span() is None
+
+
+def test_spans_nest(collector):
+    with tracing.span("root", game="valorant"):
+        with tracing.span("child"):
+            pass
+        with pytest.raises(ValueError):
+            with tracing.span("failing"):
+                raise ValueError("layout changed")
+
+    (trace,) = collector.traces
+    assert tree(trace) == {"child": "root", "failing": "root", "root": None}
+    spans = {s.name: s for s in trace.spans}
+    assert spans["root"].attributes == {"game": "valorant"}
+    assert spans["failing"].error == "ValueError('layout changed')"
+    assert spans["root"].duration_ms >= spans["child"].duration_ms
+
+
+def test_unsampled_traces(collector):
+    tracing.configure_tracing(enabled=True, sample_rate=0.0)
+    with tracing.span("root"):
+        with tracing.span("child") as child:
+            assert child is tracing.NOOP
+    assert collector.traces == []
+
+
+def test_prefetch_spans_join_the_callers_trace(collector, fake_session):
+    fake_session.pages.update({URL: PAGE, "https://www.vlr.gg/team/3": PAGE})
+    with tracing.span("root"):
+        prefetch([XpathParser(URL, lazy=True), XpathParser("https://www.vlr.gg/team/3", lazy=True)])
+
+    (trace,) = collector.traces
+    fetches = [s for s in trace.spans if s.name == "scrape.fetch"]
+    assert len(fetches) == 2
+    assert {s.attributes["url"] for s in fetches} == {URL, "https://www.vlr.gg/team/3"}
+
+
+def test_traces_wait_for_spans_outliving_the_root(collector):
+    entered = threading.Event()
+    release = threading.Event()
+
+    def work():
+        with tracing.span("worker"):
+            entered.set()
+            release.wait(5)
+
+    with tracing.span("root"):
+        thread = threading.Thread(target=contextvars.copy_context().run, args=(work,))
+        thread.start()
+        entered.wait(5)
+    # The root has finished, but the worker's span has not
+    assert collector.traces == []
+
+    release.set()
+    thread.join()
+    (trace,) = collector.traces
+    assert tree(trace) == {"worker": "root", "root": None}
+
+
+class Team:
+    def to_dict(self):
+        return {"name": "Sentinels"}
+
+
+class Source(DataSource):
+    @staticmethod
+    def get_team(team_id):
+        XpathParser(URL).get_text("//h1")
+        return Team()
+
+
+def test_request_spans(collector, fake_session):
+    fake_session.pages[URL] = PAGE
+    app = Flask(__name__)
+    with app.app_context():
+        GameBlueprint("valorant", __name__, Source).register(app)
+    # Registering the blueprint serializes the errors of unimplemented endpoints
+    collector.traces.clear()
+    app.test_client().get("/valorant/team/2")
+
+    (trace,) = collector.traces
+    assert tree(trace) == {
+        "valorant.get_team": None,
+        "datasource": "valorant.get_team",
+        "scrape.fetch": "datasource",
+        "scrape.parse": "scrape.fetch",
+        "serialize": "valorant.get_team",
+    }
+
+
+def test_json_lines_exporter(tmp_path):
+    path = tmp_path / "traces.jsonl"
+    tracing.configure_tracing(enabled=True, sample_rate=1.0)
+    tracing.add_exporter(tracing.JsonLinesExporter(str(path)))
+    try:
+        for _ in range(2):
+            with tracing.span("root"):
+                with tracing.span("child"):
+                    pass
+    finally:
+        tracing.clear_exporters()
+        tracing.configure_tracing()
+
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert len(lines) == 2
+    assert [s["name"] for s in lines[0]["spans"]] == ["child", "root"]
+    assert lines[0]["spans"][0]["parent-id"] == lines[0]["spans"][1]["span-id"]